@@ -0,0 +1,523 @@
+"""
+AWS-level stand-ins: a fake Bedrock runtime client, an in-memory DynamoDB
+resource and a stub OpenSearch client.
+
+Unlike benchmarks/fakes.py (which replaces whole services), these sit below
+the real BedrockService, DynamoDBService and VectorDBService, so the app code
+under test is exactly what runs in production. Every fake takes a
+FaultInjector for per-call latency and injected errors.
+"""
+import copy
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+EMBEDDING_DIMENSIONS = 1536
+
+
+class FaultInjector:
+    """Sleeps for latency (± jitter) and raises an AWS error at error_rate"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.2, error_rate: float = 0.0,
+                 error_code: str = 'ThrottlingException', seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, operation: str, scale: float = 1.0):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency * scale * (1 + self.rng.uniform(-self.jitter, self.jitter))
+            fail = self.rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ClientError({'Error': {'Code': self.error_code, 'Message': 'Injected fault'}}, operation)
+
+
+# ---------------------------------------------------------------------------
+# Bedrock runtime
+# ---------------------------------------------------------------------------
+
+_CANNED_RISKS = [
+    {"title": "Data shared with advertising partners",
+     "description": "Personal data may be shared with third parties for targeted advertising.",
+     "severity": "high"},
+    {"title": "Broad content license",
+     "description": "Users grant a worldwide, royalty-free license to content they upload.",
+     "severity": "medium"},
+    {"title": "Mandatory arbitration",
+     "description": "Disputes must be resolved through binding arbitration.",
+     "severity": "medium"},
+]
+
+
+def fake_embedding(text: str) -> List[float]:
+    """Deterministic unit vector; texts sharing words get similar vectors"""
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    for word in re.findall(r'\w+', text.lower())[:512]:
+        digest = hashlib.md5(word.encode('utf-8')).digest()
+        for i in range(0, 8, 2):
+            index = int.from_bytes(digest[i:i + 2], 'little') % EMBEDDING_DIMENSIONS
+            vector[index] += 1.0 if digest[i + 8] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeBedrockRuntime:
+    """
+    invoke_model() for the request shapes BedrockService sends: Titan
+    embeddings, forced tool calls (canned analyses) and plain chat messages.
+    Latency of analysis calls scales with the requested output size.
+    """
+
+    def __init__(self, analysis: FaultInjector = None, chat: FaultInjector = None,
+                 embedding: FaultInjector = None):
+        self.analysis = analysis or FaultInjector()
+        self.chat = chat or FaultInjector()
+        self.embedding = embedding or FaultInjector()
+
+    def invoke_model(self, modelId: str, body: str, contentType: str = None, accept: str = None, **kwargs):
+        request = json.loads(body)
+        if 'inputText' in request:
+            self.embedding('InvokeModel')
+            text = request['inputText']
+            response = {"embedding": fake_embedding(text), "inputTextTokenCount": len(text) // 4}
+        elif request.get('tools'):
+            self.analysis('InvokeModel', scale=request.get('max_tokens', 4096) / 4096)
+            tool = request['tools'][0]
+            tool_input = self._tool_input(tool)
+            response = self._message([{"type": "tool_use", "id": "toolu_fake", "name": tool['name'],
+                                       "input": tool_input}], body, json.dumps(tool_input))
+        else:
+            self.chat('InvokeModel')
+            text = ("Based on the policies provided, the company collects usage data and shares it "
+                    "with advertising partners. You can opt out in your account settings.")
+            response = self._message([{"type": "text", "text": text}], body, text)
+        return {'body': io.BytesIO(json.dumps(response).encode('utf-8')), 'contentType': 'application/json'}
+
+    @staticmethod
+    def _message(content: List[Dict[str, Any]], body: str, output: str) -> Dict[str, Any]:
+        return {
+            "type": "message",
+            "role": "assistant",
+            "content": content,
+            "stop_reason": "tool_use" if content[0]["type"] == "tool_use" else "end_turn",
+            "usage": {"input_tokens": len(body) // 4, "output_tokens": len(output) // 4},
+        }
+
+    @staticmethod
+    def _tool_input(tool: Dict[str, Any]) -> Dict[str, Any]:
+        properties = tool['input_schema']['properties']
+        if 'summaries' in properties:
+            policy_types = list(properties['summaries']['properties'])
+            return {
+                "summaries": {p: f"Canned summary of the {p} policy." for p in policy_types},
+                "risks": [{**risk, "policy": policy_types[i % len(policy_types)]}
+                          for i, risk in enumerate(_CANNED_RISKS)],
+            }
+        if 'retired_risks' in properties:
+            return {
+                "summary": "Canned summary reflecting the changes.",
+                "risks": [{**_CANNED_RISKS[0], "section": "S1"}],
+                "retired_risks": [],
+            }
+        return {"summary": "Canned summary of the policy.", "risks": list(_CANNED_RISKS)}
+
+
+# ---------------------------------------------------------------------------
+# DynamoDB
+# ---------------------------------------------------------------------------
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas outside parentheses"""
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class FakeTable:
+    """In-memory table for the Table API used by DynamoDBService"""
+
+    def __init__(self, name: str, faults: FaultInjector, page_size: int = 100):
+        self.name = name
+        self.faults = faults
+        self.page_size = page_size
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        self.faults('DescribeTable')
+
+    def wait_until_exists(self):
+        pass
+
+    def put_item(self, Item: Dict[str, Any], **kwargs):
+        self.faults('PutItem')
+        with self._lock:
+            self.items[Item['id']] = copy.deepcopy(Item)
+        return {}
+
+    def get_item(self, Key: Dict[str, Any], **kwargs):
+        self.faults('GetItem')
+        with self._lock:
+            item = self.items.get(Key['id'])
+            return {'Item': copy.deepcopy(item)} if item is not None else {}
+
+    def delete_item(self, Key: Dict[str, Any], ReturnValues: str = 'NONE', ConditionExpression: str = None, **kwargs):
+        self.faults('DeleteItem')
+        with self._lock:
+            self._check(ConditionExpression, self.items.get(Key['id']), 'DeleteItem')
+            old = self.items.pop(Key['id'], None)
+        return {'Attributes': old} if ReturnValues == 'ALL_OLD' and old is not None else {}
+
+    @staticmethod
+    def _check(condition: Optional[str], item: Optional[Dict[str, Any]], operation: str,
+               names: Dict[str, str] = None, values: Dict[str, Any] = None):
+        """attribute_exists/attribute_not_exists and comparison conditions joined by AND, OR and parentheses"""
+        if not condition:
+            return
+        names, values = names or {}, values or {}
+        comparisons = {'=': lambda a, b: a == b, '<>': lambda a, b: a != b, '<': lambda a, b: a < b,
+                       '<=': lambda a, b: a <= b, '>': lambda a, b: a > b, '>=': lambda a, b: a >= b}
+
+        def split(text: str, keyword: str) -> List[str]:
+            # Split on a keyword outside parentheses
+            parts, depth, start = [], 0, 0
+            for match in re.finditer(rf'\(|\)|\s+{keyword}\s+', text):
+                if match.group() == '(':
+                    depth += 1
+                elif match.group() == ')':
+                    depth -= 1
+                elif depth == 0:
+                    parts.append(text[start:match.start()])
+                    start = match.end()
+            return parts + [text[start:]]
+
+        def evaluate(text: str) -> bool:
+            text = text.strip()
+            groups = split(text, 'OR')
+            if len(groups) > 1:
+                return any(evaluate(group) for group in groups)
+            terms = split(text, 'AND')
+            if len(terms) > 1:
+                return all(evaluate(term) for term in terms)
+            if text.startswith('(') and text.endswith(')'):
+                return evaluate(text[1:-1])
+            match = re.fullmatch(r'(attribute_exists|attribute_not_exists)\((#?\w+)\)', text)
+            if match:
+                present = item is not None and names.get(match.group(2), match.group(2)) in item
+                return present == (match.group(1) == 'attribute_exists')
+            name, operator, placeholder = re.fullmatch(r'(#?\w+)\s*(<>|<=|>=|<|>|=)\s*(:\w+)', text).groups()
+            value = (item or {}).get(names.get(name, name))
+            return value is not None and comparisons[operator](value, values[placeholder])
+
+        if not evaluate(condition):
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException',
+                                         'Message': 'The conditional request failed'}}, operation)
+
+    def scan(self, ExclusiveStartKey: Dict[str, Any] = None, Limit: int = None, **kwargs):
+        self.faults('Scan')
+        with self._lock:
+            keys = sorted(self.items)
+            start = keys.index(ExclusiveStartKey['id']) + 1 if ExclusiveStartKey else 0
+            page = keys[start:start + (Limit or self.page_size)]
+            response = {'Items': [copy.deepcopy(self.items[k]) for k in page], 'Count': len(page)}
+            if start + len(page) < len(keys):
+                response['LastEvaluatedKey'] = {'id': page[-1]}
+        return response
+
+    def update_item(self, Key: Dict[str, Any], UpdateExpression: str,
+                    ExpressionAttributeValues: Dict[str, Any] = None,
+                    ExpressionAttributeNames: Dict[str, str] = None, ReturnValues: str = 'NONE',
+                    ConditionExpression: str = None, **kwargs):
+        """
+        Supports SET (with if_not_exists), REMOVE and ADD clauses, existence and
+        comparison conditions, and UPDATED_OLD, UPDATED_NEW and ALL_OLD
+        """
+        self.faults('UpdateItem')
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+        clauses = re.split(r'\b(SET|REMOVE|ADD)\b', UpdateExpression)
+        old, updated = {}, []
+        with self._lock:
+            self._check(ConditionExpression, self.items.get(Key['id']), 'UpdateItem', names, values)
+            item = self.items.setdefault(Key['id'], dict(Key))
+            all_old = copy.deepcopy(item)
+            for action, body in zip(clauses[1::2], clauses[2::2]):
+                for part in _split_top_level(body):
+                    if action == 'REMOVE':
+                        name = names.get(part, part)
+                    elif action == 'ADD':
+                        name, placeholder = part.split()
+                        name = names.get(name, name)
+                    else:
+                        name, expression = (p.strip() for p in part.split('=', 1))
+                        name = names.get(name, name)
+                    updated.append(name)
+                    if name in item and name not in old:
+                        old[name] = copy.deepcopy(item[name])
+                    if action == 'REMOVE':
+                        item.pop(name, None)
+                    elif action == 'ADD':
+                        item[name] = item.get(name, 0) + values[placeholder]
+                    else:
+                        item[name] = self._evaluate(expression, item, values)
+        if ReturnValues == 'ALL_OLD':
+            return {'Attributes': all_old} if len(all_old) > len(Key) else {}
+        if ReturnValues == 'UPDATED_NEW':
+            return {'Attributes': {name: copy.deepcopy(item[name]) for name in updated if name in item}}
+        return {'Attributes': old} if ReturnValues == 'UPDATED_OLD' and old else {}
+
+    @staticmethod
+    def _evaluate(expression: str, item: Dict[str, Any], values: Dict[str, Any]) -> Any:
+        match = re.match(r'if_not_exists\((\w+),\s*(:\w+)\)', expression)
+        if match:
+            name, placeholder = match.groups()
+            return copy.deepcopy(item[name]) if name in item else copy.deepcopy(values[placeholder])
+        return copy.deepcopy(values[expression])
+
+
+class FakeDynamoDBResource:
+    """Stands in for boto3.resource('dynamodb')"""
+
+    class _Exceptions:
+        class ResourceNotFoundException(Exception):
+            pass
+
+    class _Client:
+        def __init__(self):
+            self.exceptions = FakeDynamoDBResource._Exceptions()
+
+        def update_time_to_live(self, TableName: str, TimeToLiveSpecification: Dict[str, Any], **kwargs):
+            return {'TimeToLiveSpecification': TimeToLiveSpecification}
+
+    class _Meta:
+        def __init__(self):
+            self.client = FakeDynamoDBResource._Client()
+
+    def __init__(self, faults: FaultInjector = None):
+        self.faults = faults or FaultInjector()
+        self.meta = self._Meta()
+        self.tables: Dict[str, FakeTable] = {}
+
+    def Table(self, name: str) -> FakeTable:
+        return self.tables.setdefault(name, FakeTable(name, self.faults))
+
+    def create_table(self, TableName: str, **kwargs) -> FakeTable:
+        return self.Table(TableName)
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]], **kwargs):
+        self.faults('BatchGetItem')
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            with table._lock:
+                responses[name] = [copy.deepcopy(table.items[key['id']])
+                                   for key in request['Keys'] if key['id'] in table.items]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+
+# ---------------------------------------------------------------------------
+# OpenSearch
+# ---------------------------------------------------------------------------
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class _StubIndices:
+    def __init__(self, stub: 'StubOpenSearch'):
+        self.stub = stub
+
+    def exists(self, index: str, **kwargs) -> bool:
+        self.stub.faults('indices.exists')
+        return True
+
+    def create(self, index: str, body: Dict[str, Any] = None, **kwargs):
+        self.stub.faults('indices.create')
+        return {"acknowledged": True}
+
+    def refresh(self, index: str = None, **kwargs):
+        self.stub.faults('indices.refresh')
+        return {}
+
+
+class StubOpenSearch:
+    """
+    In-memory stand-in for the opensearch-py client: brute-force cosine kNN,
+    term/terms/range/exists filters, bool queries, delete_by_query, count and
+    the (nested) terms, cardinality and min/max/value_count aggregations used
+    by VectorDBService
+    """
+
+    faults = FaultInjector()
+
+    def __init__(self, *args, **kwargs):
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.indices = _StubIndices(self)
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def index(self, index: str, body: Dict[str, Any], id: str = None, **kwargs):
+        self.faults('index')
+        with self._lock:
+            self._next_id += 1
+            doc_id = id or str(self._next_id)
+            self.docs[doc_id] = body
+        return {"_id": doc_id, "result": "created"}
+
+    def _matches(self, query: Dict[str, Any], doc: Dict[str, Any]) -> bool:
+        if not query or 'match_all' in query or 'knn' in query:
+            return True
+        if 'term' in query:
+            field, value = next(iter(query['term'].items()))
+            value = value.get('value') if isinstance(value, dict) else value
+            return doc.get(field) == value
+        if 'terms' in query:
+            field, values = next(iter(query['terms'].items()))
+            return doc.get(field) in values
+        if 'exists' in query:
+            return doc.get(query['exists']['field']) is not None
+        if 'range' in query:
+            field, bounds = next(iter(query['range'].items()))
+            value = doc.get(field)
+            if value is None:
+                return False
+            checks = {'lt': value.__lt__, 'lte': value.__le__, 'gt': value.__gt__, 'gte': value.__ge__}
+            return all(checks[op](bound) for op, bound in bounds.items() if op in checks)
+        if 'bool' in query:
+            clauses = query['bool']
+            should = clauses.get('should', [])
+            return (all(self._matches(q, doc) for q in clauses.get('must', []) + clauses.get('filter', []))
+                    and not any(self._matches(q, doc) for q in clauses.get('must_not', []))
+                    and (not should or any(self._matches(q, doc) for q in should)))
+        return True
+
+    @staticmethod
+    def _knn(query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if 'knn' in query:
+            return next(iter(query['knn'].values()))
+        for clause in query.get('bool', {}).get('must', []):
+            if 'knn' in clause:
+                return next(iter(clause['knn'].values()))
+        return None
+
+    def search(self, index: str = None, body: Dict[str, Any] = None, **kwargs):
+        self.faults('search')
+        return self._search(body or {})
+
+    def msearch(self, body: List[Dict[str, Any]], index: str = None, **kwargs):
+        """One round trip for several searches (header/body pairs)"""
+        self.faults('msearch')
+        return {"responses": [self._search(search) for search in body[1::2]]}
+
+    def _search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        query = body.get('query', {})
+        knn = self._knn(query)
+        with self._lock:
+            hits = [(doc_id, doc) for doc_id, doc in self.docs.items()
+                    if self._matches(query, doc) and (not knn or self._matches(knn.get('filter'), doc))]
+
+        scored = []
+        for doc_id, doc in hits:
+            score = (1 + _cosine(knn['vector'], doc.get('embedding', []))) / 2 if knn else 1.0
+            scored.append((score, doc_id, doc))
+        scored.sort(key=lambda hit: hit[0], reverse=True)
+        if knn:
+            scored = scored[:knn.get('k', 10)]
+
+        response = {
+            "hits": {
+                "total": {"value": len(scored)},
+                "hits": [{"_id": doc_id, "_score": score, "_source": doc}
+                         for score, doc_id, doc in scored[:body.get('size', 10)]]
+            }
+        }
+        if 'aggs' in body:
+            response['aggregations'] = self._aggregations(body['aggs'], [doc for _, doc in hits])
+        return response
+
+    @classmethod
+    def _aggregations(cls, aggs: Dict[str, Any], docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        results = {}
+        for name, agg in aggs.items():
+            if 'terms' in agg:
+                groups: Dict[Any, List[Dict[str, Any]]] = {}
+                for doc in docs:
+                    groups.setdefault(doc.get(agg['terms']['field']), []).append(doc)
+                buckets = sorted(groups.items(), key=lambda kv: len(kv[1]), reverse=True)[:agg['terms'].get('size', 10)]
+                results[name] = {"buckets": [{"key": k, "doc_count": len(group),
+                                              **cls._aggregations(agg.get('aggs', {}), group)}
+                                             for k, group in buckets]}
+            elif 'cardinality' in agg:
+                results[name] = {"value": len({doc.get(agg['cardinality']['field']) for doc in docs})}
+            else:
+                metric, spec = next(iter(agg.items()))
+                values = [doc[spec['field']] for doc in docs if doc.get(spec['field']) is not None]
+                if metric == 'value_count':
+                    results[name] = {"value": len(values)}
+                elif metric in ('min', 'max'):
+                    results[name] = {"value": (min if metric == 'min' else max)(values) if values else None}
+        return results
+
+    def delete_by_query(self, index: str, body: Dict[str, Any], **kwargs):
+        self.faults('delete_by_query')
+        with self._lock:
+            doomed = [doc_id for doc_id, doc in self.docs.items() if self._matches(body.get('query', {}), doc)]
+            for doc_id in doomed:
+                del self.docs[doc_id]
+        return {"deleted": len(doomed)}
+
+    def count(self, index: str = None, body: Dict[str, Any] = None, **kwargs):
+        self.faults('count')
+        with self._lock:
+            return {"count": sum(1 for doc in self.docs.values()
+                                 if self._matches((body or {}).get('query', {}), doc))}
+
+
+def install(bedrock: FakeBedrockRuntime = None, dynamodb: FakeDynamoDBResource = None,
+            opensearch_faults: FaultInjector = None):
+    """
+    Route the app's AWS access to the stand-ins. Call before importing main.
+    """
+    from services import vector_db
+    from services.aws import aws_clients
+
+    # SigV4 signing for OpenSearch needs credentials, even fake ones
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'fake')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'fake')
+
+    aws_clients.override('bedrock-runtime', client=bedrock or FakeBedrockRuntime())
+    aws_clients.override('dynamodb', resource=dynamodb or FakeDynamoDBResource())
+    StubOpenSearch.faults = opensearch_faults or FaultInjector()
+    vector_db.OpenSearch = StubOpenSearch
@@ -0,0 +1,177 @@
+"""
+Local stand-ins for the AWS-backed services.
+
+They implement the same methods as the real services with a configurable
+latency per call, so pipeline throughput can be measured without AWS.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from services.dynamodb import policy_hash
+
+
+class FakeBedrockService:
+    def __init__(self, analysis_latency: float = 0.5, embed_latency: float = 0.02, combined: bool = True):
+        self.analysis_latency = analysis_latency
+        self.embed_latency = embed_latency
+        self.combined = combined
+
+    def _analysis(self, prefix: str) -> Dict[str, Any]:
+        time.sleep(self.analysis_latency)
+        risks_key = f"{prefix}_risks" if prefix else "risks"
+        summary_key = f"{prefix}_summary" if prefix else "summary"
+        return {
+            summary_key: "Canned summary of the policy.",
+            risks_key: [{"title": "Data sharing", "description": "Shares data with partners.",
+                         "severity": "medium"}],
+        }
+
+    def analyze_terms_and_conditions(self, company_name: str, terms_text: str) -> Dict[str, Any]:
+        return self._analysis("")
+
+    def analyze_cookie_policy(self, company_name: str, cookie_text: str) -> Dict[str, Any]:
+        return self._analysis("cookie")
+
+    def analyze_privacy_policy(self, company_name: str, privacy_text: str) -> Dict[str, Any]:
+        return self._analysis("privacy")
+
+    def analysis_version(self, policy_type: str, model_id: str = None) -> str:
+        return "fake/1"
+
+    def analyze_policy(self, policy_type: str, company_name: str, policy_text: str) -> Dict[str, Any]:
+        analysis = self._analysis("" if policy_type == "terms" else policy_type)
+        prefix = "" if policy_type == "terms" else f"{policy_type}_"
+        return {"risks": analysis[f"{prefix}risks"], "summary": analysis[f"{prefix}summary"]}
+
+    def combined_analysis_fits(self, texts: Dict[str, str]) -> bool:
+        return self.combined and sum(1 for text in texts.values() if text) > 1
+
+    def analyze_policies_combined(self, company_name: str, texts: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        time.sleep(self.analysis_latency)
+        return {p: {"risks": [{"title": f"Data sharing ({p})", "description": "Shares data with partners.",
+                               "severity": "medium"}],
+                    "summary": "Canned summary of the policy."}
+                for p, text in texts.items() if text}
+
+    def changes_fit(self, changed_sections) -> bool:
+        return True
+
+    def analyze_policy_changes(self, policy_type, company_name, changed_sections,
+                               removed_sections, existing_risks, previous_summary) -> Dict[str, Any]:
+        time.sleep(self.analysis_latency)
+        return {
+            "summary": previous_summary,
+            "risks": [{"title": f"Change in {s['heading'] or 'section'}", "description": s['text'][:100],
+                       "severity": "medium", "section_id": s['id']} for s in changed_sections],
+            "retired_risks": [],
+            "analyzed_section_ids": [s['id'] for s in changed_sections],
+        }
+
+    def generate_embedding(self, text: str) -> List[float]:
+        time.sleep(self.embed_latency)
+        digest = hashlib.sha256(text.encode('utf-8')).digest()
+        return [b / 255.0 for b in digest] * 48  # 1536 dims, deterministic
+
+
+class FakeDynamoDBService:
+    def __init__(self, latency: float = 0.01):
+        self.latency = latency
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create_company(self, name: str, category: str, terms_text: str, **fields) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        item = {'id': str(uuid.uuid4()), 'name': name, 'category': category,
+                'terms_text': terms_text, 'last_updated': datetime.utcnow().isoformat()}
+        item.update({k: v for k, v in fields.items() if v is not None})
+        with self._lock:
+            self.items[item['id']] = item
+        return item
+
+    def get_company(self, company_id: str) -> Optional[Dict[str, Any]]:
+        time.sleep(self.latency)
+        return self.items.get(company_id)
+
+    def get_all_companies(self) -> List[Dict[str, Any]]:
+        time.sleep(self.latency)
+        return list(self.items.values())
+
+    def _update(self, company_id: str, **fields) -> bool:
+        time.sleep(self.latency)
+        with self._lock:
+            if company_id not in self.items:
+                return False
+            self.items[company_id].update(fields, last_updated=datetime.utcnow().isoformat())
+        return True
+
+    def update_policy_text(self, company_id, policy_type, policy_text, source_url=None):
+        fields = {f'{policy_type}_text': policy_text, f'{policy_type}_hash': policy_hash(policy_text)}
+        if source_url:
+            fields[f'{policy_type}_url'] = source_url
+        return self._update(company_id, **fields)
+
+    def mark_policy_checked(self, company_id, policy_type, content_hash=None):
+        fields = {f'{policy_type}_checked_at': datetime.utcnow().isoformat()}
+        if content_hash:
+            fields[f'{policy_type}_hash'] = content_hash
+        return self._update(company_id, **fields)
+
+    def update_policy_analysis(self, company_id, policy_type, risks, summary, analysis_version=None):
+        fields = {f'{policy_type}_risks': risks, f'{policy_type}_summary': summary}
+        if analysis_version:
+            fields[f'{policy_type}_analysis_version'] = analysis_version
+        return self._update(company_id, **fields)
+
+    def update_company_analysis(self, company_id, terms_risks, terms_summary, analysis_version=None):
+        return self.update_policy_analysis(company_id, 'terms', terms_risks, terms_summary, analysis_version)
+
+    def update_cookie_text(self, company_id, cookie_text):
+        return self._update(company_id, cookie_text=cookie_text)
+
+    def update_company_cookie_analysis(self, company_id, cookie_risks, cookie_summary, analysis_version=None):
+        return self.update_policy_analysis(company_id, 'cookie', cookie_risks, cookie_summary, analysis_version)
+
+    def update_privacy_text(self, company_id, privacy_text):
+        return self._update(company_id, privacy_text=privacy_text)
+
+    def update_company_privacy_analysis(self, company_id, privacy_risks, privacy_summary, analysis_version=None):
+        return self.update_policy_analysis(company_id, 'privacy', privacy_risks, privacy_summary, analysis_version)
+
+
+class FakeScraperService:
+    def __init__(self, latency: float = 0.3, text: str = None):
+        self.latency = latency
+        self.text = text or ("We collect and share your data with partners. " * 100)
+
+    def fetch_terms_from_url(self, url: str) -> str:
+        time.sleep(self.latency)
+        return self.text
+
+
+class FakeVectorDBService:
+    def __init__(self, bedrock_service, latency: float = 0.01):
+        self.bedrock = bedrock_service
+        self.latency = latency
+        self.chunks: List[Dict[str, Any]] = []
+
+    def index_policy(self, company_id: str, company_name: str,
+                     policy_text: str, policy_type: str = "terms") -> int:
+        count = 0
+        for i in range(0, len(policy_text), 1000):
+            self.bedrock.generate_embedding(policy_text[i:i + 1000])
+            time.sleep(self.latency)
+            count += 1
+        return count
+
+    def index_company_terms(self, company_id, company_name, terms_text):
+        return self.index_policy(company_id, company_name, terms_text, "terms")
+
+    def index_company_cookie(self, company_id, company_name, cookie_text):
+        return self.index_policy(company_id, company_name, cookie_text, "cookie")
+
+    def index_company_privacy(self, company_id, company_name, privacy_text):
+        return self.index_policy(company_id, company_name, privacy_text, "privacy")
@@ -0,0 +1,122 @@
+"""
+Deterministic fixture corpus of policy-like HTML pages and plain text.
+
+Pages mimic the structure of real legal pages: a header and navigation full
+of links, a cookie banner, a sidebar table of contents, deeply nested layout
+divs around the actual policy sections, and a link-heavy footer.
+"""
+import random
+from typing import Dict, List, Tuple
+
+# Sizes used across benchmarks (characters of policy text)
+FIXTURE_SIZES = [1_000, 10_000, 50_000, 200_000, 500_000]
+
+# Page layouts:
+#   "main"     - content wrapped in <main>, found by the selector pass
+#   "divs"     - no semantic markup, content in nested anonymous divs
+#   "nested"   - every paragraph wrapped in several divs (worst case for the
+#                old largest-block fallback)
+LAYOUTS = ["main", "divs", "nested"]
+
+_WORDS = (
+    "we collect use share process store personal data information services "
+    "third parties partners advertising cookies device location account "
+    "content license worldwide royalty free transferable sublicensable "
+    "arbitration dispute terminate suspend retain delete request access "
+    "rights law jurisdiction consent withdraw opt out tracking analytics "
+    "profile automated decisions security breach notify affiliates vendors"
+).split()
+
+_HEADINGS = [
+    "Information We Collect", "How We Use Information", "Sharing With Third Parties",
+    "Cookies and Similar Technologies", "Your Rights and Choices", "Data Retention",
+    "International Transfers", "Children's Privacy", "Content License",
+    "Account Termination", "Dispute Resolution and Arbitration", "Changes to These Terms",
+]
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 24))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def policy_paragraphs(size_chars: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Return (heading, paragraph) pairs totalling roughly size_chars characters
+    """
+    rng = random.Random(seed)
+    sections = []
+    total = 0
+    while total < size_chars:
+        heading = f"{len(sections) + 1}. {rng.choice(_HEADINGS)}"
+        paragraph = _paragraph(rng)
+        sections.append((heading, paragraph))
+        total += len(heading) + len(paragraph)
+    return sections
+
+
+def policy_text(size_chars: int, seed: int = 0) -> str:
+    """Plain-text policy of roughly size_chars characters"""
+    return "\n\n".join(f"{h}\n\n{p}" for h, p in policy_paragraphs(size_chars, seed))
+
+
+def _links(rng: random.Random, count: int) -> str:
+    return "".join(
+        f'<li><a href="/page-{rng.randint(1, 9999)}">{rng.choice(_HEADINGS)}</a></li>'
+        for _ in range(count)
+    )
+
+
+def policy_html(size_chars: int, layout: str = "main", seed: int = 0) -> Tuple[str, List[str]]:
+    """
+    Build a policy page.
+
+    Returns (html, paragraphs) where paragraphs is the policy body text a
+    good extractor is expected to keep.
+    """
+    rng = random.Random(seed)
+    sections = policy_paragraphs(size_chars, seed)
+
+    body_parts = []
+    for heading, paragraph in sections:
+        block = f"<h2>{heading}</h2><p>{paragraph}</p>"
+        if layout == "nested":
+            block = f'<div class="row"><div class="col"><div class="cell">{block}</div></div></div>'
+        body_parts.append(block)
+    body = "".join(body_parts)
+
+    if layout == "main":
+        content = f'<main><article><h1>Terms of Service</h1>{body}</article></main>'
+    else:
+        content = f'<div class="x1"><div class="x2"><h1>Terms of Service</h1>{body}</div></div>'
+
+    html = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Terms</title>
+<style>.x1 {{ margin: 0 }}</style>
+<script>window.dataLayer = window.dataLayer || [];</script></head>
+<body>
+<div class="page">
+  <div class="top"><a href="/">Home</a><ul>{_links(rng, 40)}</ul></div>
+  <div class="cookie-banner">We use cookies to improve your experience. Click accept to continue.</div>
+  <div class="layout">
+    <div class="sidebar"><ul>{_links(rng, 60)}</ul></div>
+    {content}
+  </div>
+  <div class="bottom"><ul>{_links(rng, 80)}</ul><p>Copyright Example Inc.</p></div>
+</div>
+</body></html>"""
+
+    return html, [p for _, p in sections]
+
+
+def corpus(sizes: List[int] = None, layouts: List[str] = None) -> Dict[str, Tuple[str, List[str]]]:
+    """Build every (size, layout) fixture, keyed by a readable name"""
+    result = {}
+    for size in sizes or FIXTURE_SIZES:
+        for layout in layouts or LAYOUTS:
+            result[f"{layout}-{size // 1000}k"] = policy_html(size, layout, seed=size)
+    return result
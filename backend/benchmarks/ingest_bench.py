@@ -0,0 +1,96 @@
+"""
+Bulk ingest throughput against local stand-ins.
+
+Compares the per-company flow of POST /api/companies (scrape, analyze, store
+and index each policy one after another) with the staged IngestPipeline.
+
+Usage (from the backend directory):
+    python -m benchmarks.ingest_bench --companies 40 --analysis-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.fakes import (FakeBedrockService, FakeDynamoDBService,
+                              FakeScraperService, FakeVectorDBService)
+from services.ingest import IngestPipeline, parse_ndjson
+
+
+def _ndjson(count: int) -> str:
+    lines = []
+    for i in range(count):
+        lines.append(json.dumps({
+            "company_name": f"Company {i}",
+            "category": "social",
+            "terms_url": f"https://example.com/{i}/terms",
+            "cookie_url": f"https://example.com/{i}/cookies",
+            "privacy_url": f"https://example.com/{i}/privacy",
+        }))
+    return "\n".join(lines)
+
+
+def _services(args):
+    bedrock = FakeBedrockService(args.analysis_latency, args.embed_latency,
+                                 combined=not args.separate_analysis)
+    return (FakeDynamoDBService(args.db_latency), bedrock,
+            FakeScraperService(args.scrape_latency), FakeVectorDBService(bedrock))
+
+
+def run_serial(args) -> float:
+    """Same call sequence as create_company in main.py, one company at a time"""
+    db, bedrock, scraper, vector = _services(args)
+    start = time.perf_counter()
+    for item in parse_ndjson(_ndjson(args.companies)):
+        request = item["request"]
+        terms = scraper.fetch_terms_from_url(request.terms_url)
+        cookie = scraper.fetch_terms_from_url(request.cookie_url)
+        privacy = scraper.fetch_terms_from_url(request.privacy_url)
+        company = db.create_company(name=request.company_name, category=request.category, terms_text=terms)
+        analysis = bedrock.analyze_terms_and_conditions(request.company_name, terms)
+        db.update_company_analysis(company['id'], analysis['risks'], analysis['summary'])
+        vector.index_company_terms(company['id'], request.company_name, terms)
+        db.update_cookie_text(company['id'], cookie)
+        analysis = bedrock.analyze_cookie_policy(request.company_name, cookie)
+        db.update_company_cookie_analysis(company['id'], analysis['cookie_risks'], analysis['cookie_summary'])
+        vector.index_company_cookie(company['id'], request.company_name, cookie)
+        db.update_privacy_text(company['id'], privacy)
+        analysis = bedrock.analyze_privacy_policy(request.company_name, privacy)
+        db.update_company_privacy_analysis(company['id'], analysis['privacy_risks'], analysis['privacy_summary'])
+        vector.index_company_privacy(company['id'], request.company_name, privacy)
+    return time.perf_counter() - start
+
+
+def run_pipeline(args) -> dict:
+    pipeline = IngestPipeline(*_services(args), concurrency={
+        "scrape": args.scrape, "analyze": args.analyze, "store": args.store, "index": args.index,
+    })
+    job = pipeline.create_job(parse_ndjson(_ndjson(args.companies)))
+    asyncio.run(pipeline.run(job))
+    return job.to_dict(include_items=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk ingest throughput benchmark")
+    parser.add_argument('--companies', type=int, default=40)
+    parser.add_argument('--analysis-latency', type=float, default=0.5)
+    parser.add_argument('--embed-latency', type=float, default=0.02)
+    parser.add_argument('--scrape-latency', type=float, default=0.3)
+    parser.add_argument('--db-latency', type=float, default=0.01)
+    parser.add_argument('--scrape', type=int, default=8)
+    parser.add_argument('--analyze', type=int, default=4)
+    parser.add_argument('--store', type=int, default=8)
+    parser.add_argument('--index', type=int, default=2)
+    parser.add_argument('--skip-serial', action='store_true')
+    parser.add_argument('--separate-analysis', action='store_true',
+                        help="Analyze each policy in its own call instead of one combined call")
+    args = parser.parse_args()
+
+    if not args.skip_serial:
+        elapsed = run_serial(args)
+        print(f"serial:   {args.companies} companies in {elapsed:.1f}s "
+              f"({args.companies / elapsed * 60:.1f} companies/min)")
+
+    status = run_pipeline(args)
+    print(f"pipeline: {status['counts']} in {status['elapsed_seconds']}s "
+          f"({status['companies_per_minute']} companies/min)")
@@ -0,0 +1,305 @@
+"""
+Load test of the full API against local AWS stand-ins.
+
+The real app (main.app, with the real Bedrock, DynamoDB and vector services)
+is driven in-process over ASGI; only the boto3 and OpenSearch clients
+underneath are replaced (benchmarks/aws_fakes.py), with configurable latency
+and injected errors per dependency.
+
+Scenarios:
+    bulk-create      POST /api/companies with inline policy texts
+    reindex-all      POST /api/index-all over the companies created so far
+    chat-storm       concurrent RAG and per-company chat
+    compare-chat     POST /api/chat/compare across --compare-companies companies
+    list-under-load  GET /api/companies while creates run in the background
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --requests 50 --concurrency 8
+    python -m benchmarks.load_test --save baseline.json
+    python -m benchmarks.load_test --baseline baseline.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import aws_fakes
+from benchmarks.fixtures import policy_text
+
+SCENARIOS = ["bulk-create", "reindex-all", "chat-storm", "compare-chat", "list-under-load"]
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client for an ASGI app, including lifespan events"""
+
+    def __init__(self, app):
+        self.app = app
+        self._lifespan: Optional[asyncio.Task] = None
+        self._events: Optional[asyncio.Queue] = None
+
+    async def startup(self):
+        self._events = asyncio.Queue()
+        started = asyncio.Event()
+
+        async def receive():
+            return await self._events.get()
+
+        async def send(message):
+            if message['type'] in ('lifespan.startup.complete', 'lifespan.startup.failed'):
+                started.set()
+
+        self._lifespan = asyncio.create_task(
+            self.app({'type': 'lifespan', 'asgi': {'version': '3.0'}, 'state': {}}, receive, send))
+        await self._events.put({'type': 'lifespan.startup'})
+        await started.wait()
+
+    async def shutdown(self):
+        if self._lifespan is not None:
+            await self._events.put({'type': 'lifespan.shutdown'})
+            await self._lifespan
+
+    async def request(self, method: str, path: str, body: Any = None) -> Dict[str, Any]:
+        path, _, query = path.partition('?')
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'host', b'loadtest'), (b'content-type', b'application/json'),
+                        (b'content-length', str(len(payload)).encode())],
+            'client': ('127.0.0.1', 0), 'server': ('loadtest', 80),
+        }
+        messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+        response = {'status': None, 'body': b''}
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            # Only reached once the app is done with the request body
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'] += message.get('body', b'')
+
+        await self.app(scope, receive, send)
+        return response
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class ScenarioResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def record(self, seconds: float, ok: bool):
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "throughput_rps": round(count / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        }
+
+
+async def _timed(client: ASGIClient, result: ScenarioResult, method: str, path: str, body: Any = None):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, body)
+        ok = response['status'] < 400
+    except Exception:
+        ok = False
+    result.record(time.perf_counter() - start, ok)
+
+
+async def _run(name: str, total: int, concurrency: int,
+               make_call: Callable[[int, ScenarioResult], Any]) -> ScenarioResult:
+    """Issue `total` calls with at most `concurrency` in flight"""
+    result = ScenarioResult(name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await make_call(i, result)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _company_body(i: int, policy_chars: int) -> Dict[str, Any]:
+    return {
+        "company_name": f"Load Test Company {i}",
+        "category": "social",
+        "terms_text": policy_text(policy_chars, seed=i),
+        "cookie_text": policy_text(policy_chars // 2, seed=i + 1),
+        "privacy_text": policy_text(policy_chars, seed=i + 2),
+    }
+
+
+async def bulk_create(client: ASGIClient, args, state: Dict[str, Any]) -> ScenarioResult:
+    offset = state.setdefault('created', 0)
+    state['created'] += args.requests
+    return await _run('bulk-create', args.requests, args.concurrency,
+                      lambda i, r: _timed(client, r, 'POST', '/api/companies',
+                                          _company_body(offset + i, args.policy_chars)))
+
+
+async def reindex_all(client: ASGIClient, args, state: Dict[str, Any]) -> ScenarioResult:
+    # One call walks the whole corpus; repeat a few times for a latency distribution
+    return await _run('reindex-all', max(1, args.requests // 10), 1,
+                      lambda i, r: _timed(client, r, 'POST', '/api/index-all'))
+
+
+async def chat_storm(client: ASGIClient, args, state: Dict[str, Any]) -> ScenarioResult:
+    response = await client.request('GET', '/api/companies')
+    company_ids = [c['id'] for c in json.loads(response['body'])] or [None]
+
+    def call(i: int, result: ScenarioResult):
+        company_id = company_ids[i % len(company_ids)]
+        if i % 2 == 0 or company_id is None:
+            return _timed(client, result, 'POST', '/api/chat',
+                          {"question": "Do they share my data with advertisers?"})
+        return _timed(client, result, 'POST', f'/api/companies/{company_id}/chat',
+                      {"question": "Can they use my uploaded content?"})
+
+    return await _run('chat-storm', args.requests, args.concurrency, call)
+
+
+async def compare_chat(client: ASGIClient, args, state: Dict[str, Any]) -> ScenarioResult:
+    response = await client.request('GET', '/api/companies')
+    company_ids = [c['id'] for c in json.loads(response['body'])]
+
+    def call(i: int, result: ScenarioResult):
+        # A sliding window of companies, so every request compares a different set
+        selected = [company_ids[(i + j) % len(company_ids)]
+                    for j in range(min(args.compare_companies, len(company_ids)))]
+        return _timed(client, result, 'POST', '/api/chat/compare',
+                      {"question": "How do they differ on content licensing?", "company_ids": selected})
+
+    return await _run('compare-chat', args.requests, args.concurrency, call)
+
+
+async def list_under_load(client: ASGIClient, args, state: Dict[str, Any]) -> ScenarioResult:
+    background = asyncio.create_task(bulk_create(client, args, state))
+    result = await _run('list-under-load', args.requests, args.concurrency,
+                        lambda i, r: _timed(client, r, 'GET', '/api/companies'))
+    await background
+    return result
+
+
+RUNNERS = {
+    "bulk-create": bulk_create,
+    "reindex-all": reindex_all,
+    "chat-storm": chat_storm,
+    "compare-chat": compare_chat,
+    "list-under-load": list_under_load,
+}
+
+
+def check_regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                      max_regression: float) -> List[str]:
+    """Scenarios whose p95, throughput or error rate got worse than the allowed fraction"""
+    failures = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and current['p95_ms'] > before['p95_ms'] * (1 + max_regression):
+            failures.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if before['throughput_rps'] and current['throughput_rps'] < before['throughput_rps'] * (1 - max_regression):
+            failures.append(f"{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current['error_rate'] > before['error_rate'] + max_regression * max(before['error_rate'], 0.01):
+            failures.append(f"{name}: error rate {before['error_rate']} -> {current['error_rate']}")
+    return failures
+
+
+async def main(args) -> Dict[str, Dict[str, Any]]:
+    aws_fakes.install(
+        bedrock=aws_fakes.FakeBedrockRuntime(
+            analysis=aws_fakes.FaultInjector(args.analysis_latency, error_rate=args.bedrock_error_rate, seed=1),
+            chat=aws_fakes.FaultInjector(args.chat_latency, error_rate=args.bedrock_error_rate, seed=2),
+            embedding=aws_fakes.FaultInjector(args.embed_latency, error_rate=args.bedrock_error_rate, seed=3),
+        ),
+        dynamodb=aws_fakes.FakeDynamoDBResource(
+            aws_fakes.FaultInjector(args.db_latency, error_rate=args.db_error_rate, seed=4)),
+        opensearch_faults=aws_fakes.FaultInjector(args.search_latency, error_rate=args.search_error_rate, seed=5),
+    )
+    # Imported only now so the services pick up the stand-ins
+    from main import app
+
+    client = ASGIClient(app)
+    await client.startup()
+    state: Dict[str, Any] = {}
+    results = {}
+    try:
+        for name in args.scenarios:
+            results[name] = (await RUNNERS[name](client, args, state)).to_dict()
+            print(f"{name:16} {json.dumps(results[name])}")
+    finally:
+        await client.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API load test against local AWS stand-ins")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--requests', type=int, default=50, help="Requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--policy-chars', type=int, default=10_000)
+    parser.add_argument('--compare-companies', type=int, default=4, help="Companies per compare-chat request")
+    parser.add_argument('--analysis-latency', type=float, default=0.2)
+    parser.add_argument('--chat-latency', type=float, default=0.1)
+    parser.add_argument('--embed-latency', type=float, default=0.01)
+    parser.add_argument('--db-latency', type=float, default=0.005)
+    parser.add_argument('--search-latency', type=float, default=0.01)
+    parser.add_argument('--bedrock-error-rate', type=float, default=0.0)
+    parser.add_argument('--db-error-rate', type=float, default=0.0)
+    parser.add_argument('--search-error-rate', type=float, default=0.0)
+    parser.add_argument('--save', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against results saved with --save")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="Allowed fractional regression in p95, throughput or error rate")
+    args = parser.parse_args()
+
+    # Keep the load test's own output readable
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    results = asyncio.run(main(args))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            failures = check_regressions(results, json.load(f), args.max_regression)
+        if failures:
+            print("Regressions beyond threshold:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.max_regression:.0%}")
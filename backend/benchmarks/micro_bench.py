@@ -0,0 +1,161 @@
+"""
+Microbenchmarks for the per-ingest text processing hot spots.
+
+Times VectorDBService.chunk_text, ScraperService._find_main_content,
+ScraperService._clean_text and the analysis JSON extraction (_tool_input's
+text fallback) over the fixture corpus (1k to 500k characters), reporting
+time per call and peak memory.
+
+Results are saved per commit (benchmarks/results/micro-<sha>.json) so runs
+can be compared across changes.
+
+Usage (from the backend directory):
+    python -m benchmarks.micro_bench
+    python -m benchmarks.micro_bench --sizes 1000 50000 --only clean_text
+    python -m benchmarks.micro_bench --compare benchmarks/results/micro-1a2b3c4.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import timeit
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import FIXTURE_SIZES, LAYOUTS, policy_html, policy_text
+from services.bedrock import _tool_input
+from services.scraper import ScraperService
+from services.vector_db import VectorDBService
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+FUNCTIONS = ["chunk_text", "find_main_content", "clean_text", "tool_input"]
+
+
+def _git_commit() -> str:
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _with_banners(text: str, closed: bool) -> str:
+    """
+    Policy text with a cookie banner before every section. With closed=False
+    the banners never reach the pattern's closing word, the worst case for the
+    DOTALL cleanup regexes.
+    """
+    banner = "We use cookies to improve your experience. Click accept to continue." if closed \
+        else "Cookie Policy: we use cookies to improve your experience."
+    return "\n\n".join(f"{banner}\n{section}" for section in text.split("\n\n"))
+
+
+def _model_response(size: int) -> Dict[str, Any]:
+    """Analysis answered in text (no tool call), JSON wrapped in prose"""
+    paragraphs = policy_text(size).split("\n\n")[1::2]
+    analysis = {
+        "summary": paragraphs[0],
+        "risks": [{"title": p[:60], "description": p, "severity": "medium"} for p in paragraphs[1:]],
+    }
+    text = f"Here is the analysis you asked for:\n{json.dumps(analysis, indent=2)}\nLet me know if {{anything}} else."
+    return {"content": [{"type": "text", "text": text}]}
+
+
+def cases(sizes: List[int], only: List[str]) -> List[Tuple[str, str, int, Callable[[], Any]]]:
+    """(function, case, input chars, zero-arg call) for every benchmark"""
+    scraper = ScraperService()
+    # chunk_text doesn't touch the OpenSearch connection
+    vector = VectorDBService.__new__(VectorDBService)
+    result = []
+    for size in sizes:
+        text = policy_text(size, seed=size)
+        if "chunk_text" in only:
+            result.append(("chunk_text", "text", len(text), lambda t=text: vector.chunk_text(t)))
+        if "find_main_content" in only:
+            for layout in LAYOUTS:
+                html, _ = policy_html(size, layout, seed=size)
+                soup = BeautifulSoup(html, 'lxml')
+                result.append(("find_main_content", layout, len(html),
+                               lambda s=soup: scraper._find_main_content(s)))
+        if "clean_text" in only:
+            for case, closed in (("banners", True), ("unclosed-banners", False)):
+                banner_text = _with_banners(text, closed)
+                result.append(("clean_text", case, len(banner_text),
+                               lambda t=banner_text: scraper._clean_text(t)))
+        if "tool_input" in only:
+            response = _model_response(size)
+            chars = len(response["content"][0]["text"])
+            result.append(("tool_input", "text-fallback", chars,
+                           lambda r=response: _tool_input(r, "record_policy_analysis")))
+    return result
+
+
+def measure(call: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Best-of-repeat time per call and peak traced memory of one call"""
+    timer = timeit.Timer(call)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(seconds * 1000, 4), "peak_kib": round(peak / 1024, 1)}
+
+
+def run(sizes: List[int], only: List[str], repeat: int) -> Dict[str, Any]:
+    results = {}
+    print(f"{'function':<20}{'case':<18}{'chars':>10}{'ms/call':>12}{'peak KiB':>12}")
+    for function, case, chars, call in cases(sizes, only):
+        key = f"{function}/{case}/{chars // 1000}k"
+        results[key] = {"chars": chars, **measure(call, repeat)}
+        print(f"{function:<20}{case:<18}{chars:>10}{results[key]['ms']:>12.3f}{results[key]['peak_kib']:>12.1f}")
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    print(f"\nvs {baseline['commit']} ({baseline['created_at']})")
+    print(f"{'benchmark':<44}{'ms before':>12}{'ms now':>12}{'change':>9}{'peak change':>13}")
+    for key, now in current['results'].items():
+        before = baseline['results'].get(key)
+        if not before:
+            continue
+        time_change = (now['ms'] - before['ms']) / before['ms'] if before['ms'] else 0.0
+        peak_change = (now['peak_kib'] - before['peak_kib']) / before['peak_kib'] if before['peak_kib'] else 0.0
+        print(f"{key:<44}{before['ms']:>12.3f}{now['ms']:>12.3f}{time_change:>+9.0%}{peak_change:>+13.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=FIXTURE_SIZES)
+    parser.add_argument('--only', nargs='+', choices=FUNCTIONS, default=FUNCTIONS)
+    parser.add_argument('--repeat', type=int, default=3, help='Timing rounds (best is reported)')
+    parser.add_argument('--compare', help='Results file from an earlier run to compare against')
+    parser.add_argument('--no-save', action='store_true', help="Don't write the results file")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.only, args.repeat)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"micro-{report['commit']}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
@@ -0,0 +1,139 @@
+"""
+Benchmark the scraper's main-content extraction.
+
+Compares the previous selector + largest-block extractor with the single-pass
+extractor in ScraperService on the fixture corpus, reporting time per page and
+how much of the expected policy text each one keeps.
+
+Usage (from the backend directory):
+    python -m benchmarks.scraper_bench
+    python -m benchmarks.scraper_bench --pages path/to/saved_html_dir
+"""
+import argparse
+import os
+import time
+from typing import Callable, List, Optional
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import corpus
+from services.scraper import ScraperService
+
+UNWANTED_TAGS = ['script', 'style', 'nav', 'header', 'footer',
+                 'aside', 'form', 'button', 'iframe', 'noscript']
+
+LEGACY_SELECTORS = [
+    'main', 'article', '[role="main"]', '.terms-content', '.policy-content',
+    '.legal-content', '.terms-and-conditions', '.content', '#content',
+    '#main-content', '.main-content', '.post-content', '.entry-content',
+    '.page-content',
+]
+
+
+def legacy_find_main_content(soup: BeautifulSoup):
+    """The previous implementation, kept here for comparison"""
+    for selector in LEGACY_SELECTORS:
+        element = soup.select_one(selector)
+        if element and len(element.get_text(strip=True)) > 500:
+            return element
+
+    paragraphs = soup.find_all(['p', 'div', 'section'])
+    if paragraphs:
+        largest = max(paragraphs, key=lambda x: len(x.get_text(strip=True)), default=None)
+        if largest and len(largest.get_text(strip=True)) > 500:
+            return largest.parent if largest.parent else largest
+
+    return None
+
+
+def legacy_extract(scraper: ScraperService, soup: BeautifulSoup) -> str:
+    main_content = legacy_find_main_content(soup) or soup.find('body')
+    text = main_content.get_text(separator='\n', strip=True) if main_content else ''
+    return scraper._clean_text(text)
+
+
+def current_extract(scraper: ScraperService, soup: BeautifulSoup) -> str:
+    main_content = scraper._find_main_content(soup) or soup.find('body')
+    text = scraper._extract_text(main_content) if main_content else ''
+    return scraper._clean_text(text)
+
+
+def _parse(html: str) -> BeautifulSoup:
+    soup = BeautifulSoup(html, 'lxml')
+    for element in soup(UNWANTED_TAGS):
+        element.decompose()
+    return soup
+
+
+def _time(extract: Callable, scraper: ScraperService, html: str, repeat: int):
+    """Best-of-repeat extraction time (parsing excluded) and the output"""
+    best = float('inf')
+    output = ''
+    for _ in range(repeat):
+        soup = _parse(html)
+        start = time.perf_counter()
+        output = extract(scraper, soup)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def _recall(output: str, expected: List[str], limit: int) -> float:
+    """Share of the expected paragraphs (within the kept prefix) found in the output"""
+    kept = []
+    total = 0
+    for paragraph in expected:
+        if total + len(paragraph) > limit:
+            break
+        kept.append(paragraph)
+        total += len(paragraph)
+    if not kept:
+        return 1.0
+    return sum(1 for p in kept if p in output) / len(kept)
+
+
+def _noise(output: str, total_len: int) -> float:
+    """Rough share of the output that is navigation rather than policy text"""
+    if not output:
+        return 0.0
+    nav_lines = [line for line in output.split('\n') if len(line) < 40]
+    return sum(len(line) for line in nav_lines) / max(total_len, 1)
+
+
+def run(pages_dir: Optional[str] = None, repeat: int = 3):
+    scraper = ScraperService()
+    cases = {}
+    for name, (html, expected) in corpus().items():
+        cases[name] = (html, expected)
+    if pages_dir:
+        for filename in sorted(os.listdir(pages_dir)):
+            if filename.endswith(('.html', '.htm')):
+                with open(os.path.join(pages_dir, filename), encoding='utf-8', errors='replace') as f:
+                    cases[filename] = (f.read(), None)
+
+    print(f"{'page':<28}{'legacy ms':>11}{'single ms':>11}{'speedup':>9}"
+          f"{'recall old/new':>17}{'noise old/new':>16}")
+    for name, (html, expected) in cases.items():
+        legacy_time, legacy_out = _time(legacy_extract, scraper, html, repeat)
+        current_time, current_out = _time(current_extract, scraper, html, repeat)
+
+        if expected is not None:
+            limit = scraper.max_text_chars
+            recall = f"{_recall(legacy_out, expected, limit):.2f}/{_recall(current_out, expected, limit):.2f}"
+        else:
+            # No ground truth for saved pages - report overlap with the old output instead
+            old_lines = set(legacy_out.split('\n'))
+            new_lines = set(current_out.split('\n'))
+            recall = f"{len(old_lines & new_lines) / max(len(old_lines), 1):.2f} kept"
+        noise = (f"{_noise(legacy_out, len(legacy_out)):.2f}/"
+                 f"{_noise(current_out, len(current_out)):.2f}")
+
+        print(f"{name:<28}{legacy_time * 1000:>11.1f}{current_time * 1000:>11.1f}"
+              f"{legacy_time / max(current_time, 1e-9):>8.1f}x{recall:>17}{noise:>16}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--pages', help='Directory of saved policy pages (*.html) to include')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per page (best time is reported)')
+    args = parser.parse_args()
+    run(args.pages, args.repeat)
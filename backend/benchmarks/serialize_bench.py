@@ -0,0 +1,131 @@
+"""
+CPU per request for serializing the GET /api/companies listing.
+
+Compares the response_model path the endpoint used before (validate every
+company and Risk into List[CompanyResponse], dump to JSON-compatible data,
+json.dumps) with services.company_json, cold (empty cache) and warm (every
+company cached). Companies carry policy texts and risks like analyzed items;
+the DynamoDB scan itself is not included.
+
+Results are saved per commit (benchmarks/results/serialize-<sha>.json).
+
+Usage (from the backend directory):
+    python -m benchmarks.serialize_bench
+    python -m benchmarks.serialize_bench --companies 500 --text-chars 8000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from pydantic import TypeAdapter
+
+from benchmarks.fixtures import policy_text
+from benchmarks.micro_bench import RESULTS_DIR, _git_commit
+from models import CompanyResponse
+from services import company_json
+from services.company_json import CompanyJSONCache
+
+LISTING = TypeAdapter(List[CompanyResponse])
+
+
+def companies(count: int, text_chars: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Analyzed company items as DynamoDBService returns them"""
+    rng = random.Random(seed)
+    texts = [policy_text(text_chars, seed=i) for i in range(8)]
+    items = []
+    for i in range(count):
+        item = {
+            'id': f"company-{i:05d}",
+            'name': f"Company {i}",
+            'category': rng.choice(['social', 'streaming', 'dating', 'shopping']),
+            'icon_url': f"https://example.com/{i}.png",
+            'last_updated': datetime(2025, 1, 1, 12, i % 60).isoformat(),
+        }
+        for policy_type in ('terms', 'cookie', 'privacy'):
+            text = texts[rng.randrange(len(texts))]
+            item[f'{policy_type}_text'] = text
+            item[f'{policy_type}_summary'] = text[:400]
+            item[f'{policy_type}_risks'] = [
+                {'title': f"Risk {j} of {policy_type}", 'description': text[j * 200:j * 200 + 200],
+                 'severity': rng.choice(['high', 'medium', 'low'])}
+                for j in range(rng.randint(3, 8))
+            ]
+            item[f'{policy_type}_url'] = f"https://example.com/{i}/{policy_type}"
+            item[f'{policy_type}_checked_at'] = item['last_updated']
+        items.append(item)
+    return items
+
+
+def response_model_path(items: List[Dict[str, Any]]) -> bytes:
+    """What FastAPI did for response_model=List[CompanyResponse], then JSONResponse.render"""
+    data = LISTING.dump_python(LISTING.validate_python(items), mode='json')
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode('utf-8')
+
+
+def measure(call: Callable[[], bytes], requests: int) -> Dict[str, float]:
+    """Mean CPU (process time) and wall time per request"""
+    call()
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        call()
+    return {
+        "cpu_ms": round((time.process_time() - cpu) / requests * 1000, 2),
+        "wall_ms": round((time.perf_counter() - wall) / requests * 1000, 2),
+    }
+
+
+def run(count: int, text_chars: int, requests: int) -> Dict[str, Any]:
+    items = companies(count, text_chars)
+    expected = json.loads(response_model_path(items))
+    warm = CompanyJSONCache()
+
+    def cold():
+        return CompanyJSONCache().listing(items)
+
+    cases = {
+        "response_model": lambda: response_model_path(items),
+        "fast (cold cache)": cold,
+        "fast (warm cache)": lambda: warm.listing(items),
+    }
+    results = {}
+    print(f"{count} companies, {text_chars} chars per policy, encoder: {'orjson' if company_json.orjson else 'json'}")
+    print(f"{'path':<22}{'cpu ms/req':>12}{'wall ms/req':>13}{'body KiB':>11}{'speedup':>9}")
+    for name, call in cases.items():
+        body = call()
+        assert json.loads(body) == expected, f"{name} differs from the response_model output"
+        results[name] = {**measure(call, requests), "body_kib": round(len(body) / 1024, 1)}
+        speedup = results["response_model"]["cpu_ms"] / results[name]["cpu_ms"] if results[name]["cpu_ms"] else 0
+        print(f"{name:<22}{results[name]['cpu_ms']:>12.2f}{results[name]['wall_ms']:>13.2f}"
+              f"{results[name]['body_kib']:>11.1f}{speedup:>8.1f}x")
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "encoder": 'orjson' if company_json.orjson else 'json',
+        "companies": count,
+        "text_chars": text_chars,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--companies', type=int, default=500)
+    parser.add_argument('--text-chars', type=int, default=5000, help='Characters per policy text')
+    parser.add_argument('--requests', type=int, default=20, help='Timed requests per path')
+    parser.add_argument('--no-save', action='store_true', help="Don't write the results file")
+    args = parser.parse_args()
+
+    report = run(args.companies, args.text_chars, args.requests)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"serialize-{report['commit']}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {path}")
@@ -0,0 +1,106 @@
+"""
+Cold start benchmark.
+
+Starts fresh interpreters that import main and run the app's startup against
+the local AWS stand-ins, reporting import time, time until /healthz answers
+and time until /readyz reports ready (warmup finished).
+
+Usage (from the backend directory):
+    python -m benchmarks.startup_bench --runs 5
+    python -m benchmarks.startup_bench --aws-latency 0.2   # slow dependencies delay readiness only
+    python -m benchmarks.startup_bench --importtime        # slowest imports
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(aws_latency: float):
+    """One cold start, timed from before the first app import"""
+    start = time.perf_counter()
+    from benchmarks import aws_fakes
+    faults = aws_fakes.FaultInjector(aws_latency, seed=0)
+    aws_fakes.install(dynamodb=aws_fakes.FakeDynamoDBResource(faults), opensearch_faults=faults)
+    from benchmarks.load_test import ASGIClient
+    from main import app
+    imported = time.perf_counter()
+
+    async def boot():
+        client = ASGIClient(app)
+        await client.startup()
+        started = time.perf_counter()
+        response = await client.request('GET', '/healthz')
+        healthy = time.perf_counter() if response['status'] == 200 else None
+        while (await client.request('GET', '/readyz'))['status'] != 200:
+            await asyncio.sleep(0.005)
+        ready = time.perf_counter()
+        await client.shutdown()
+        return started, healthy, ready
+
+    started, healthy, ready = asyncio.run(boot())
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": (started - imported) * 1000,
+        "healthy_ms": (healthy - start) * 1000 if healthy else None,
+        "ready_ms": (ready - start) * 1000,
+    }))
+
+
+def _spawn(args, extra=()) -> subprocess.CompletedProcess:
+    env = {**os.environ, 'LOG_LEVEL': 'WARNING', 'PYTHONPATH': BACKEND_DIR}
+    return subprocess.run([sys.executable, *extra, '-m', 'benchmarks.startup_bench', '--child',
+                           '--aws-latency', str(args.aws_latency)],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def importtime(args, top: int = 15):
+    """Slowest modules by cumulative import time (python -X importtime)"""
+    result = _spawn(args, ('-X', 'importtime'))
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    print(f"{'module':<50}{'cumulative ms':>15}{'self ms':>10}")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:top]:
+        print(f"{module:<50}{cumulative_us / 1000:>15.1f}{self_us / 1000:>10.1f}")
+
+
+def run(args):
+    samples = []
+    for _ in range(args.runs):
+        spawned = time.perf_counter()
+        result = _spawn(args)
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample["process_ms"] = (time.perf_counter() - spawned) * 1000
+        samples.append(sample)
+
+    print(f"{'metric':<14}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for key in ("import_ms", "startup_ms", "healthy_ms", "ready_ms", "process_ms"):
+        values = [s[key] for s in samples if s[key] is not None]
+        print(f"{key:<14}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--aws-latency', type=float, default=0.05,
+                        help="Per-call latency of the DynamoDB/OpenSearch stand-ins during warmup")
+    parser.add_argument('--importtime', action='store_true', help="Show the slowest imports instead")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.aws_latency)
+    elif args.importtime:
+        importtime(args)
+    else:
+        run(args)
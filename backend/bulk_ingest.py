@@ -0,0 +1,69 @@
+"""
+Bulk-ingest companies from an NDJSON file.
+
+Each line is a JSON object with the same fields as POST /api/companies
+(company_name, category, terms_text or terms_url, optional cookie_* and
+privacy_*). Runs the same staged pipeline as POST /api/companies/bulk.
+
+Usage (from the backend directory):
+    python bulk_ingest.py companies.ndjson --analyze 4 --index 2
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from services import (BedrockService, DynamoDBService, ScraperService, VectorDBService,
+                      IngestPipeline, parse_ndjson)
+from services.ingest import DEFAULT_STAGE_CONCURRENCY
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest companies from NDJSON")
+    parser.add_argument('file', help="NDJSON file, or - for stdin")
+    for stage, default in DEFAULT_STAGE_CONCURRENCY.items():
+        parser.add_argument(f'--{stage}', type=int, default=default,
+                            help=f"Concurrent {stage} calls (default {default})")
+    parser.add_argument('--json', action='store_true', help="Print the final job status as JSON")
+    args = parser.parse_args()
+
+    if args.file == '-':
+        body = sys.stdin.read()
+    else:
+        with open(args.file, encoding='utf-8') as f:
+            body = f.read()
+
+    items = parse_ndjson(body)
+    if not items:
+        print("No companies found in input")
+        return 1
+
+    bedrock_service = BedrockService()
+    db_service = DynamoDBService()
+    pipeline = IngestPipeline(
+        db_service, bedrock_service, ScraperService(), VectorDBService(bedrock_service, tombstone_store=db_service),
+        concurrency={stage: getattr(args, stage) for stage in DEFAULT_STAGE_CONCURRENCY}
+    )
+    job = pipeline.create_job(items)
+
+    def report(item):
+        errors = f" ({'; '.join(item['errors'])})" if item['errors'] else ''
+        print(f"[{item['status']:>7}] line {item['line']}: {item['company_name']}{errors}")
+
+    for item in items:
+        if item['status'] == 'failed':
+            report(item)
+
+    asyncio.run(pipeline.run(job, on_item_done=report))
+
+    status = job.to_dict(include_items=args.json)
+    if args.json:
+        print(json.dumps(status, indent=2))
+    else:
+        print(f"\n{status['counts']} in {status['elapsed_seconds']}s "
+              f"({status['companies_per_minute']} companies/min)")
+    return 0 if not status['counts'].get('failed') else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,53 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
-from typing import List
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response
+from starlette.routing import Match
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
 import os
+import time
+
+from models import Company, CompanyCreate, CompanyResponse, CompareChatRequest, CompanySearchResponse, Risk, UploadTermsRequest, UploadCookieRequest, UploadPrivacyRequest
+from services.aws import aws_clients
+from services.company_json import CompanyJSONCache, etag
+from services.dynamodb import StatsUnavailableError
+from services.http_cache import CompressionMiddleware, ConditionalGetMiddleware
+from services.ledger import GROUP_BY, tag_usage, usage_ledger
+from services.metrics import CONTENT_TYPE, ERRORS, HTTP_REQUEST_SECONDS, metrics
+from services.tracing import configure_logging, request_context, tracer
+from services.vector_db import interleave
+from services import BedrockService, DynamoDBService, ScraperService, VectorDBService, IngestPipeline, parse_ndjson, PolicyRefresher, IncrementalAnalyzer, describe_changes, ReanalysisRunner, Warmup, ChatSessions, VectorReconciler
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Connect to AWS in the background right after startup; /readyz reports when done
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        warmup.start()
+    if refresh_hours > 0:
+        policy_refresher.start()
+    if vector_reconciler.interval_seconds > 0:
+        vector_reconciler.start()
+    yield
+    await vector_reconciler.stop()
+    await policy_refresher.stop()
+    await warmup.stop()
+    tracer.shutdown()
 
-from models import Company, CompanyCreate, CompanyResponse, Risk, UploadTermsRequest, UploadCookieRequest, UploadPrivacyRequest
-from services import BedrockService, DynamoDBService, ScraperService, VectorDBService
 
 app = FastAPI(
     title="Terms & Conditions Risk Analyzer",
     description="Analyze privacy risks in Terms and Conditions using AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -23,11 +59,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
+# Strong ETags and 304s for company resources (static files carry their own ETag),
+# then gzip/brotli for everything large enough
+app.add_middleware(ConditionalGetMiddleware, etag_prefixes=("/api/companies",))
+app.add_middleware(CompressionMiddleware)
+
+
+def _match_route(scope) -> Tuple[str, Dict[str, Any]]:
+    """
+    Route path template, so /api/companies/{company_id} is a single metrics
+    series, and the path parameters
+    """
+    for route in app.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, 'path', 'unmatched'), child_scope.get('path_params', {})
+    return 'unmatched', {}
+
+
+def _require_batch_budget():
+    """Refuse new batch jobs once the daily LLM budget is spent (chat is never limited)"""
+    if not usage_ledger.batch_allowed():
+        raise HTTPException(status_code=429,
+                            detail="LLM daily budget reached; batch jobs are refused until tomorrow (UTC)")
+
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Root trace span and request id per request (X-Request-ID is honored and echoed), plus latency metrics"""
+    start = time.perf_counter()
+    status = 500
+    route, path_params = _match_route(request.scope)
+    if 'company_id' in path_params:
+        # Attribute this request's Bedrock usage to the company
+        tag_usage(company_id=path_params['company_id'])
+    with request_context(request.headers.get('x-request-id')) as request_id, \
+            tracer.span(f"{request.method} {route}", request_id=request_id) as span:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers['X-Request-ID'] = request_id
+            return response
+        except Exception as e:
+            ERRORS.inc(component='http', type=type(e).__name__)
+            logger.exception("Unhandled error in %s %s", request.method, route)
+            raise
+        finally:
+            span.set_attribute('http.status_code', status)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                         route=route, status=str(status))
+
+# Initialize services (no network calls; AWS connections are made on first use or during warmup)
 db_service = DynamoDBService()
 bedrock_service = BedrockService()
 scraper_service = ScraperService()
-vector_service = VectorDBService(bedrock_service)
+vector_service = VectorDBService(bedrock_service, tombstone_store=db_service)
+incremental_analyzer = IncrementalAnalyzer(bedrock_service)
+ingest_pipeline = IngestPipeline(db_service, bedrock_service, scraper_service, vector_service)
+reanalysis_runner = ReanalysisRunner(db_service, bedrock_service)
+chat_sessions = ChatSessions(bedrock_service)
+# Serialized company responses, reused until a company's last_updated changes
+company_json = CompanyJSONCache()
+
+# Scheduled re-crawl of policy source URLs (disabled when POLICY_REFRESH_HOURS is 0)
+refresh_hours = float(os.getenv('POLICY_REFRESH_HOURS', '0'))
+policy_refresher = PolicyRefresher(
+    db_service, incremental_analyzer, scraper_service, vector_service,
+    interval_seconds=int(refresh_hours * 3600) or 24 * 3600
+)
+
+# Purges deleted and superseded vector chunks in the background
+vector_reconciler = VectorReconciler(db_service, vector_service)
+
+warmup = Warmup({
+    "dynamodb": db_service.warmup,
+    "opensearch": vector_service.warmup,
+    "bedrock": bedrock_service.warmup,
+})
 
 # Serve static files
 frontend_path = os.path.join(os.path.dirname(__file__), '..', 'frontend')
@@ -48,7 +156,22 @@ async def root():
 async def get_companies():
     """Get all companies"""
     companies = db_service.get_all_companies()
-    return companies
+    # Serialized per company and cached by version, skipping response_model validation
+    return Response(content=company_json.listing(companies), media_type="application/json",
+                    headers={"ETag": etag(companies)})
+
+
+@app.get("/api/companies/search", response_model=CompanySearchResponse)
+async def search_companies(q: str = "", category: Optional[str] = None, severity: Optional[str] = None,
+                           offset: int = 0, limit: int = 20):
+    """
+    Search companies by name, category, summaries and risk titles (prefix
+    matching), filtered by category and/or risk severity, one page at a time
+    """
+    if severity and severity not in ('high', 'medium', 'low'):
+        raise HTTPException(status_code=400, detail="severity must be high, medium or low")
+    return db_service.search_index.search(q=q, category=category, severity=severity,
+                                          offset=offset, limit=min(max(limit, 0), 100))
 
 
 @app.get("/api/companies/{company_id}", response_model=CompanyResponse)
@@ -57,7 +180,8 @@ async def get_company(company_id: str):
     company = db_service.get_company(company_id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
-    return company
+    return Response(content=company_json.company(company), media_type="application/json",
+                    headers={"ETag": etag([company])})
 
 
 @app.post("/api/companies", response_model=CompanyResponse)
@@ -81,7 +205,7 @@ async def create_company(request: UploadTermsRequest):
         try:
             cookie_text = scraper_service.fetch_terms_from_url(request.cookie_url)
         except ValueError as e:
-            print(f"Cookie URL fetch failed: {e}")
+            logger.warning("Cookie URL fetch failed: %s", e)
 
     # Get privacy text if provided
     privacy_text = request.privacy_text
@@ -89,96 +213,145 @@ async def create_company(request: UploadTermsRequest):
         try:
             privacy_text = scraper_service.fetch_terms_from_url(request.privacy_url)
         except ValueError as e:
-            print(f"Privacy URL fetch failed: {e}")
+            logger.warning("Privacy URL fetch failed: %s", e)
 
     # Create company entry
     company = db_service.create_company(
         name=request.company_name,
         category=request.category,
-        terms_text=terms_text
+        terms_text=terms_text,
+        terms_url=request.terms_url
     )
 
     company_id = company['id']
+    tag_usage(company_id=company_id)
+
+    # Analyze all supplied policies in one call when they fit the budget
+    policy_texts = {"terms": terms_text, "cookie": cookie_text, "privacy": privacy_text}
+    combined = {}
+    if bedrock_service.combined_analysis_fits(policy_texts):
+        try:
+            combined = await asyncio.to_thread(bedrock_service.analyze_policies_combined,
+                                               request.company_name, policy_texts)
+        except Exception as e:
+            logger.warning("Combined analysis failed, analyzing policies separately: %s", e)
 
     # Analyze terms using Bedrock
     try:
-        analysis = bedrock_service.analyze_terms_and_conditions(
-            company_name=request.company_name,
-            terms_text=terms_text
+        analysis = combined.get('terms') or await asyncio.to_thread(
+            bedrock_service.analyze_policy,
+            'terms', request.company_name, terms_text
         )
 
         # Update company with analysis
         db_service.update_company_analysis(
             company_id=company_id,
             terms_risks=analysis.get('risks', []),
-            terms_summary=analysis.get('summary', '')
+            terms_summary=analysis.get('summary', ''),
+            analysis_version=bedrock_service.analysis_version('terms', analysis.get('model'))
         )
 
         # Index terms in vector database for RAG
         try:
-            vector_service.index_company_terms(
+            await asyncio.to_thread(
+                vector_service.index_company_terms,
                 company_id=company_id,
                 company_name=request.company_name,
                 terms_text=terms_text
             )
         except Exception as ve:
-            print(f"Vector indexing failed: {ve}")
+            logger.warning("Vector indexing failed: %s", ve)
 
     except Exception as e:
-        print(f"Terms analysis failed: {e}")
+        logger.error("Terms analysis failed: %s", e)
 
     # Analyze cookie policy if provided
     if cookie_text:
         try:
-            db_service.update_cookie_text(company_id, cookie_text)
-            cookie_analysis = bedrock_service.analyze_cookie_policy(
-                company_name=request.company_name,
-                cookie_text=cookie_text
+            db_service.update_cookie_text(company_id, cookie_text, request.cookie_url)
+            cookie_analysis = combined.get('cookie') or await asyncio.to_thread(
+                bedrock_service.analyze_policy,
+                'cookie', request.company_name, cookie_text
             )
             db_service.update_company_cookie_analysis(
                 company_id=company_id,
-                cookie_risks=cookie_analysis.get('cookie_risks', []),
-                cookie_summary=cookie_analysis.get('cookie_summary', '')
+                cookie_risks=cookie_analysis.get('risks', []),
+                cookie_summary=cookie_analysis.get('summary', ''),
+                analysis_version=bedrock_service.analysis_version('cookie', cookie_analysis.get('model'))
             )
             try:
-                vector_service.index_company_cookie(
+                await asyncio.to_thread(
+                    vector_service.index_company_cookie,
                     company_id=company_id,
                     company_name=request.company_name,
                     cookie_text=cookie_text
                 )
             except Exception as ve:
-                print(f"Cookie vector indexing failed: {ve}")
+                logger.warning("Cookie vector indexing failed: %s", ve)
         except Exception as e:
-            print(f"Cookie analysis failed: {e}")
+            logger.error("Cookie analysis failed: %s", e)
 
     # Analyze privacy policy if provided
     if privacy_text:
         try:
-            db_service.update_privacy_text(company_id, privacy_text)
-            privacy_analysis = bedrock_service.analyze_privacy_policy(
-                company_name=request.company_name,
-                privacy_text=privacy_text
+            db_service.update_privacy_text(company_id, privacy_text, request.privacy_url)
+            privacy_analysis = combined.get('privacy') or await asyncio.to_thread(
+                bedrock_service.analyze_policy,
+                'privacy', request.company_name, privacy_text
             )
             db_service.update_company_privacy_analysis(
                 company_id=company_id,
-                privacy_risks=privacy_analysis.get('privacy_risks', []),
-                privacy_summary=privacy_analysis.get('privacy_summary', '')
+                privacy_risks=privacy_analysis.get('risks', []),
+                privacy_summary=privacy_analysis.get('summary', ''),
+                analysis_version=bedrock_service.analysis_version('privacy', privacy_analysis.get('model'))
             )
             try:
-                vector_service.index_company_privacy(
+                await asyncio.to_thread(
+                    vector_service.index_company_privacy,
                     company_id=company_id,
                     company_name=request.company_name,
                     privacy_text=privacy_text
                 )
             except Exception as ve:
-                print(f"Privacy vector indexing failed: {ve}")
+                logger.warning("Privacy vector indexing failed: %s", ve)
         except Exception as e:
-            print(f"Privacy analysis failed: {e}")
+            logger.error("Privacy analysis failed: %s", e)
 
     # Return updated company
     return db_service.get_company(company_id)
 
 
+@app.post("/api/companies/bulk")
+async def bulk_create_companies(request: Request, wait: bool = False):
+    """
+    Bulk-create companies from an NDJSON body (one UploadTermsRequest per line).
+    Companies are processed by a staged scrape → analyze → store → index pipeline.
+    Returns the job status; poll GET /api/companies/bulk/{job_id} unless wait=true.
+    """
+    body = (await request.body()).decode('utf-8', errors='replace')
+    items = parse_ndjson(body)
+    if not items:
+        raise HTTPException(status_code=400, detail="Request body must contain at least one NDJSON line")
+
+    _require_batch_budget()
+    job = ingest_pipeline.create_job(items)
+    if wait:
+        await ingest_pipeline.run(job)
+    else:
+        ingest_pipeline.start(job)
+
+    return job.to_dict()
+
+
+@app.get("/api/companies/bulk/{job_id}")
+async def get_bulk_job(job_id: str):
+    """Get status of a bulk ingest job"""
+    job = ingest_pipeline.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
 @app.post("/api/companies/{company_id}/analyze")
 async def analyze_company(company_id: str):
     """Analyze or re-analyze a company's terms"""
@@ -190,7 +363,8 @@ async def analyze_company(company_id: str):
         raise HTTPException(status_code=400, detail="No terms text available for analysis")
 
     try:
-        analysis = bedrock_service.analyze_terms_and_conditions(
+        analysis = await asyncio.to_thread(
+            bedrock_service.analyze_terms_and_conditions,
             company_name=company['name'],
             terms_text=company['terms_text']
         )
@@ -198,18 +372,20 @@ async def analyze_company(company_id: str):
         db_service.update_company_analysis(
             company_id=company_id,
             terms_risks=analysis.get('risks', []),
-            terms_summary=analysis.get('summary', '')
+            terms_summary=analysis.get('summary', ''),
+            analysis_version=bedrock_service.analysis_version('terms', analysis.get('model'))
         )
 
         # Re-index terms in vector database
         try:
-            vector_service.index_company_terms(
+            await asyncio.to_thread(
+                vector_service.index_company_terms,
                 company_id=company_id,
                 company_name=company['name'],
                 terms_text=company['terms_text']
             )
         except Exception as ve:
-            print(f"Vector indexing failed: {ve}")
+            logger.warning("Vector indexing failed: %s", ve)
 
         return db_service.get_company(company_id)
 
@@ -237,36 +413,36 @@ async def upload_cookie_policy(company_id: str, request: UploadCookieRequest):
         raise HTTPException(status_code=400, detail="Either cookie_text or cookie_url is required")
 
     # Update company with cookie text
-    db_service.update_cookie_text(company_id, cookie_text)
+    db_service.update_cookie_text(company_id, cookie_text, request.cookie_url)
 
-    # Analyze cookie policy using Bedrock
+    # Analyze cookie policy using Bedrock (only changed sections if a previous version exists)
     try:
-        analysis = bedrock_service.analyze_cookie_policy(
-            company_name=company['name'],
-            cookie_text=cookie_text
-        )
+        analysis = await asyncio.to_thread(incremental_analyzer.analyze, company, 'cookie', cookie_text)
 
         # Update company with cookie analysis
         db_service.update_company_cookie_analysis(
             company_id=company_id,
-            cookie_risks=analysis.get('cookie_risks', []),
-            cookie_summary=analysis.get('cookie_summary', '')
+            cookie_risks=analysis['risks'],
+            cookie_summary=analysis['summary'],
+            analysis_version=(bedrock_service.analysis_version('cookie', analysis.get('model'))
+                              if analysis['mode'] == 'full' else None)
         )
 
         # Index cookie policy in vector database for RAG
         try:
-            vector_service.index_company_cookie(
+            await asyncio.to_thread(
+                vector_service.index_company_cookie,
                 company_id=company_id,
                 company_name=company['name'],
                 cookie_text=cookie_text
             )
         except Exception as ve:
-            print(f"Cookie vector indexing failed: {ve}")
+            logger.warning("Cookie vector indexing failed: %s", ve)
 
         return db_service.get_company(company_id)
 
     except Exception as e:
-        print(f"Cookie analysis failed: {e}")
+        logger.error("Cookie analysis failed: %s", e)
         return db_service.get_company(company_id)
 
 
@@ -281,7 +457,8 @@ async def analyze_cookie_policy(company_id: str):
         raise HTTPException(status_code=400, detail="No cookie policy text available for analysis")
 
     try:
-        analysis = bedrock_service.analyze_cookie_policy(
+        analysis = await asyncio.to_thread(
+            bedrock_service.analyze_cookie_policy,
             company_name=company['name'],
             cookie_text=company['cookie_text']
         )
@@ -289,18 +466,20 @@ async def analyze_cookie_policy(company_id: str):
         db_service.update_company_cookie_analysis(
             company_id=company_id,
             cookie_risks=analysis.get('cookie_risks', []),
-            cookie_summary=analysis.get('cookie_summary', '')
+            cookie_summary=analysis.get('cookie_summary', ''),
+            analysis_version=bedrock_service.analysis_version('cookie', analysis.get('model'))
         )
 
         # Re-index cookie policy in vector database
         try:
-            vector_service.index_company_cookie(
+            await asyncio.to_thread(
+                vector_service.index_company_cookie,
                 company_id=company_id,
                 company_name=company['name'],
                 cookie_text=company['cookie_text']
             )
         except Exception as ve:
-            print(f"Cookie vector indexing failed: {ve}")
+            logger.warning("Cookie vector indexing failed: %s", ve)
 
         return db_service.get_company(company_id)
 
@@ -328,36 +507,36 @@ async def upload_privacy_policy(company_id: str, request: UploadPrivacyRequest):
         raise HTTPException(status_code=400, detail="Either privacy_text or privacy_url is required")
 
     # Update company with privacy text
-    db_service.update_privacy_text(company_id, privacy_text)
+    db_service.update_privacy_text(company_id, privacy_text, request.privacy_url)
 
-    # Analyze privacy policy using Bedrock
+    # Analyze privacy policy using Bedrock (only changed sections if a previous version exists)
     try:
-        analysis = bedrock_service.analyze_privacy_policy(
-            company_name=company['name'],
-            privacy_text=privacy_text
-        )
+        analysis = await asyncio.to_thread(incremental_analyzer.analyze, company, 'privacy', privacy_text)
 
         # Update company with privacy analysis
         db_service.update_company_privacy_analysis(
             company_id=company_id,
-            privacy_risks=analysis.get('privacy_risks', []),
-            privacy_summary=analysis.get('privacy_summary', '')
+            privacy_risks=analysis['risks'],
+            privacy_summary=analysis['summary'],
+            analysis_version=(bedrock_service.analysis_version('privacy', analysis.get('model'))
+                              if analysis['mode'] == 'full' else None)
         )
 
         # Index privacy policy in vector database for RAG
         try:
-            vector_service.index_company_privacy(
+            await asyncio.to_thread(
+                vector_service.index_company_privacy,
                 company_id=company_id,
                 company_name=company['name'],
                 privacy_text=privacy_text
             )
         except Exception as ve:
-            print(f"Privacy vector indexing failed: {ve}")
+            logger.warning("Privacy vector indexing failed: %s", ve)
 
         return db_service.get_company(company_id)
 
     except Exception as e:
-        print(f"Privacy analysis failed: {e}")
+        logger.error("Privacy analysis failed: %s", e)
         return db_service.get_company(company_id)
 
 
@@ -372,7 +551,8 @@ async def analyze_privacy_policy(company_id: str):
         raise HTTPException(status_code=400, detail="No privacy policy text available for analysis")
 
     try:
-        analysis = bedrock_service.analyze_privacy_policy(
+        analysis = await asyncio.to_thread(
+            bedrock_service.analyze_privacy_policy,
             company_name=company['name'],
             privacy_text=company['privacy_text']
         )
@@ -380,18 +560,20 @@ async def analyze_privacy_policy(company_id: str):
         db_service.update_company_privacy_analysis(
             company_id=company_id,
             privacy_risks=analysis.get('privacy_risks', []),
-            privacy_summary=analysis.get('privacy_summary', '')
+            privacy_summary=analysis.get('privacy_summary', ''),
+            analysis_version=bedrock_service.analysis_version('privacy', analysis.get('model'))
         )
 
         # Re-index privacy policy in vector database
         try:
-            vector_service.index_company_privacy(
+            await asyncio.to_thread(
+                vector_service.index_company_privacy,
                 company_id=company_id,
                 company_name=company['name'],
                 privacy_text=company['privacy_text']
             )
         except Exception as ve:
-            print(f"Privacy vector indexing failed: {ve}")
+            logger.warning("Privacy vector indexing failed: %s", ve)
 
         return db_service.get_company(company_id)
 
@@ -399,18 +581,41 @@ async def analyze_privacy_policy(company_id: str):
         raise HTTPException(status_code=500, detail=f"Privacy analysis failed: {str(e)}")
 
 
+@app.get("/api/companies/{company_id}/changes")
+async def get_policy_changes(company_id: str, policy_type: str = "terms"):
+    """Section-level view of what changed in a policy since its previous version"""
+    if policy_type not in ("terms", "cookie", "privacy"):
+        raise HTTPException(status_code=400, detail="policy_type must be terms, cookie or privacy")
+
+    company = db_service.get_company(company_id)
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    previous_text = company.get(f'{policy_type}_previous_text')
+    if not previous_text:
+        return {"policy_type": policy_type, "changed_at": company.get(f'{policy_type}_changed_at'),
+                "has_previous": False, "added": [], "removed": [], "modified": []}
+
+    changes = describe_changes(previous_text, company.get(f'{policy_type}_text') or '')
+    return {
+        "policy_type": policy_type,
+        "changed_at": company.get(f'{policy_type}_changed_at'),
+        "has_previous": True,
+        **changes
+    }
+
+
 @app.delete("/api/companies/{company_id}")
 async def delete_company(company_id: str):
-    """Delete a company"""
-    # Remove from vector database
-    try:
-        vector_service.remove_company(company_id)
-    except Exception as e:
-        print(f"Error removing from vector DB: {e}")
-
-    if db_service.delete_company(company_id):
-        return {"status": "deleted"}
-    raise HTTPException(status_code=404, detail="Company not found")
+    """
+    Delete a company. Its chunks are hidden from search at once and purged
+    from the vector index by the background reconciler.
+    """
+    if not db_service.delete_company(company_id):
+        raise HTTPException(status_code=404, detail="Company not found")
+    vector_service.tombstone_company(company_id)
+    company_json.discard(company_id)
+    return {"status": "deleted"}
 
 
 @app.post("/api/seed")
@@ -451,7 +656,8 @@ async def chat_about_company(company_id: str, request: dict):
         raise HTTPException(status_code=400, detail="Question is required")
 
     try:
-        response = bedrock_service.chat_about_terms(
+        response = await asyncio.to_thread(
+            bedrock_service.chat_about_terms,
             company_name=company['name'],
             terms_text=company.get('terms_text', ''),
             user_question=question
@@ -462,6 +668,46 @@ async def chat_about_company(company_id: str, request: dict):
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
 
+def _chunk_sources(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One source per company and policy type, for the frontend"""
+    sources = []
+    seen = set()
+    policy_type_labels = {
+        "terms": "Terms & Conditions",
+        "cookie": "Cookie Policy",
+        "privacy": "Privacy Policy"
+    }
+    for chunk in chunks:
+        company_name = chunk.get('company_name')
+        policy_type = chunk.get('policy_type', 'terms')
+        source_key = f"{company_name}_{policy_type}"
+        if company_name and source_key not in seen:
+            sources.append({
+                "company_id": chunk.get('company_id'),
+                "company_name": company_name,
+                "policy_type": policy_type,
+                "policy_label": policy_type_labels.get(policy_type, 'Terms & Conditions')
+            })
+            seen.add(source_key)
+    return sources
+
+
+def _chat_session(request: dict) -> Optional[Dict[str, Any]]:
+    """
+    The chat session named by session_id, or a new one when the request has
+    neither (clients that still send `history` get no session)
+    """
+    session_id = request.get('session_id')
+    if session_id:
+        session = chat_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found or expired")
+        return session
+    if 'history' in request:
+        return None
+    return chat_sessions.create()
+
+
 @app.post("/api/chat")
 async def rag_chat(request: dict):
     """
@@ -471,11 +717,17 @@ async def rag_chat(request: dict):
     """
     question = request.get('question', '')
     company_id = request.get('company_id')  # Optional - filter to specific company
-    conversation_history = request.get('history', [])
+    if company_id:
+        tag_usage(company_id=company_id)
 
     if not question:
         raise HTTPException(status_code=400, detail="Question is required")
 
+    # Server-held history (session_id), or the client's own `history`
+    session = _chat_session(request)
+    conversation_history = session['messages'] if session else request.get('history', [])
+    session_id = session['id'] if session else None
+
     try:
         # If specific company selected, get full T&C from DynamoDB (no vector search)
         if company_id:
@@ -486,7 +738,8 @@ async def rag_chat(request: dict):
             if not company.get('terms_text'):
                 return {
                     "response": "This company doesn't have any terms and conditions text stored.",
-                    "sources": []
+                    "sources": [],
+                    "session_id": session_id
                 }
 
             # Use full T&C text as context
@@ -499,7 +752,8 @@ async def rag_chat(request: dict):
 
         else:
             # No company filter - use vector search across all companies
-            chunks = vector_service.search(
+            chunks = await asyncio.to_thread(
+                vector_service.retrieve_context,
                 query=question,
                 n_results=5
             )
@@ -507,58 +761,136 @@ async def rag_chat(request: dict):
             if not chunks:
                 return {
                     "response": "I don't have any policies indexed yet. Please add some companies first, or try re-analyzing existing ones.",
-                    "sources": []
+                    "sources": [],
+                    "session_id": session_id
                 }
 
-            # Format sources for frontend (include policy type)
-            sources = []
-            seen = set()
-            policy_type_labels = {
-                "terms": "Terms & Conditions",
-                "cookie": "Cookie Policy",
-                "privacy": "Privacy Policy"
-            }
-            for chunk in chunks:
-                company_name = chunk.get('company_name')
-                policy_type = chunk.get('policy_type', 'terms')
-                source_key = f"{company_name}_{policy_type}"
-                if company_name and source_key not in seen:
-                    sources.append({
-                        "company_id": chunk.get('company_id'),
-                        "company_name": company_name,
-                        "policy_type": policy_type,
-                        "policy_label": policy_type_labels.get(policy_type, 'Terms & Conditions')
-                    })
-                    seen.add(source_key)
+            sources = _chunk_sources(chunks)
 
         # Generate response using RAG
-        response = bedrock_service.rag_chat(
+        response = await asyncio.to_thread(
+            bedrock_service.rag_chat,
+            user_question=question,
+            context_chunks=chunks,
+            conversation_history=conversation_history,
+            conversation_summary=session['summary'] if session else None
+        )
+        if session:
+            # May summarize older turns with a model call
+            await asyncio.to_thread(chat_sessions.record_turn, session, question, response)
+
+        return {
+            "response": response,
+            "sources": sources,
+            "session_id": session_id
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+
+
+@app.post("/api/chat/compare")
+async def compare_chat(request: CompareChatRequest):
+    """
+    RAG chat comparing several companies. Retrieves the top chunks of each
+    company in one batched search and interleaves them, so every company is
+    represented in the context.
+    """
+    question = request.question
+    company_ids = request.company_ids
+    per_company = request.per_company
+    policy_type = request.policy_type
+
+    if not question:
+        raise HTTPException(status_code=400, detail="Question is required")
+
+    session = _chat_session(request.model_dump(exclude_unset=True))
+    conversation_history = session['messages'] if session else request.history or []
+    session_id = session['id'] if session else None
+
+    try:
+        results = await asyncio.to_thread(
+            vector_service.search_companies,
+            query=question,
+            company_ids=company_ids,
+            n_per_company=per_company,
+            policy_type=policy_type
+        )
+        chunks = interleave(results)
+        if not chunks:
+            return {
+                "response": "None of these companies have indexed policies yet. Try re-analyzing them first.",
+                "sources": [],
+                "missing_context": company_ids,
+                "session_id": session_id
+            }
+
+        response = await asyncio.to_thread(
+            bedrock_service.rag_chat,
             user_question=question,
             context_chunks=chunks,
-            conversation_history=conversation_history
+            conversation_history=conversation_history,
+            conversation_summary=session['summary'] if session else None
         )
+        if session:
+            # May summarize older turns with a model call
+            await asyncio.to_thread(chat_sessions.record_turn, session, question, response)
 
         return {
             "response": response,
-            "sources": sources
+            "sources": _chunk_sources(chunks),
+            # Companies with nothing indexed (the answer can't cover them)
+            "missing_context": [company_id for company_id, found in results.items() if not found],
+            "session_id": session_id
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
 
+@app.post("/api/chat/sessions")
+async def create_chat_session():
+    """Start a server-held chat session; pass its session_id to /api/chat"""
+    session = chat_sessions.create()
+    return {"session_id": session['id'], "expires_at": session['expires_at']}
+
+
+@app.get("/api/chat/sessions/{session_id}")
+async def get_chat_session(session_id: str):
+    """Rolling summary and recent messages of a chat session"""
+    session = chat_sessions.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return session
+
+
+@app.delete("/api/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """End a chat session"""
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return {"status": "deleted", "session_id": session_id}
+
+
 @app.post("/api/index-all")
 async def index_all_companies():
     """Index all existing companies in the vector database (all policy types)"""
+    _require_batch_budget()
+    tag_usage(batch=True, job="index-all")
     companies = db_service.get_all_companies()
     indexed_counts = {"terms": 0, "cookie": 0, "privacy": 0}
     errors = []
 
     for company in companies:
+        if usage_ledger.exhausted_budgets('embedding'):
+            errors.append("LLM budget reached; remaining companies not indexed")
+            break
+        tag_usage(company_id=company['id'])
         # Index terms
         if company.get('terms_text'):
             try:
-                vector_service.index_company_terms(
+                await asyncio.to_thread(
+                    vector_service.index_company_terms,
                     company_id=company['id'],
                     company_name=company['name'],
                     terms_text=company['terms_text']
@@ -570,7 +902,8 @@ async def index_all_companies():
         # Index cookie policy
         if company.get('cookie_text'):
             try:
-                vector_service.index_company_cookie(
+                await asyncio.to_thread(
+                    vector_service.index_company_cookie,
                     company_id=company['id'],
                     company_name=company['name'],
                     cookie_text=company['cookie_text']
@@ -582,7 +915,8 @@ async def index_all_companies():
         # Index privacy policy
         if company.get('privacy_text'):
             try:
-                vector_service.index_company_privacy(
+                await asyncio.to_thread(
+                    vector_service.index_company_privacy,
                     company_id=company['id'],
                     company_name=company['name'],
                     privacy_text=company['privacy_text']
@@ -599,6 +933,127 @@ async def index_all_companies():
     }
 
 
+@app.post("/api/refresh")
+async def refresh_policies(force: bool = False, company_id: Optional[str] = None):
+    """
+    Re-crawl policy source URLs and re-analyze only policies whose text changed.
+    By default only policies not checked within the refresh interval are crawled;
+    force=true re-crawls every policy with a URL.
+    """
+    _require_batch_budget()
+    result = await asyncio.to_thread(policy_refresher.run_once, force, company_id)
+    return {
+        "status": "completed",
+        "checked": result["checked"],
+        "changed": result["changed"],
+        "unchanged": result["unchanged"],
+        "errors": result["errors"]
+    }
+
+
+@app.post("/api/reanalyze-all")
+async def reanalyze_all(concurrency: int = 4, requests_per_minute: float = 0,
+                        tokens_per_minute: float = 0, policy_type: Optional[str] = None):
+    """
+    Re-analyze every company's policies in the background after a prompt/model change.
+    Skips policies already analyzed with the current version and resumes from the
+    last checkpoint after a crash. Poll GET /api/reanalyze-all for progress and ETA.
+    """
+    if policy_type and policy_type not in ("terms", "cookie", "privacy"):
+        raise HTTPException(status_code=400, detail="policy_type must be terms, cookie or privacy")
+    _require_batch_budget()
+
+    started = reanalysis_runner.start(
+        concurrency=max(1, concurrency),
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        policy_types=[policy_type] if policy_type else None
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="A re-analysis run is already in progress")
+    return {"status": "started"}
+
+
+@app.get("/api/reanalyze-all")
+async def get_reanalyze_progress():
+    """Progress, throughput and ETA of the current or last re-analysis run"""
+    return reanalysis_runner.progress or {"status": "idle"}
+
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process is up and serving. Never touches AWS."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: warmup has reached every dependency (503 until then)"""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if warmup.ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics: HTTP and per-stage latency histograms, token, cache and error counters"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/api/aws-stats")
+async def get_aws_stats():
+    """Shared AWS client pool settings, retry/throttle counters and Bedrock limiter state"""
+    return aws_clients.get_stats()
+
+
+@app.get("/api/model-routes")
+async def get_model_routes():
+    """Per-operation model routing table and observed latency per operation and model"""
+    return bedrock_service.router.get_stats()
+
+
+@app.get("/api/usage")
+async def get_usage(days: int = 7, group_by: str = "operation", company_id: Optional[str] = None):
+    """
+    Bedrock tokens and estimated cost over the last `days` days, grouped by a
+    comma-separated list of day, operation, model, company_id and kind, plus budget status
+    """
+    dimensions = [g.strip() for g in group_by.split(',') if g.strip()]
+    unknown = [g for g in dimensions if g not in GROUP_BY]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {', '.join(unknown)}")
+    return {
+        **usage_ledger.summary(days=max(1, days), group_by=dimensions, company_id=company_id),
+        "budgets": usage_ledger.budget_status()
+    }
+
+
+@app.get("/api/analysis-stats")
+async def get_analysis_stats():
+    """Per-operation counts of valid, repaired and failed structured analysis outputs"""
+    return bedrock_service.analysis_stats.get_stats()
+
+
+@app.get("/api/stats")
+async def get_risk_stats(top: int = 20):
+    """Cross-company risk aggregates (maintained on every write, so independent of company count)"""
+    try:
+        stats = db_service.get_risk_stats(top=max(0, top))
+    except StatsUnavailableError as e:
+        # Throttled reads: better no answer than partial totals
+        logger.warning("%s", e)
+        raise HTTPException(status_code=503, detail="Risk stats are temporarily unavailable, retry shortly")
+    if stats['dirty_since']:
+        # An update failed somewhere: repair from a full scan in the background
+        db_service.rebuild_stats_in_background()
+    return stats
+
+
+@app.post("/api/stats/rebuild")
+async def rebuild_risk_stats():
+    """Recompute the risk aggregates from a full table scan"""
+    return {"status": "rebuilt", **db_service.rebuild_stats()}
+
+
 @app.get("/api/vector-stats")
 async def get_vector_stats():
     """Get vector database statistics"""
@@ -606,6 +1061,20 @@ async def get_vector_stats():
     return stats
 
 
+@app.get("/api/vector-reconcile")
+async def get_vector_reconcile_status():
+    """Pending vector deletes (with retry state) and the last purge and sweep results"""
+    return vector_reconciler.status()
+
+
+@app.post("/api/vector-reconcile")
+async def run_vector_reconcile(sweep: bool = False):
+    """Purge pending vector deletes now; sweep=true first looks for missed deletes and orphaned chunks"""
+    swept = await asyncio.to_thread(vector_reconciler.sweep) if sweep else None
+    result = await asyncio.to_thread(vector_reconciler.run_once)
+    return {"status": "completed", **result, "sweep": swept}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime
 
 
@@ -7,6 +7,37 @@ class Risk(BaseModel):
     title: str
     description: str
     severity: str  # "low", "medium", "high"
+    section_id: Optional[str] = None  # Section the risk was found in (incremental analysis)
+
+
+class AnalysisRisk(BaseModel):
+    """Risk as returned by the model, validated before it is stored"""
+    title: str = Field(min_length=1)
+    description: str
+    severity: Literal["low", "medium", "high"]
+    section: Optional[str] = None  # Label of the changed section (incremental analysis)
+
+    @field_validator('severity', mode='before')
+    @classmethod
+    def normalize_severity(cls, value):
+        return value.strip().lower() if isinstance(value, str) else value
+
+
+class PolicyAnalysis(BaseModel):
+    """Structured output of one policy analysis"""
+    summary: str = Field(min_length=1)
+    risks: List[AnalysisRisk]
+    retired_risks: List[str] = []  # Titles of existing risks that no longer apply (incremental analysis)
+
+
+class CombinedRisk(AnalysisRisk):
+    policy: Literal["terms", "cookie", "privacy"]  # Policy the risk is reported under
+
+
+class CombinedAnalysis(BaseModel):
+    """Structured output of one call analyzing several policies of a company"""
+    summaries: Dict[Literal["terms", "cookie", "privacy"], str]
+    risks: List[CombinedRisk]
 
 
 class Company(BaseModel):
@@ -19,14 +50,23 @@ class Company(BaseModel):
     terms_text: Optional[str] = None
     terms_summary: Optional[str] = None
     terms_risks: List[Risk] = []
+    terms_url: Optional[str] = None
+    terms_checked_at: Optional[str] = None
+    terms_changed_at: Optional[str] = None
     # Cookie policy fields
     cookie_text: Optional[str] = None
     cookie_summary: Optional[str] = None
     cookie_risks: List[Risk] = []
+    cookie_url: Optional[str] = None
+    cookie_checked_at: Optional[str] = None
+    cookie_changed_at: Optional[str] = None
     # Privacy policy fields
     privacy_text: Optional[str] = None
     privacy_summary: Optional[str] = None
     privacy_risks: List[Risk] = []
+    privacy_url: Optional[str] = None
+    privacy_checked_at: Optional[str] = None
+    privacy_changed_at: Optional[str] = None
 
 
 class CompanyCreate(BaseModel):
@@ -45,14 +85,42 @@ class CompanyResponse(BaseModel):
     terms_text: Optional[str] = None
     terms_summary: Optional[str] = None
     terms_risks: List[Risk] = []
+    terms_url: Optional[str] = None
+    terms_checked_at: Optional[str] = None
+    terms_changed_at: Optional[str] = None
     # Cookie policy fields
     cookie_text: Optional[str] = None
     cookie_summary: Optional[str] = None
     cookie_risks: List[Risk] = []
+    cookie_url: Optional[str] = None
+    cookie_checked_at: Optional[str] = None
+    cookie_changed_at: Optional[str] = None
     # Privacy policy fields
     privacy_text: Optional[str] = None
     privacy_summary: Optional[str] = None
     privacy_risks: List[Risk] = []
+    privacy_url: Optional[str] = None
+    privacy_checked_at: Optional[str] = None
+    privacy_changed_at: Optional[str] = None
+
+
+class CompanySummary(BaseModel):
+    """List-view fields of a company, as returned by search"""
+    id: str
+    name: str
+    icon_url: Optional[str] = None
+    category: str
+    last_updated: Optional[str] = None
+    risk_counts: Dict[str, int] = {}  # Risks per severity over all policies
+    score: float = 0.0
+
+
+class CompanySearchResponse(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    items: List[CompanySummary]
+    facets: Dict[str, Dict[str, int]]  # "category" and "severity" -> value -> matching companies
 
 
 class RiskAnalysisRequest(BaseModel):
@@ -80,3 +148,24 @@ class UploadCookieRequest(BaseModel):
 class UploadPrivacyRequest(BaseModel):
     privacy_text: Optional[str] = None
     privacy_url: Optional[str] = None
+
+
+MAX_COMPARE_COMPANIES = 10
+
+
+class CompareChatRequest(BaseModel):
+    question: str = ''
+    company_ids: List[str]
+    per_company: int = Field(3, ge=1, le=10)  # Chunks retrieved per company
+    policy_type: Optional[Literal["terms", "cookie", "privacy"]] = None
+    # Server-held history, or the client's own (see _chat_session in main.py)
+    session_id: Optional[str] = None
+    history: Optional[List[Dict[str, Any]]] = None
+
+    @field_validator('company_ids')
+    @classmethod
+    def unique_company_ids(cls, value: List[str]) -> List[str]:
+        value = list(dict.fromkeys(value))
+        if not 2 <= len(value) <= MAX_COMPARE_COMPANIES:
+            raise ValueError(f"Provide between 2 and {MAX_COMPARE_COMPANIES} company_ids")
+        return value
@@ -0,0 +1,55 @@
+"""
+Re-analyze every company's policies after a prompt or model change.
+
+Policies already analyzed with the current prompt/model version are skipped,
+and progress is checkpointed so an interrupted run resumes where it stopped.
+
+Usage (from the backend directory):
+    python reanalyze_all.py --concurrency 4 --tokens-per-minute 200000
+"""
+import argparse
+import sys
+
+from services import BedrockService, DynamoDBService, ReanalysisRunner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-analyze all companies' policies")
+    parser.add_argument('--concurrency', type=int, default=4, help="Parallel analyses (default 4)")
+    parser.add_argument('--requests-per-minute', type=float, default=0,
+                        help="Bedrock request budget for this run (0 = unlimited)")
+    parser.add_argument('--tokens-per-minute', type=float, default=0,
+                        help="Bedrock token budget for this run (0 = unlimited)")
+    parser.add_argument('--policy-type', choices=['terms', 'cookie', 'privacy'],
+                        help="Only re-analyze one policy type")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default backend/.reanalyze_checkpoint.json)")
+    args = parser.parse_args()
+
+    runner = ReanalysisRunner(DynamoDBService(), BedrockService(), checkpoint_path=args.checkpoint)
+
+    def report(progress):
+        finished = progress['done'] + progress['failed']
+        eta = f"{progress['eta_seconds']}s" if progress['eta_seconds'] is not None else '?'
+        print(f"\r{finished}/{progress['total']} done, {progress['failed']} failed, "
+              f"{progress['items_per_minute']} items/min, ETA {eta}   ", end='', flush=True)
+
+    progress = runner.run(
+        concurrency=max(1, args.concurrency),
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        policy_types=[args.policy_type] if args.policy_type else None,
+        on_progress=report
+    )
+
+    print(f"\nRe-analyzed {progress['done']} policies ({progress['skipped']} already up to date, "
+          f"{progress['failed']} failed) in {progress['elapsed_seconds']}s")
+    for error in progress['errors']:
+        print(f"  {error}")
+    if progress['status'] == 'budget_exceeded':
+        print(f"Stopped: {progress['error']}. Run again to resume.")
+        return 3
+    return 0 if not progress['failed'] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Rebuild the cross-company risk aggregates served by GET /api/stats.
+
+The aggregates are updated on every company write. A failed update marks them
+dirty, and GET /api/stats then rebuilds them in the background; run this after
+writes made outside the app.
+
+Usage (from the backend directory):
+    python rebuild_stats.py
+"""
+import argparse
+import json
+import sys
+
+from services import DynamoDBService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the risk aggregates from a full table scan")
+    parser.add_argument('--show', action='store_true', help="Print the rebuilt stats")
+    args = parser.parse_args()
+
+    db = DynamoDBService()
+    result = db.rebuild_stats()
+    print(f"Rebuilt risk stats from {result['companies']} companies "
+          f"({result['counters']} counters, {result['risk_titles']} risk titles)")
+    if args.show:
+        print(json.dumps(db.get_risk_stats(), indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
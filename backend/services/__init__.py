@@ -2,5 +2,13 @@ from .bedrock import BedrockService
 from .dynamodb import DynamoDBService
 from .scraper import ScraperService
 from .vector_db import VectorDBService
+from .ingest import IngestPipeline, parse_ndjson
+from .refresh import PolicyRefresher
+from .policy_diff import IncrementalAnalyzer, describe_changes
+from .reanalyze import ReanalysisRunner
+from .warmup import Warmup
+from .chat_sessions import ChatSessions
+from .reconciler import VectorReconciler
 
-__all__ = ['BedrockService', 'DynamoDBService', 'ScraperService', 'VectorDBService']
+__all__ = ['BedrockService', 'DynamoDBService', 'ScraperService', 'VectorDBService', 'IngestPipeline', 'parse_ndjson', 'PolicyRefresher',
+           'IncrementalAnalyzer', 'describe_changes', 'ReanalysisRunner', 'Warmup', 'ChatSessions', 'VectorReconciler']
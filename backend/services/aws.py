@@ -0,0 +1,281 @@
+import boto3
+import os
+import threading
+import time
+from botocore.config import Config
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+from .metrics import CACHE_REQUESTS, ERRORS, STAGE_SECONDS
+from .tracing import tracer
+
+load_dotenv()
+
+# Connections pooled per client (botocore default is 10)
+MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '50'))
+MAX_ATTEMPTS = int(os.getenv('AWS_MAX_ATTEMPTS', '6'))
+
+# Timeouts (connect, read) in seconds per kind of operation
+TIMEOUT_PROFILES: Dict[str, Tuple[float, float]] = {
+    'default': (5, 60),
+    'bedrock-analysis': (5, 180),   # Long JSON analyses with 4k output tokens
+    'bedrock-chat': (5, 90),
+    'bedrock-embedding': (3, 20),
+    'dynamodb': (3, 10),
+    'opensearch': (5, 30),
+}
+
+# Error codes that mean we were throttled
+THROTTLE_CODES = {
+    'ThrottlingException', 'Throttling', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'RequestLimitExceeded',
+    'ServiceQuotaExceededException', 'SlowDown',
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at capacity per minute.
+    A capacity of 0 disables the bucket.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float) -> float:
+        """
+        Take amount from the bucket. Returns how long the caller must wait
+        before proceeding (the bucket is allowed to go negative, so large
+        requests don't starve behind small ones).
+        """
+        if self.capacity <= 0:
+            return 0.0
+        with self.lock:
+            self._refill()
+            # A single request larger than the bucket only waits for a full bucket
+            amount = min(amount, self.capacity)
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def give_back(self, amount: float):
+        """Return over-estimated tokens (or take more when amount is negative)"""
+        if self.capacity <= 0:
+            return
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class BedrockRateLimiter:
+    """
+    Client-side limiter for Bedrock requests and tokens per minute, shared by
+    every feature in the process so they don't overrun account quotas together.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.waited_seconds = 0.0
+        self.waits = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int):
+        """
+        Block until a request of estimated_tokens may be sent. This sleeps, so
+        async code must call Bedrock from a worker thread (asyncio.to_thread).
+        """
+        wait = max(self.requests.take(1), self.tokens.take(estimated_tokens))
+        if wait > 0:
+            with self._lock:
+                self.waits += 1
+                self.waited_seconds += wait
+            time.sleep(wait)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage is known"""
+        self.tokens.give_back(estimated_tokens - actual_tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 3)
+        }
+
+
+class AWSMetrics:
+    """Counters for calls, retries and throttles per AWS service"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def incr(self, service: str, name: str, amount: int = 1):
+        with self._lock:
+            service_counters = self.counters.setdefault(service, {"calls": 0, "retries": 0, "throttles": 0})
+            service_counters[name] = service_counters.get(name, 0) + amount
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {service: dict(values) for service, values in self.counters.items()}
+
+
+class AWSClientFactory:
+    """
+    Central factory for boto3 clients and resources.
+
+    One session is shared by all services. Clients use a tuned botocore config
+    (larger connection pool, adaptive retries, per-profile timeouts) and are
+    cached per (service, profile), so every caller reuses the same pools.
+    """
+
+    def __init__(self):
+        self.region = os.getenv('AWS_DEFAULT_REGION', 'us-west-2')
+        self._session: Optional[boto3.Session] = None
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._resources: Dict[Tuple[str, str], Any] = {}
+        # Stand-ins returned instead of real clients/resources (see benchmarks/aws_fakes.py)
+        self._overrides: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.RLock()
+        self.metrics = AWSMetrics()
+        self.bedrock_limiter = BedrockRateLimiter(
+            requests_per_minute=float(os.getenv('BEDROCK_REQUESTS_PER_MINUTE', '0')),
+            tokens_per_minute=float(os.getenv('BEDROCK_TOKENS_PER_MINUTE', '0'))
+        )
+
+    @property
+    def session(self) -> boto3.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = boto3.Session(
+                        region_name=self.region,
+                        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                        aws_session_token=os.getenv('AWS_SESSION_TOKEN')
+                    )
+        return self._session
+
+    def config(self, profile: str = 'default') -> Config:
+        connect_timeout, read_timeout = TIMEOUT_PROFILES.get(profile, TIMEOUT_PROFILES['default'])
+        return Config(
+            region_name=self.region,
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={'mode': 'adaptive', 'max_attempts': MAX_ATTEMPTS},
+            tcp_keepalive=True
+        )
+
+    def override(self, service: str, client: Any = None, resource: Any = None):
+        """Serve a stand-in for every profile of a service, e.g. for load tests without AWS"""
+        with self._lock:
+            if client is not None:
+                self._overrides[('client', service)] = client
+            if resource is not None:
+                self._overrides[('resource', service)] = resource
+            self._clients = {k: v for k, v in self._clients.items() if k[0] != service}
+            self._resources = {k: v for k, v in self._resources.items() if k[0] != service}
+
+    def client(self, service: str, profile: str = 'default'):
+        if ('client', service) in self._overrides:
+            return self._overrides[('client', service)]
+        key = (service, profile)
+        CACHE_REQUESTS.inc(cache='aws-client', result='hit' if key in self._clients else 'miss')
+        if key not in self._clients:
+            with self._lock:
+                if key not in self._clients:
+                    client = self.session.client(service, config=self.config(profile))
+                    self._register_metrics(client, service)
+                    self._clients[key] = client
+        return self._clients[key]
+
+    def resource(self, service: str, profile: str = 'default'):
+        if ('resource', service) in self._overrides:
+            return self._overrides[('resource', service)]
+        key = (service, profile)
+        if key not in self._resources:
+            with self._lock:
+                if key not in self._resources:
+                    resource = self.session.resource(service, config=self.config(profile))
+                    self._register_metrics(resource.meta.client, service)
+                    self._resources[key] = resource
+        return self._resources[key]
+
+    def credentials(self):
+        """Refreshable credentials of the shared session (for SigV4 signing outside boto3)"""
+        return self.session.get_credentials()
+
+    def _register_metrics(self, client, service: str):
+        metrics = self.metrics
+
+        def on_needs_retry(response=None, attempts=None, **kwargs):
+            if response is not None:
+                code = response[1].get('Error', {}).get('Code')
+                if code in THROTTLE_CODES:
+                    metrics.incr(service, 'throttles')
+            # Returning None leaves the retry decision to botocore
+
+        def before_call(model=None, context=None, **kwargs):
+            if context is not None:
+                context['metrics_start'] = time.perf_counter()
+                # Child of the caller's current span, ended in after-call
+                context['trace_span'] = tracer.start_span(f"{service}.{model.name}")
+
+        def after_call(parsed=None, model=None, context=None, **kwargs):
+            metrics.incr(service, 'calls')
+            retries = (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0)
+            if retries:
+                metrics.incr(service, 'retries', retries)
+            code = (parsed or {}).get('Error', {}).get('Code')
+            if code:
+                ERRORS.inc(component=service, type=code)
+            finish(model.name, context, retries=retries, error=code)
+
+        def after_call_error(exception=None, context=None, event_name='', **kwargs):
+            # Raised before a response was parsed (connection errors, timeouts)
+            ERRORS.inc(component=service, type=type(exception).__name__)
+            finish(event_name.rsplit('.', 1)[-1], context, error=type(exception).__name__)
+
+        def finish(operation, context, retries=0, error=None):
+            context = context or {}
+            start = context.pop('metrics_start', None)
+            if start is not None:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage=service, operation=operation)
+            span = context.pop('trace_span', None)
+            if span is not None:
+                span.set_attribute('retries', retries)
+                if error:
+                    span.error = error
+                span.end()
+
+        client.meta.events.register_first('needs-retry', on_needs_retry)
+        client.meta.events.register('before-call', before_call)
+        client.meta.events.register('after-call', after_call)
+        client.meta.events.register('after-call-error', after_call_error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "region": self.region,
+            "max_pool_connections": MAX_POOL_CONNECTIONS,
+            "retry_mode": "adaptive",
+            "max_attempts": MAX_ATTEMPTS,
+            "services": self.metrics.get_stats(),
+            "bedrock_limiter": self.bedrock_limiter.get_stats()
+        }
+
+
+# Shared by every service in the process
+aws_clients = AWSClientFactory()
@@ -1,195 +1,447 @@
-import boto3
 import json
-from typing import List, Dict, Any
+import logging
 import os
+import re
+import threading
+import time
+from typing import List, Dict, Any, Tuple, Type
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError
 from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
+
+from models import CombinedAnalysis, PolicyAnalysis
+from .aws import aws_clients
+from .ledger import current_usage_tags, usage_ledger
+from .metrics import BEDROCK_COST, BEDROCK_TOKENS, observe_stage
+from .model_router import ModelRouter, SONNET_MODEL_ID
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Bump when an analysis prompt changes, so /api/reanalyze-all re-runs stale results
+ANALYSIS_PROMPT_VERSION = "2"
+
+# Errors after which the same request is retried on the operation's fallback model
+FALLBACK_ERROR_CODES = {
+    'ThrottlingException', 'ModelTimeoutException', 'ServiceUnavailableException',
+    'ModelNotReadyException', 'InternalServerException', 'ModelErrorException',
+}
+
+# JSON schema of a risk as the model must report it (validated with models.AnalysisRisk)
+RISK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "description": "Short risk title"},
+        "description": {"type": "string", "description": "Detailed description of the risk"},
+        "severity": {"type": "string", "enum": ["low", "medium", "high"]}
+    },
+    "required": ["title", "description", "severity"]
+}
+
+# Tools the analysis prompts force the model to call, so output is schema-shaped JSON
+ANALYSIS_TOOL = {
+    "name": "record_policy_analysis",
+    "description": "Record the summary and risks found in a policy",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string", "description": "Brief 2-3 sentence summary"},
+            "risks": {"type": "array", "items": RISK_SCHEMA}
+        },
+        "required": ["summary", "risks"]
+    }
+}
+
+CHANGE_ANALYSIS_TOOL = {
+    "name": "record_change_analysis",
+    "description": "Record the analysis of the changed sections of a policy",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string", "description": "Updated 2-3 sentence summary of the whole policy"},
+            "risks": {
+                "type": "array",
+                "items": {
+                    **RISK_SCHEMA,
+                    "properties": {
+                        **RISK_SCHEMA["properties"],
+                        "section": {"type": "string", "description": "Label of the section, e.g. S1"}
+                    },
+                    "required": RISK_SCHEMA["required"] + ["section"]
+                }
+            },
+            "retired_risks": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Titles of existing risks that no longer apply"
+            }
+        },
+        "required": ["summary", "risks", "retired_risks"]
+    }
+}
+
+
+# Policy texts are truncated to this many characters per analysis
+POLICY_EXCERPT_CHARS = 8000
+
+# Changed-section text sent per change analysis; larger changes need a full analysis
+CHANGE_ANALYSIS_MAX_CHARS = 8000
+
+# Combined multi-policy analysis is used when the policy excerpts together fit this budget
+COMBINED_ANALYSIS = os.getenv('BEDROCK_COMBINED_ANALYSIS', 'true').lower() in ('1', 'true', 'yes')
+COMBINED_ANALYSIS_MAX_CHARS = int(os.getenv('BEDROCK_COMBINED_ANALYSIS_MAX_CHARS', '20000'))
+
+POLICY_LABELS = {
+    "terms": "Terms and Conditions",
+    "cookie": "Cookie Policy",
+    "privacy": "Privacy Policy"
+}
+
+# What each analysis prompt asks the model to focus on
+POLICY_FOCUS = {
+    "terms": [
+        "Data collection practices",
+        "Data sharing with third parties",
+        "User tracking and profiling",
+        "Content ownership and licensing",
+        "Account termination policies",
+        "Arbitration clauses",
+        "Privacy concerns",
+        "Financial implications",
+    ],
+    "cookie": [
+        "Types of cookies used (essential, functional, analytics, advertising)",
+        "Third-party cookies and trackers",
+        "Cookie duration and persistence",
+        "Cross-site tracking capabilities",
+        "User consent mechanisms",
+        "Opt-out options and their effectiveness",
+        "Data collected through cookies",
+        "Cookie sharing with third parties",
+    ],
+    "privacy": [
+        "Types of personal data collected (PII, sensitive data, biometrics)",
+        "Data retention periods and policies",
+        "Third-party data sharing and selling",
+        "User rights (access, deletion, portability)",
+        "Data security measures mentioned",
+        "International data transfers",
+        "Children's privacy protections",
+        "Automated decision-making and profiling",
+    ],
+}
+
+
+def _combined_analysis_tool(policy_types: List[str]) -> Dict[str, Any]:
+    """Tool for a combined analysis, restricted to the supplied policy types"""
+    return {
+        "name": "record_combined_analysis",
+        "description": "Record the summary of each policy and the risks across them, each reported once",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "summaries": {
+                    "type": "object",
+                    "properties": {
+                        p: {"type": "string", "description": f"Brief 2-3 sentence summary of the {POLICY_LABELS[p]}"}
+                        for p in policy_types
+                    },
+                    "required": list(policy_types)
+                },
+                "risks": {
+                    "type": "array",
+                    "items": {
+                        **RISK_SCHEMA,
+                        "properties": {
+                            **RISK_SCHEMA["properties"],
+                            "policy": {"type": "string", "enum": list(policy_types),
+                                       "description": "Policy the risk is reported under"}
+                        },
+                        "required": RISK_SCHEMA["required"] + ["policy"]
+                    }
+                }
+            },
+            "required": ["summaries", "risks"]
+        }
+    }
+
+
+class AnalysisOutputError(ValueError):
+    """Model output that still doesn't match the analysis schema after the repair call"""
+
+
+def _tool_input(response_body: Dict[str, Any], tool_name: str) -> Any:
+    """
+    Input of the forced tool call. If the model answered in text instead,
+    the JSON object in the text (or the raw text) is returned for validation.
+    """
+    text = ""
+    for block in response_body.get('content', []):
+        if block.get('type') == 'tool_use' and block.get('name') == tool_name:
+            return block.get('input')
+        if block.get('type') == 'text':
+            text += block.get('text', '')
+
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+    return text
+
+
+def _focus_list(policy_type: str) -> str:
+    return "\n".join(f"{i}. {item}" for i, item in enumerate(POLICY_FOCUS[policy_type], 1))
+
+
+def _section_excerpt(section: Dict[str, str]) -> str:
+    return f"{section['heading']}\n{section['text']}".strip()
+
+
+def _risk_dicts(analysis: PolicyAnalysis) -> List[Dict[str, Any]]:
+    return [risk.model_dump(exclude={'section'}) for risk in analysis.risks]
+
+
+class AnalysisStats:
+    """Per-operation counts of valid, repaired and failed structured outputs"""
 
-class BedrockService:
     def __init__(self):
-        self.client = boto3.client(
-            'bedrock-runtime',
-            region_name='us-west-2',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            aws_session_token=os.getenv('AWS_SESSION_TOKEN')
-        )
-        # Use cross-region inference profile for Claude Sonnet 4
-        self.model_id = "us.anthropic.claude-sonnet-4-20250514-v1:0"
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, operation: str, outcome: str):
+        with self._lock:
+            counts = self.counts.setdefault(operation, {"valid": 0, "repaired": 0, "failed": 0})
+            counts[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stats = {}
+            for operation, counts in self.counts.items():
+                total = sum(counts.values())
+                stats[operation] = {
+                    **counts,
+                    "total": total,
+                    # Share of first responses that failed validation (repaired or not)
+                    "parse_failure_rate": round((counts["repaired"] + counts["failed"]) / total, 4),
+                    "repair_success_rate": (
+                        round(counts["repaired"] / (counts["repaired"] + counts["failed"]), 4)
+                        if counts["repaired"] + counts["failed"] else None
+                    )
+                }
+            return stats
 
-    def analyze_terms_and_conditions(self, company_name: str, terms_text: str) -> Dict[str, Any]:
+
+class BedrockService:
+    def __init__(self):
+        self.aws = aws_clients
+        self.limiter = aws_clients.bedrock_limiter
+        # Use cross-region inference profile for Claude Sonnet 4 unless routed otherwise
+        self.model_id = SONNET_MODEL_ID
+        self.router = ModelRouter(default_model=self.model_id)
+        self.analysis_stats = AnalysisStats()
+        # Model that served this thread's last successful call (the fallback, if used)
+        self._served = threading.local()
+
+    def warmup(self):
+        """Resolve credentials and build the runtime client for every profile (no model calls)"""
+        if self.aws.credentials() is None:
+            raise RuntimeError("No AWS credentials found")
+        for profile in ('bedrock-analysis', 'bedrock-chat', 'bedrock-embedding'):
+            self.aws.client('bedrock-runtime', profile)
+
+    def analysis_version(self, policy_type: str, model_id: str = None) -> str:
         """
-        Analyze terms and conditions using Claude Sonnet 4 on Bedrock
-        Returns a summary and list of risks
+        Version tag stored with an analysis: prompt version plus the model that
+        produced it (the "model" of an analyze_* result), else the routed primary
         """
-        prompt = f"""You are an expert privacy analyst. Analyze the following Terms and Conditions for {company_name}.
-
-Provide your analysis in the following JSON format:
-{{
-    "summary": "A brief 2-3 sentence summary of what users agree to",
-    "risks": [
-        {{
-            "title": "Risk title",
-            "description": "Detailed description of the risk",
-            "severity": "low|medium|high"
-        }}
-    ]
-}}
+        return f"{ANALYSIS_PROMPT_VERSION}/{model_id or self.router.primary_model(f'analysis-{policy_type}')}"
 
-Focus on:
-1. Data collection practices
-2. Data sharing with third parties
-3. User tracking and profiling
-4. Content ownership and licensing
-5. Account termination policies
-6. Arbitration clauses
-7. Privacy concerns
-8. Financial implications
+    def _invoke_model(self, body: str, profile: str = 'bedrock-analysis', model_id: str = None,
+                      operation: str = None) -> Dict[str, Any]:
+        """
+        Invoke a Bedrock model through the shared client pool.
+        Unless model_id is given, the model is routed per operation; if the primary
+        model fails with a transient error the request is retried on the fallback.
+        """
+        if model_id:
+            return self._invoke_once(body, profile, model_id, operation)
 
-Terms and Conditions:
-{terms_text[:8000]}
+        primary, fallback = self.router.choose(operation, len(body))
+        try:
+            return self._invoke_once(body, profile, primary, operation)
+        except (ClientError, ConnectTimeoutError, ReadTimeoutError) as e:
+            code = e.response.get('Error', {}).get('Code') if isinstance(e, ClientError) else 'Timeout'
+            if not fallback or (code != 'Timeout' and code not in FALLBACK_ERROR_CODES):
+                raise
+            logger.warning("Model %s failed for %s (%s), falling back to %s", primary, operation, code, fallback)
+            return self._invoke_once(body, profile, fallback, operation)
+
+    def _invoke_once(self, body: str, profile: str, model_id: str, operation: str = None) -> Dict[str, Any]:
+        """
+        One model call. Waits on the shared rate limiter first, then settles it
+        with the real token usage and records latency for routing.
+        """
+        stage = 'embedding' if profile == 'bedrock-embedding' else 'bedrock'
+        if current_usage_tags().get('batch'):
+            # Batch jobs stop at the budget; interactive calls always go through
+            usage_ledger.check_batch(operation or stage)
 
-Respond ONLY with valid JSON, no additional text."""
+        request = json.loads(body)
+        # Rough estimate: ~4 characters per input token plus the requested output
+        estimated_tokens = len(body) // 4 + request.get('max_tokens', 0)
+        self.limiter.acquire(estimated_tokens)
 
+        start = time.perf_counter()
+        try:
+            with observe_stage(stage, operation or model_id, model=model_id, request_chars=len(body)) as span:
+                response = self.aws.client('bedrock-runtime', profile).invoke_model(
+                    modelId=model_id,
+                    body=body,
+                    contentType="application/json",
+                    accept="application/json"
+                )
+                response_body = json.loads(response['body'].read())
+                usage = response_body.get('usage', {})
+                input_tokens = usage.get('input_tokens', 0) or response_body.get('inputTextTokenCount', 0)
+                output_tokens = usage.get('output_tokens', 0)
+                cache_read_tokens = usage.get('cache_read_input_tokens', 0)
+                cache_write_tokens = usage.get('cache_creation_input_tokens', 0)
+                span.set_attribute('input_tokens', input_tokens)
+                span.set_attribute('output_tokens', output_tokens)
+        except Exception:
+            self.router.record(operation, model_id, (time.perf_counter() - start) * 1000, ok=False)
+            # Return the estimate, so a failed call (and its fallback retry) don't both hold it
+            self.limiter.settle(estimated_tokens, 0)
+            raise
+        self.router.record(operation, model_id, (time.perf_counter() - start) * 1000)
+
+        BEDROCK_TOKENS.inc(input_tokens, operation=operation or stage, model=model_id, direction='input')
+        BEDROCK_TOKENS.inc(output_tokens, operation=operation or stage, model=model_id, direction='output')
+        if cache_read_tokens or cache_write_tokens:
+            BEDROCK_TOKENS.inc(cache_read_tokens, operation=operation or stage, model=model_id, direction='cache_read')
+            BEDROCK_TOKENS.inc(cache_write_tokens, operation=operation or stage, model=model_id, direction='cache_write')
+        entry = usage_ledger.record(operation or stage, model_id, input_tokens, output_tokens,
+                                    cache_read_tokens, cache_write_tokens)
+        BEDROCK_COST.inc(entry['cost_usd'], operation=operation or stage, model=model_id)
+        actual_tokens = input_tokens + output_tokens
+        if actual_tokens:
+            self.limiter.settle(estimated_tokens, actual_tokens)
+
+        self._served.model_id = model_id
+        return response_body
+
+    def _structured_analysis(self, prompt: str, tool: Dict[str, Any], operation: str,
+                             model: Type[BaseModel] = PolicyAnalysis, max_tokens: int = 4096) -> Tuple[Any, str]:
+        """
+        Run an analysis prompt with the tool forced, so the model answers with
+        schema-shaped JSON, and validate it. Invalid output gets one repair call.
+        Returns (analysis, id of the model that analyzed the policy); a repair
+        only fixes the structure, so it doesn't change the model.
+        """
         body = json.dumps({
             "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 4096,
+            "max_tokens": max_tokens,
             "temperature": 0.3,
             "top_p": 0.9,
+            "tools": [tool],
+            "tool_choice": {"type": "tool", "name": tool['name']},
             "messages": [
                 {"role": "user", "content": prompt}
             ]
         })
 
-        response = self.client.invoke_model(
-            modelId=self.model_id,
-            body=body,
-            contentType="application/json",
-            accept="application/json"
-        )
-
-        response_body = json.loads(response['body'].read())
-        result_text = response_body['content'][0]['text']
-
-        # Parse the JSON response
+        response_body = self._invoke_model(body, profile='bedrock-analysis', operation=operation)
+        served = self._served.model_id
+        output = _tool_input(response_body, tool['name'])
         try:
-            # Clean up response if needed
-            result_text = result_text.strip()
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-
-            # Find JSON in response
-            start_idx = result_text.find('{')
-            end_idx = result_text.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                result_text = result_text[start_idx:end_idx]
-
-            analysis = json.loads(result_text.strip())
-            return analysis
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {
-                "summary": "Unable to parse analysis",
-                "risks": [
-                    {
-                        "title": "Analysis Error",
-                        "description": result_text[:500],
-                        "severity": "medium"
-                    }
-                ]
-            }
+            analysis = model.model_validate(output)
+            self.analysis_stats.record(operation, "valid")
+            return analysis, served
+        except ValidationError as e:
+            logger.warning("Invalid %s output (%d errors), attempting repair", operation, e.error_count())
+            error = e
 
-    def analyze_cookie_policy(self, company_name: str, cookie_text: str) -> Dict[str, Any]:
+        try:
+            analysis = self._repair_analysis(output, error, tool, model, max_tokens)
+        except (ValidationError, ClientError, ConnectTimeoutError, ReadTimeoutError) as e:
+            self.analysis_stats.record(operation, "failed")
+            raise AnalysisOutputError(f"{operation} output failed schema validation after repair: {e}") from e
+        self.analysis_stats.record(operation, "repaired")
+        return analysis, served
+
+    def _repair_analysis(self, output: Any, error: ValidationError, tool: Dict[str, Any],
+                         model: Type[BaseModel] = PolicyAnalysis, max_tokens: int = 4096) -> Any:
         """
-        Analyze cookie policy using Claude Sonnet 4 on Bedrock
-        Returns a summary and list of cookie-related risks
+        Ask the fast model to fix the structure of an invalid output. Only the
+        output and the validation errors are sent, not the policy text.
         """
-        prompt = f"""You are an expert privacy analyst specializing in cookie policies. Analyze the following Cookie Policy for {company_name}.
+        errors = "\n".join(
+            f"- {'.'.join(str(p) for p in e['loc']) or '(root)'}: {e['msg']}" for e in error.errors()
+        )
+        invalid = output if isinstance(output, str) else json.dumps(output)
 
-Provide your analysis in the following JSON format:
-{{
-    "cookie_summary": "A brief 2-3 sentence summary of the cookie practices",
-    "cookie_risks": [
-        {{
-            "title": "Risk title",
-            "description": "Detailed description of the cookie-related risk",
-            "severity": "low|medium|high"
-        }}
-    ]
-}}
+        prompt = f"""The following output of the {tool['name']} tool does not match its schema.
 
-Focus on:
-1. Types of cookies used (essential, functional, analytics, advertising)
-2. Third-party cookies and trackers
-3. Cookie duration and persistence
-4. Cross-site tracking capabilities
-5. User consent mechanisms
-6. Opt-out options and their effectiveness
-7. Data collected through cookies
-8. Cookie sharing with third parties
+Output:
+{invalid[:12000]}
 
-Cookie Policy:
-{cookie_text[:8000]}
+Validation errors:
+{errors}
 
-Respond ONLY with valid JSON, no additional text."""
+Call {tool['name']} again with the corrected output. Keep the content as it is and only fix what the errors point out."""
 
         body = json.dumps({
             "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 4096,
-            "temperature": 0.3,
-            "top_p": 0.9,
+            "max_tokens": max_tokens,
+            "temperature": 0,
+            "tools": [tool],
+            "tool_choice": {"type": "tool", "name": tool['name']},
             "messages": [
                 {"role": "user", "content": prompt}
             ]
         })
 
-        response = self.client.invoke_model(
-            modelId=self.model_id,
-            body=body,
-            contentType="application/json",
-            accept="application/json"
-        )
+        response_body = self._invoke_model(body, profile='bedrock-analysis', operation='analysis-repair')
+        return model.model_validate(_tool_input(response_body, tool['name']))
 
-        response_body = json.loads(response['body'].read())
-        result_text = response_body['content'][0]['text']
+    def analyze_terms_and_conditions(self, company_name: str, terms_text: str) -> Dict[str, Any]:
+        """
+        Analyze terms and conditions using Claude Sonnet 4 on Bedrock
+        Returns a summary and list of risks
+        """
+        prompt = f"""You are an expert privacy analyst. Analyze the following Terms and Conditions for {company_name}.
 
-        # Parse the JSON response
-        try:
-            # Clean up response if needed
-            result_text = result_text.strip()
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-
-            # Find JSON in response
-            start_idx = result_text.find('{')
-            end_idx = result_text.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                result_text = result_text[start_idx:end_idx]
-
-            analysis = json.loads(result_text.strip())
-            return analysis
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {
-                "cookie_summary": "Unable to parse cookie analysis",
-                "cookie_risks": [
-                    {
-                        "title": "Analysis Error",
-                        "description": result_text[:500],
-                        "severity": "medium"
-                    }
-                ]
-            }
+Record your analysis with the {ANALYSIS_TOOL['name']} tool: a brief 2-3 sentence summary of what users agree to, and the risks you found.
+
+Focus on:
+{_focus_list('terms')}
+
+Terms and Conditions:
+{terms_text[:POLICY_EXCERPT_CHARS]}"""
+
+        analysis, model_id = self._structured_analysis(prompt, ANALYSIS_TOOL, 'analysis-terms')
+        return {"summary": analysis.summary, "risks": _risk_dicts(analysis), "model": model_id}
+
+    def analyze_cookie_policy(self, company_name: str, cookie_text: str) -> Dict[str, Any]:
+        """
+        Analyze cookie policy using Claude Sonnet 4 on Bedrock
+        Returns a summary and list of cookie-related risks
+        """
+        prompt = f"""You are an expert privacy analyst specializing in cookie policies. Analyze the following Cookie Policy for {company_name}.
+
+Record your analysis with the {ANALYSIS_TOOL['name']} tool: a brief 2-3 sentence summary of the cookie practices, and the cookie-related risks you found.
+
+Focus on:
+{_focus_list('cookie')}
+
+Cookie Policy:
+{cookie_text[:POLICY_EXCERPT_CHARS]}"""
+
+        analysis, model_id = self._structured_analysis(prompt, ANALYSIS_TOOL, 'analysis-cookie')
+        return {"cookie_summary": analysis.summary, "cookie_risks": _risk_dicts(analysis), "model": model_id}
 
     def analyze_privacy_policy(self, company_name: str, privacy_text: str) -> Dict[str, Any]:
         """
@@ -198,84 +450,159 @@ Respond ONLY with valid JSON, no additional text."""
         """
         prompt = f"""You are an expert privacy analyst specializing in privacy policies. Analyze the following Privacy Policy for {company_name}.
 
-Provide your analysis in the following JSON format:
-{{
-    "privacy_summary": "A brief 2-3 sentence summary of the privacy practices",
-    "privacy_risks": [
-        {{
-            "title": "Risk title",
-            "description": "Detailed description of the privacy-related risk",
-            "severity": "low|medium|high"
-        }}
-    ]
-}}
+Record your analysis with the {ANALYSIS_TOOL['name']} tool: a brief 2-3 sentence summary of the privacy practices, and the privacy-related risks you found.
 
 Focus on:
-1. Types of personal data collected (PII, sensitive data, biometrics)
-2. Data retention periods and policies
-3. Third-party data sharing and selling
-4. User rights (access, deletion, portability)
-5. Data security measures mentioned
-6. International data transfers
-7. Children's privacy protections
-8. Automated decision-making and profiling
+{_focus_list('privacy')}
 
 Privacy Policy:
-{privacy_text[:8000]}
+{privacy_text[:POLICY_EXCERPT_CHARS]}"""
 
-Respond ONLY with valid JSON, no additional text."""
+        analysis, model_id = self._structured_analysis(prompt, ANALYSIS_TOOL, 'analysis-privacy')
+        return {"privacy_summary": analysis.summary, "privacy_risks": _risk_dicts(analysis), "model": model_id}
 
-        body = json.dumps({
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 4096,
-            "temperature": 0.3,
-            "top_p": 0.9,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        })
+    def analyze_policy(self, policy_type: str, company_name: str, policy_text: str) -> Dict[str, Any]:
+        """
+        Analyze any policy type ("terms", "cookie" or "privacy")
+        Returns {"risks": [...], "summary": "...", "model": "..."} regardless of policy type
+        """
+        if policy_type == "terms":
+            analysis = self.analyze_terms_and_conditions(company_name=company_name, terms_text=policy_text)
+            return {"risks": analysis.get('risks', []), "summary": analysis.get('summary', ''),
+                    "model": analysis.get('model')}
+        if policy_type == "cookie":
+            analysis = self.analyze_cookie_policy(company_name=company_name, cookie_text=policy_text)
+            return {"risks": analysis.get('cookie_risks', []), "summary": analysis.get('cookie_summary', ''),
+                    "model": analysis.get('model')}
+        if policy_type == "privacy":
+            analysis = self.analyze_privacy_policy(company_name=company_name, privacy_text=policy_text)
+            return {"risks": analysis.get('privacy_risks', []), "summary": analysis.get('privacy_summary', ''),
+                    "model": analysis.get('model')}
+        raise ValueError(f"Unknown policy type: {policy_type}")
+
+    def combined_analysis_fits(self, texts: Dict[str, str]) -> bool:
+        """Whether the supplied policies can be analyzed together in one call"""
+        supplied = [text for text in texts.values() if text]
+        excerpt_chars = sum(min(len(text), POLICY_EXCERPT_CHARS) for text in supplied)
+        return COMBINED_ANALYSIS and len(supplied) > 1 and excerpt_chars <= COMBINED_ANALYSIS_MAX_CHARS
+
+    def analyze_policies_combined(self, company_name: str, texts: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze several policies of a company in one call
+        Returns {policy_type: {"risks": [...], "summary": "...", "model": "..."}}. A practice stated in more than
+        one policy is reported once, under the policy it belongs to most. Policies the model
+        left without a summary are omitted so the caller can analyze them separately.
+        """
+        policy_types = [p for p in POLICY_LABELS if texts.get(p)]
+        tool = _combined_analysis_tool(policy_types)
 
-        response = self.client.invoke_model(
-            modelId=self.model_id,
-            body=body,
-            contentType="application/json",
-            accept="application/json"
+        focus = "\n\n".join(
+            f"{POLICY_LABELS[p]} ({p}):\n{_focus_list(p)}" for p in policy_types
+        )
+        documents = "\n\n".join(
+            f"<{p}>\n{texts[p][:POLICY_EXCERPT_CHARS]}\n</{p}>" for p in policy_types
         )
 
-        response_body = json.loads(response['body'].read())
-        result_text = response_body['content'][0]['text']
+        prompt = f"""You are an expert privacy analyst. Analyze the following policies of {company_name} together.
 
-        # Parse the JSON response
-        try:
-            # Clean up response if needed
-            result_text = result_text.strip()
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-
-            # Find JSON in response
-            start_idx = result_text.find('{')
-            end_idx = result_text.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                result_text = result_text[start_idx:end_idx]
-
-            analysis = json.loads(result_text.strip())
-            return analysis
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {
-                "privacy_summary": "Unable to parse privacy analysis",
-                "privacy_risks": [
-                    {
-                        "title": "Analysis Error",
-                        "description": result_text[:500],
-                        "severity": "medium"
-                    }
-                ]
-            }
+Record your analysis with the {tool['name']} tool: a brief 2-3 sentence summary of each policy, and the risks you found across them.
+Report each risk once. When several policies describe the same practice (for example sharing data with third parties), report it under the policy where it belongs most and mention the others in its description.
+
+Focus on:
+
+{focus}
+
+Policies:
+
+{documents}"""
+
+        analysis, model_id = self._structured_analysis(prompt, tool, 'analysis-combined', model=CombinedAnalysis,
+                                                       max_tokens=8192)
+
+        results = {
+            p: {"risks": [], "summary": analysis.summaries[p], "model": model_id}
+            for p in policy_types if analysis.summaries.get(p)
+        }
+        seen = set()
+        for risk in analysis.risks:
+            # Drop duplicates the model reported under more than one policy
+            key = re.sub(r'\W+', ' ', risk.title).strip().lower()
+            if risk.policy not in results or key in seen:
+                continue
+            seen.add(key)
+            results[risk.policy]["risks"].append(risk.model_dump(include={'title', 'description', 'severity'}))
+        return results
+
+    def changes_fit(self, changed_sections: List[Dict[str, str]]) -> bool:
+        """Whether all changed sections fit one change analysis"""
+        return sum(len(_section_excerpt(s)) for s in changed_sections) <= CHANGE_ANALYSIS_MAX_CHARS
+
+    def analyze_policy_changes(self, policy_type: str, company_name: str,
+                               changed_sections: List[Dict[str, str]],
+                               removed_sections: List[Dict[str, str]],
+                               existing_risks: List[Dict[str, Any]],
+                               previous_summary: str) -> Dict[str, Any]:
+        """
+        Analyze only the changed/added sections of a policy
+        Returns new risks tagged with section_id, titles of retired risks, an updated
+        summary and the ids of the sections analyzed: only whole sections within
+        CHANGE_ANALYSIS_MAX_CHARS are sent (see changes_fit)
+        """
+        policy_label = POLICY_LABELS.get(policy_type, "Terms and Conditions")
+
+        labels = {}
+        sections_text = ""
+        budget = CHANGE_ANALYSIS_MAX_CHARS
+        for section in changed_sections:
+            excerpt = _section_excerpt(section)
+            if len(excerpt) > budget:
+                continue
+            label = f"S{len(labels) + 1}"
+            labels[label] = section["id"]
+            sections_text += f"\n[{label}]\n{excerpt}\n"
+            budget -= len(excerpt)
+        if not labels:
+            raise ValueError("No changed section fits the change analysis budget")
+
+        removed_text = "\n".join(
+            f"- {s['heading'] or s['text'][:80]}" for s in removed_sections
+        ) or "(none)"
+        risks_text = "\n".join(
+            f"- {r.get('title')} ({r.get('severity')})" for r in existing_risks
+        ) or "(none)"
+
+        prompt = f"""You are an expert privacy analyst. The {policy_label} for {company_name} has been updated.
+Only the changed or added sections are shown below, each with a label like [S1].
+
+Current summary:
+{previous_summary or "(none)"}
+
+Existing risks:
+{risks_text}
+
+Sections that were removed or replaced:
+{removed_text}
+
+Changed or added sections:
+{sections_text}
+
+Record your analysis with the {CHANGE_ANALYSIS_TOOL['name']} tool: an updated 2-3 sentence summary of the whole policy reflecting the changes, the risks found in the changed or added sections (each with the label of its section, e.g. S1), and the titles of existing risks that no longer apply because of removed or replaced sections.
+
+Only report risks found in the changed or added sections. Reuse an existing risk title if the same risk still applies."""
+
+        analysis, model_id = self._structured_analysis(prompt, CHANGE_ANALYSIS_TOOL, 'analysis-changes')
+        risks = [
+            {**risk.model_dump(exclude={'section'}), "section_id": labels.get(risk.section)}
+            for risk in analysis.risks
+        ]
+
+        return {
+            "summary": analysis.summary,
+            "risks": risks,
+            "retired_risks": analysis.retired_risks,
+            "analyzed_section_ids": list(labels.values()),
+            "model": model_id
+        }
 
     def chat_about_terms(self, company_name: str, terms_text: str, user_question: str) -> str:
         """
@@ -302,16 +629,37 @@ Provide a clear, concise answer. If the terms don't address this question, say s
             ]
         })
 
-        response = self.client.invoke_model(
-            modelId=self.model_id,
-            body=body,
-            contentType="application/json",
-            accept="application/json"
-        )
-
-        response_body = json.loads(response['body'].read())
+        response_body = self._invoke_model(body, profile='bedrock-chat', operation='company-chat')
         return response_body['content'][0]['text']
 
+    def summarize_conversation(self, previous_summary: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Fold chat turns into a running summary, so long chat sessions keep a
+        bounded prompt
+        """
+        transcript = "\n\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+        prompt = f"""Update the summary of a conversation about companies' Terms and Conditions, Cookie Policies and Privacy Policies.
+
+Current summary:
+{previous_summary or '(none yet)'}
+
+New messages:
+{transcript}
+
+Write the updated summary in at most 150 words. Keep the companies, policies and facts discussed, the user's concerns and any open questions; drop pleasantries and repeated detail. Reply with the summary only."""
+
+        body = json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 400,
+            "temperature": 0.2,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        })
+
+        response_body = self._invoke_model(body, profile='bedrock-chat', operation='summarization')
+        return response_body['content'][0]['text'].strip()
+
     def generate_embedding(self, text: str) -> List[float]:
         """
         Generate embeddings using Amazon Titan Embeddings model
@@ -323,20 +671,15 @@ Provide a clear, concise answer. If the terms don't address this question, say s
             "inputText": text
         })
 
-        response = self.client.invoke_model(
-            modelId="amazon.titan-embed-text-v1",
-            body=body,
-            contentType="application/json",
-            accept="application/json"
-        )
-
-        response_body = json.loads(response['body'].read())
+        response_body = self._invoke_model(body, profile='bedrock-embedding', model_id="amazon.titan-embed-text-v1")
         return response_body['embedding']
 
     def rag_chat(self, user_question: str, context_chunks: List[Dict[str, Any]],
-                 conversation_history: List[Dict[str, str]] = None) -> str:
+                 conversation_history: List[Dict[str, str]] = None,
+                 conversation_summary: str = None) -> str:
         """
-        Answer user questions using RAG with retrieved context
+        Answer user questions using RAG with retrieved context. conversation_summary
+        stands in for turns older than conversation_history (chat sessions).
         """
         # Build context from retrieved chunks
         context_text = ""
@@ -364,6 +707,8 @@ You have access to excerpts from various companies' legal documents including te
 Always cite which company and document type you're referencing in your answers.
 If the retrieved context doesn't contain relevant information, say so honestly.
 Be concise but thorough in your explanations."""
+        if conversation_summary:
+            system_prompt += f"\n\nSummary of the earlier conversation:\n{conversation_summary}"
 
         user_prompt = f"""Based on the following excerpts from company policies:
 {context_text}
@@ -383,12 +728,5 @@ Please provide a clear, helpful answer based on the context above."""
             "messages": messages
         })
 
-        response = self.client.invoke_model(
-            modelId=self.model_id,
-            body=body,
-            contentType="application/json",
-            accept="application/json"
-        )
-
-        response_body = json.loads(response['body'].read())
+        response_body = self._invoke_model(body, profile='bedrock-chat', operation='rag-chat')
         return response_body['content'][0]['text']
@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from .aws import aws_clients
+
+logger = logging.getLogger(__name__)
+
+# "memory" (per process, default) or "dynamodb" (shared by every instance, expired by TTL)
+SESSION_STORE = os.getenv('CHAT_SESSION_STORE', 'memory').lower()
+SESSION_TABLE = os.getenv('CHAT_SESSION_TABLE', 'ChatSessions')
+SESSION_TTL_SECONDS = int(os.getenv('CHAT_SESSION_TTL_SECONDS', str(24 * 3600)))
+MAX_MEMORY_SESSIONS = int(os.getenv('CHAT_MAX_MEMORY_SESSIONS', '10000'))
+
+# Older turns are folded into the rolling summary once the kept messages pass
+# either limit; the most recent messages are always kept verbatim
+SUMMARY_THRESHOLD_TOKENS = int(os.getenv('CHAT_SUMMARY_THRESHOLD_TOKENS', '1500'))
+MAX_MESSAGES = 6  # rag_chat forwards at most this many
+KEEP_RECENT_MESSAGES = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough estimate, ~4 characters per token (as for the Bedrock limiter)"""
+    return len(text or '') // 4
+
+
+class MemorySessionStore:
+    """Sessions in process memory, least recently used evicted past max_sessions"""
+
+    def __init__(self, max_sessions: int = MAX_MEMORY_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if session['expires_at'] <= time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return {**session, 'messages': list(session['messages'])}
+
+    def put(self, session: Dict[str, Any]):
+        with self._lock:
+            self._sessions[session['id']] = session
+            self._sessions.move_to_end(session['id'])
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+class DynamoDBSessionStore:
+    """Sessions in a DynamoDB table; DynamoDB's TTL removes them after expires_at"""
+
+    def __init__(self, table_name: str = SESSION_TABLE):
+        self.table_name = table_name
+        self._table = None
+        self._lock = threading.Lock()
+
+    @property
+    def table(self):
+        """Lazy initialize table (created with TTL enabled if missing)"""
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    self._table = self._ensure_table()
+        return self._table
+
+    def _ensure_table(self):
+        dynamodb = aws_clients.resource('dynamodb', 'dynamodb')
+        try:
+            table = dynamodb.Table(self.table_name)
+            table.load()
+            return table
+        except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+            table = dynamodb.create_table(
+                TableName=self.table_name,
+                KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            table.wait_until_exists()
+            dynamodb.meta.client.update_time_to_live(
+                TableName=self.table_name,
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expires_at'}
+            )
+            return table
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={'id': session_id}).get('Item')
+        # TTL deletion can lag by hours, so expiry is also checked on read
+        if item is None or int(item['expires_at']) <= time.time():
+            return None
+        return {**item, 'expires_at': int(item['expires_at']), 'turns': int(item.get('turns', 0))}
+
+    def put(self, session: Dict[str, Any]):
+        self.table.put_item(Item={**session, 'expires_at': Decimal(int(session['expires_at']))})
+
+    def delete(self, session_id: str) -> bool:
+        response = self.table.delete_item(Key={'id': session_id}, ReturnValues='ALL_OLD')
+        return bool(response.get('Attributes'))
+
+
+class ChatSessions:
+    """
+    Server-held chat history. Each session keeps the last few messages
+    verbatim plus a rolling summary of everything older, so the prompt (and
+    the client's request) stays bounded however long the conversation runs.
+    """
+
+    def __init__(self, bedrock_service, store=None, ttl_seconds: int = SESSION_TTL_SECONDS,
+                 threshold_tokens: int = SUMMARY_THRESHOLD_TOKENS):
+        self.bedrock = bedrock_service
+        self.store = store or (DynamoDBSessionStore() if SESSION_STORE == 'dynamodb' else MemorySessionStore())
+        self.ttl_seconds = ttl_seconds
+        self.threshold_tokens = threshold_tokens
+
+    def create(self) -> Dict[str, Any]:
+        now = datetime.utcnow().isoformat()
+        session = {
+            'id': str(uuid.uuid4()),
+            'created_at': now,
+            'updated_at': now,
+            'expires_at': int(time.time()) + self.ttl_seconds,
+            'summary': '',
+            'messages': [],
+            'turns': 0,
+        }
+        self.store.put(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        return self.store.delete(session_id)
+
+    def record_turn(self, session: Dict[str, Any], question: str, answer: str) -> Dict[str, Any]:
+        """Append a question and its answer, compact older turns, save and extend the TTL"""
+        session['messages'] = session['messages'] + [
+            {'role': 'user', 'content': question},
+            {'role': 'assistant', 'content': answer},
+        ]
+        session['turns'] = session.get('turns', 0) + 1
+        self._compact(session)
+        session['updated_at'] = datetime.utcnow().isoformat()
+        session['expires_at'] = int(time.time()) + self.ttl_seconds
+        self.store.put(session)
+        return session
+
+    def _needs_compaction(self, messages: List[Dict[str, str]]) -> bool:
+        if len(messages) <= KEEP_RECENT_MESSAGES:
+            return False
+        return (len(messages) > MAX_MESSAGES
+                or sum(estimate_tokens(m['content']) for m in messages) > self.threshold_tokens)
+
+    def _compact(self, session: Dict[str, Any]):
+        messages = session['messages']
+        if not self._needs_compaction(messages):
+            return
+        older, recent = messages[:-KEEP_RECENT_MESSAGES], messages[-KEEP_RECENT_MESSAGES:]
+        try:
+            session['summary'] = self.bedrock.summarize_conversation(session.get('summary', ''), older)
+            session['messages'] = recent
+        except Exception as e:
+            # Keep the turns for the next attempt, but never beyond what rag_chat would forward
+            logger.warning("Chat summary failed for session %s: %s", session['id'], e)
+            session['messages'] = messages[-MAX_MESSAGES:]
@@ -0,0 +1,140 @@
+"""
+Serialized company responses, bypassing response_model validation.
+
+Items written by DynamoDBService already have the CompanyResponse shape (risks
+are validated when they are analyzed), so the read endpoints copy the response
+fields straight into JSON and keep the bytes per company until its version
+changes. Items that don't have the expected types still go through the model.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from models import CompanyResponse, Risk
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard json module is used without it
+    orjson = None
+
+# Serialized companies kept in memory (least recently used evicted past the limit)
+CACHE_MAX_BYTES = int(float(os.getenv('COMPANY_JSON_CACHE_MB', '64')) * 1024 * 1024)
+
+FIELDS = tuple(CompanyResponse.model_fields)
+RISK_FIELDS = tuple(Risk.model_fields)
+REQUIRED = tuple(name for name, field in CompanyResponse.model_fields.items() if field.is_required())
+LIST_FIELDS = tuple(name for name in FIELDS if name.endswith('_risks'))
+RISK_REQUIRED = ('title', 'description', 'severity')
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON (as Starlette's JSONResponse renders it)"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def version(item: Dict[str, Any]) -> Tuple[Any, ...]:
+    """
+    Changes whenever a response field does: last_updated, plus the *_checked_at
+    stamps, which mark_policy_checked writes without touching last_updated
+    """
+    return (item.get('last_updated'), item.get('terms_checked_at'),
+            item.get('cookie_checked_at'), item.get('privacy_checked_at'))
+
+
+def etag(items: Iterable[Dict[str, Any]]) -> str:
+    """
+    Strong ETag of the serialized companies, from their ids and versions only
+    (the bytes are a function of them), so it costs no serialization or body hash
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for item in items:
+        digest.update(repr((item['id'], version(item))).encode('utf-8'))
+    return f'"{digest.hexdigest()}"'
+
+
+def _risk_payload(risk: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(risk, dict) or not all(isinstance(risk.get(k), str) for k in RISK_REQUIRED):
+        return None
+    section_id = risk.get('section_id')
+    if section_id is not None and not isinstance(section_id, str):
+        return None
+    return {name: risk.get(name) for name in RISK_FIELDS}
+
+
+def company_payload(item: Dict[str, Any]) -> Dict[str, Any]:
+    """The CompanyResponse fields of an item, as the model would dump them"""
+    payload = {}
+    for name in FIELDS:
+        value = item.get(name)
+        if name in LIST_FIELDS:
+            if name not in item:
+                payload[name] = []
+                continue
+            risks = [_risk_payload(risk) for risk in value] if isinstance(value, list) else [None]
+            if None in risks:
+                break
+            payload[name] = risks
+        elif (value is None and name not in REQUIRED) or isinstance(value, str):
+            payload[name] = value
+        else:
+            break
+    else:
+        return payload
+    # Unexpected types: validate (and coerce, or raise) as the response_model did
+    return CompanyResponse.model_validate(item).model_dump(mode='json')
+
+
+class CompanyJSONCache:
+    """Serialized CompanyResponse per company id, reused while the item's version is unchanged"""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Tuple[Any, ...], bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def company(self, item: Dict[str, Any]) -> bytes:
+        key, current = item['id'], version(item)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == current:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        data = dumps(company_payload(item))
+        if len(data) <= self.max_bytes:
+            with self._lock:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= len(old[1])
+                self._entries[key] = (current, data)
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return data
+
+    def listing(self, items: Iterable[Dict[str, Any]]) -> bytes:
+        """JSON array of the companies, joined from the per-company bytes"""
+        return b'[' + b','.join(self.company(item) for item in items) + b']'
+
+    def discard(self, company_id: str):
+        with self._lock:
+            entry = self._entries.pop(company_id, None)
+            if entry is not None:
+                self._bytes -= len(entry[1])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses,
+                    'encoder': 'orjson' if orjson is not None else 'json'}
@@ -1,13 +1,53 @@
-import boto3
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 from typing import List, Dict, Any, Optional
-import os
+from collections import Counter
+from decimal import Decimal
+import hashlib
+import logging
+import re
+import threading
+import time
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
 
+from .aws import aws_clients
+from .metrics import ERRORS, error_type
+from .risk_stats import (STATS_ID, STATS_ID_PREFIX, TITLE_SHARD_LIMIT, TITLE_SHARD_TRIM_TO, TITLE_SHARDS,
+                         TITLE_TRIM_BATCH, company_counters, difference, is_stats_id,
+                         policy_counters, shard_titles, summarize, title_shard_id)
+from .search_index import CompanySearchIndex
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+POLICY_TYPES = ('terms', 'cookie', 'privacy')
+# Pending vector deletes (VectorDBService tombstones), one attribute per tombstone.
+# The id has the aggregates' prefix, so company reads skip it.
+TOMBSTONES_ID = f"{STATS_ID_PREFIX}#vector_tombstones"
+# Condition for writes to a company: without it UpdateItem would recreate a
+# purged company as a nameless item, or update one that is being deleted
+LIVE_COMPANY = 'attribute_exists(id) AND attribute_not_exists(deleted_at)'
+# Reads of the aggregate items left unprocessed (throttling) are retried this many
+# times, waiting STATS_READ_BACKOFF_SECONDS and doubling
+STATS_READ_ATTEMPTS = 5
+STATS_READ_BACKOFF_SECONDS = 0.05
+
+
+class StatsUnavailableError(Exception):
+    """Some aggregate items could not be read, so the stats would be incomplete"""
+
+
+def policy_hash(text: str) -> str:
+    """
+    Hash of a policy's normalized text (whitespace collapsed), used to detect
+    whether a re-crawled policy actually changed
+    """
+    normalized = re.sub(r'\s+', ' ', text or '').strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
 
 class DynamoDBService:
     def __init__(self):
@@ -15,17 +55,17 @@ class DynamoDBService:
         self.table_name = 'TermsAndConditions'
         self._table = None
         self._initialized = False
+        # Company search, kept current by the write methods below
+        self.search_index = CompanySearchIndex(self.get_all_companies, POLICY_TYPES)
+        # Set when an aggregate update failed, until the next rebuild
+        self.stats_dirty_since: Optional[str] = None
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._rebuild_lock = threading.Lock()
 
     def _get_dynamodb(self):
         """Lazy initialize DynamoDB resource"""
         if self.dynamodb is None:
-            self.dynamodb = boto3.resource(
-                'dynamodb',
-                region_name='us-west-2',
-                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-                aws_session_token=os.getenv('AWS_SESSION_TOKEN')
-            )
+            self.dynamodb = aws_clients.resource('dynamodb', 'dynamodb')
         return self.dynamodb
 
     @property
@@ -57,8 +97,12 @@ class DynamoDBService:
             # Re-raise with better error message
             raise Exception(f"Failed to connect to DynamoDB: {e}. Make sure AWS credentials are set.")
 
-    def get_all_companies(self) -> List[Dict[str, Any]]:
-        """Get all companies from the database"""
+    def warmup(self):
+        """Describe the table, opening a pooled connection. Raises if DynamoDB is unreachable."""
+        self._ensure_table_exists()
+
+    def _scan_companies(self) -> List[Dict[str, Any]]:
+        """Every company item, deleted (tombstoned) ones included"""
         response = self.table.scan()
         items = response.get('Items', [])
 
@@ -67,21 +111,35 @@ class DynamoDBService:
             response = self.table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
             items.extend(response.get('Items', []))
 
-        return items
+        # Aggregate records share the table
+        return [item for item in items if not is_stats_id(item['id'])]
+
+    def get_all_companies(self) -> List[Dict[str, Any]]:
+        """Get all companies from the database"""
+        return [item for item in self._scan_companies() if 'deleted_at' not in item]
+
+    def get_deleted_companies(self) -> List[Dict[str, Any]]:
+        """Companies deleted but not yet purged"""
+        return [item for item in self._scan_companies() if 'deleted_at' in item]
 
     def get_company(self, company_id: str) -> Optional[Dict[str, Any]]:
         """Get a single company by ID"""
-        response = self.table.get_item(Key={'id': company_id})
-        return response.get('Item')
+        if is_stats_id(company_id):
+            return None
+        item = self.table.get_item(Key={'id': company_id}).get('Item')
+        return item if item and 'deleted_at' not in item else None
 
     def create_company(self, name: str, category: str, terms_text: str,
                        terms_risks: List[Dict] = None, terms_summary: str = None,
                        icon_url: str = None, cookie_text: str = None,
                        cookie_summary: str = None, cookie_risks: List[Dict] = None,
                        privacy_text: str = None, privacy_summary: str = None,
-                       privacy_risks: List[Dict] = None) -> Dict[str, Any]:
+                       privacy_risks: List[Dict] = None, terms_url: str = None,
+                       cookie_url: str = None, privacy_url: str = None,
+                       analysis_versions: Dict[str, str] = None) -> Dict[str, Any]:
         """Create a new company entry"""
         company_id = str(uuid.uuid4())
+        now = datetime.utcnow().isoformat()
 
         item = {
             'id': company_id,
@@ -103,99 +161,476 @@ class DynamoDBService:
             'privacy_risks': privacy_risks or []
         }
 
+        # Source tracking for scheduled change detection
+        sources = {'terms': terms_url, 'cookie': cookie_url, 'privacy': privacy_url}
+        for policy_type in POLICY_TYPES:
+            text = item[f'{policy_type}_text']
+            if sources[policy_type]:
+                item[f'{policy_type}_url'] = sources[policy_type]
+            if text:
+                item[f'{policy_type}_hash'] = policy_hash(text)
+                item[f'{policy_type}_checked_at'] = now
+                item[f'{policy_type}_changed_at'] = now
+            if analysis_versions and analysis_versions.get(policy_type):
+                item[f'{policy_type}_analysis_version'] = analysis_versions[policy_type]
+
         self.table.put_item(Item=item)
+        self._apply_stats(*company_counters(item, POLICY_TYPES))
+        self.search_index.upsert(item)
         return item
 
-    def update_company_analysis(self, company_id: str, terms_risks: List[Dict], terms_summary: str) -> bool:
+    def update_company_analysis(self, company_id: str, terms_risks: List[Dict], terms_summary: str,
+                                analysis_version: str = None) -> bool:
         """Update company with T&C analysis results"""
+        # category is rewritten unchanged so UPDATED_OLD returns it for the aggregates;
+        # a deleted company is left alone, as its counters were already subtracted
+        update_expr = 'SET terms_risks = :r, terms_summary = :s, last_updated = :u, category = if_not_exists(category, :nc)'
+        expr_values = {
+            ':r': terms_risks,
+            ':s': terms_summary,
+            ':u': datetime.utcnow().isoformat(),
+            ':nc': 'uncategorized'
+        }
+        if analysis_version:
+            # Prompt/model version, so bulk re-analysis can skip up-to-date results
+            update_expr += ', terms_analysis_version = :v'
+            expr_values[':v'] = analysis_version
+
         try:
-            self.table.update_item(
+            response = self.table.update_item(
                 Key={'id': company_id},
-                UpdateExpression='SET terms_risks = :r, terms_summary = :s, last_updated = :u',
-                ExpressionAttributeValues={
-                    ':r': terms_risks,
-                    ':s': terms_summary,
-                    ':u': datetime.utcnow().isoformat()
-                }
+                UpdateExpression=update_expr,
+                ExpressionAttributeValues=expr_values,
+                ConditionExpression=LIVE_COMPANY,
+                ReturnValues='UPDATED_OLD'
             )
+            self._record_policy_stats('terms', response.get('Attributes', {}), terms_risks)
+            self.search_index.update_policy(company_id, 'terms', terms_risks, terms_summary, expr_values[':u'])
             return True
         except Exception as e:
-            print(f"Error updating company: {e}")
+            logger.error("Error updating company: %s", e)
             return False
 
-    def update_cookie_text(self, company_id: str, cookie_text: str) -> bool:
-        """Update company with cookie policy text"""
+    def update_policy_text(self, company_id: str, policy_type: str, policy_text: str,
+                           source_url: str = None) -> bool:
+        """
+        Update a policy's text (and optionally its source URL), recording its
+        content hash and when it was last checked and changed.
+        The replaced text is kept in {policy_type}_previous_text for change diffs.
+        Text with the stored hash only marks the policy checked, so the previous
+        text and changed_at of the last real change are kept.
+        """
+        now = datetime.utcnow().isoformat()
+        update_expr = (f'SET {policy_type}_previous_text = if_not_exists({policy_type}_text, :empty), '
+                       f'{policy_type}_text = :t, {policy_type}_hash = :h, '
+                       f'{policy_type}_checked_at = :u, {policy_type}_changed_at = :u, last_updated = :u')
+        expr_values = {
+            ':t': policy_text,
+            ':h': policy_hash(policy_text),
+            ':u': now,
+            ':empty': ''
+        }
+        if source_url:
+            update_expr += f', {policy_type}_url = :url'
+            expr_values[':url'] = source_url
+
         try:
             self.table.update_item(
                 Key={'id': company_id},
-                UpdateExpression='SET cookie_text = :ct, last_updated = :u',
-                ExpressionAttributeValues={
-                    ':ct': cookie_text,
-                    ':u': datetime.utcnow().isoformat()
-                }
+                UpdateExpression=update_expr,
+                ExpressionAttributeValues=expr_values,
+                ConditionExpression=(f'{LIVE_COMPANY} AND '
+                                     f'(attribute_not_exists({policy_type}_hash) OR {policy_type}_hash <> :h)')
             )
             return True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.error("Error updating %s text: %s", policy_type, e)
+                return False
         except Exception as e:
-            print(f"Error updating cookie text: {e}")
+            logger.error("Error updating %s text: %s", policy_type, e)
             return False
 
-    def update_company_cookie_analysis(self, company_id: str, cookie_risks: List[Dict], cookie_summary: str) -> bool:
-        """Update company with cookie policy analysis results"""
+        # Same text as stored (or the company is gone, which fails this write too)
+        update_expr = f'SET {policy_type}_checked_at = :u'
+        expr_values = {':u': now}
+        if source_url:
+            update_expr += f', {policy_type}_url = :url, last_updated = :u'
+            expr_values[':url'] = source_url
         try:
             self.table.update_item(
                 Key={'id': company_id},
-                UpdateExpression='SET cookie_risks = :cr, cookie_summary = :cs, last_updated = :u',
-                ExpressionAttributeValues={
-                    ':cr': cookie_risks,
-                    ':cs': cookie_summary,
-                    ':u': datetime.utcnow().isoformat()
-                }
+                UpdateExpression=update_expr,
+                ExpressionAttributeValues=expr_values,
+                ConditionExpression=LIVE_COMPANY
             )
             return True
         except Exception as e:
-            print(f"Error updating cookie analysis: {e}")
+            logger.error("Error updating %s text: %s", policy_type, e)
             return False
 
-    def update_privacy_text(self, company_id: str, privacy_text: str) -> bool:
-        """Update company with privacy policy text"""
+    def mark_policy_checked(self, company_id: str, policy_type: str, content_hash: str = None) -> bool:
+        """Record that a policy's source was re-crawled without changes"""
+        update_expr = f'SET {policy_type}_checked_at = :c'
+        expr_values = {':c': datetime.utcnow().isoformat()}
+        if content_hash:
+            # Backfill hashes for policies stored before hashing existed
+            update_expr += f', {policy_type}_hash = :h'
+            expr_values[':h'] = content_hash
+
         try:
             self.table.update_item(
                 Key={'id': company_id},
-                UpdateExpression='SET privacy_text = :pt, last_updated = :u',
-                ExpressionAttributeValues={
-                    ':pt': privacy_text,
-                    ':u': datetime.utcnow().isoformat()
-                }
+                UpdateExpression=update_expr,
+                ExpressionAttributeValues=expr_values,
+                ConditionExpression=LIVE_COMPANY
+            )
+            return True
+        except Exception as e:
+            logger.error("Error marking %s checked: %s", policy_type, e)
+            return False
+
+    def update_policy_analysis(self, company_id: str, policy_type: str,
+                               risks: List[Dict], summary: str, analysis_version: str = None) -> bool:
+        """Update analysis results for any policy type"""
+        if policy_type == 'terms':
+            return self.update_company_analysis(company_id, terms_risks=risks, terms_summary=summary,
+                                                analysis_version=analysis_version)
+        if policy_type == 'cookie':
+            return self.update_company_cookie_analysis(company_id, cookie_risks=risks, cookie_summary=summary,
+                                                       analysis_version=analysis_version)
+        if policy_type == 'privacy':
+            return self.update_company_privacy_analysis(company_id, privacy_risks=risks, privacy_summary=summary,
+                                                        analysis_version=analysis_version)
+        raise ValueError(f"Unknown policy type: {policy_type}")
+
+    def update_cookie_text(self, company_id: str, cookie_text: str, cookie_url: str = None) -> bool:
+        """Update company with cookie policy text"""
+        return self.update_policy_text(company_id, 'cookie', cookie_text, cookie_url)
+
+    def update_company_cookie_analysis(self, company_id: str, cookie_risks: List[Dict], cookie_summary: str,
+                                       analysis_version: str = None) -> bool:
+        """Update company with cookie policy analysis results"""
+        update_expr = 'SET cookie_risks = :cr, cookie_summary = :cs, last_updated = :u, category = if_not_exists(category, :nc)'
+        expr_values = {
+            ':cr': cookie_risks,
+            ':cs': cookie_summary,
+            ':u': datetime.utcnow().isoformat(),
+            ':nc': 'uncategorized'
+        }
+        if analysis_version:
+            # Prompt/model version, so bulk re-analysis can skip up-to-date results
+            update_expr += ', cookie_analysis_version = :v'
+            expr_values[':v'] = analysis_version
+
+        try:
+            response = self.table.update_item(
+                Key={'id': company_id},
+                UpdateExpression=update_expr,
+                ExpressionAttributeValues=expr_values,
+                ConditionExpression=LIVE_COMPANY,
+                ReturnValues='UPDATED_OLD'
             )
+            self._record_policy_stats('cookie', response.get('Attributes', {}), cookie_risks)
+            self.search_index.update_policy(company_id, 'cookie', cookie_risks, cookie_summary, expr_values[':u'])
             return True
         except Exception as e:
-            print(f"Error updating privacy text: {e}")
+            logger.error("Error updating cookie analysis: %s", e)
             return False
 
-    def update_company_privacy_analysis(self, company_id: str, privacy_risks: List[Dict], privacy_summary: str) -> bool:
+    def update_privacy_text(self, company_id: str, privacy_text: str, privacy_url: str = None) -> bool:
+        """Update company with privacy policy text"""
+        return self.update_policy_text(company_id, 'privacy', privacy_text, privacy_url)
+
+    def update_company_privacy_analysis(self, company_id: str, privacy_risks: List[Dict], privacy_summary: str,
+                                        analysis_version: str = None) -> bool:
         """Update company with privacy policy analysis results"""
+        update_expr = 'SET privacy_risks = :pr, privacy_summary = :ps, last_updated = :u, category = if_not_exists(category, :nc)'
+        expr_values = {
+            ':pr': privacy_risks,
+            ':ps': privacy_summary,
+            ':u': datetime.utcnow().isoformat(),
+            ':nc': 'uncategorized'
+        }
+        if analysis_version:
+            # Prompt/model version, so bulk re-analysis can skip up-to-date results
+            update_expr += ', privacy_analysis_version = :v'
+            expr_values[':v'] = analysis_version
+
         try:
-            self.table.update_item(
+            response = self.table.update_item(
                 Key={'id': company_id},
-                UpdateExpression='SET privacy_risks = :pr, privacy_summary = :ps, last_updated = :u',
-                ExpressionAttributeValues={
-                    ':pr': privacy_risks,
-                    ':ps': privacy_summary,
-                    ':u': datetime.utcnow().isoformat()
-                }
+                UpdateExpression=update_expr,
+                ExpressionAttributeValues=expr_values,
+                ConditionExpression=LIVE_COMPANY,
+                ReturnValues='UPDATED_OLD'
             )
+            self._record_policy_stats('privacy', response.get('Attributes', {}), privacy_risks)
+            self.search_index.update_policy(company_id, 'privacy', privacy_risks, privacy_summary, expr_values[':u'])
             return True
         except Exception as e:
-            print(f"Error updating privacy analysis: {e}")
+            logger.error("Error updating privacy analysis: %s", e)
             return False
 
     def delete_company(self, company_id: str) -> bool:
-        """Delete a company"""
+        """
+        Delete a company: one conditional write marks it deleted, which hides it
+        from every read, and its share of the risk aggregates is subtracted.
+        The item is removed by purge_company once its vector chunks are gone.
+        Returns False if there is no such company.
+        """
+        if is_stats_id(company_id):
+            return False
         try:
-            self.table.delete_item(Key={'id': company_id})
-            return True
-        except Exception:
+            response = self.table.update_item(
+                Key={'id': company_id},
+                UpdateExpression='SET deleted_at = :d',
+                ConditionExpression=LIVE_COMPANY,
+                ExpressionAttributeValues={':d': datetime.utcnow().isoformat()},
+                ReturnValues='ALL_OLD'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.error("Error deleting company %s: %s", company_id, e)
             return False
+        main, titles = company_counters(response.get('Attributes', {}), POLICY_TYPES)
+        self._apply_stats({k: -v for k, v in main.items()}, {k: -v for k, v in titles.items()})
+        self.search_index.remove(company_id)
+        return True
+
+    def purge_company(self, company_id: str) -> bool:
+        """Remove a deleted company's item. False if it isn't a deleted company."""
+        try:
+            self.table.delete_item(
+                Key={'id': company_id},
+                ConditionExpression='attribute_exists(deleted_at)'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def get_tombstones(self) -> Dict[str, Dict[str, Any]]:
+        """Pending vector deletes by key"""
+        item = self.table.get_item(Key={'id': TOMBSTONES_ID}).get('Item') or {}
+        return {
+            key: {name: (int(value) if value == int(value) else float(value)) if isinstance(value, Decimal) else value
+                  for name, value in tombstone.items()}
+            for key, tombstone in item.items() if isinstance(tombstone, dict)
+        }
+
+    def put_tombstone(self, key: str, tombstone: Dict[str, Any], replaces: List[str] = ()):
+        """Store a pending vector delete, removing the ones it supersedes in the same write"""
+        names = {'#k': key}
+        values = {':t': {name: Decimal(str(value)) if isinstance(value, float) else value
+                         for name, value in tombstone.items()}}
+        update_expr = 'SET #k = :t'
+        if replaces:
+            names.update({f'#r{i}': replaced for i, replaced in enumerate(replaces)})
+            update_expr += ' REMOVE ' + ', '.join(f'#r{i}' for i in range(len(replaces)))
+        self.table.update_item(
+            Key={'id': TOMBSTONES_ID},
+            UpdateExpression=update_expr,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+
+    def remove_tombstone(self, key: str):
+        """Clear a purged vector delete"""
+        self.table.update_item(
+            Key={'id': TOMBSTONES_ID},
+            UpdateExpression='REMOVE #k',
+            ExpressionAttributeNames={'#k': key}
+        )
+
+    def _add_counters(self, item_id: str, deltas: Dict[str, int], return_values: str = 'NONE') -> Dict[str, Any]:
+        """Atomically add deltas to the counters of one aggregate item"""
+        names, values, adds = {}, {':u': datetime.utcnow().isoformat()}, []
+        for i, (name, delta) in enumerate(deltas.items()):
+            names[f'#c{i}'] = name
+            values[f':c{i}'] = delta
+            adds.append(f'#c{i} :c{i}')
+        response = self.table.update_item(
+            Key={'id': item_id},
+            UpdateExpression='SET last_updated = :u ADD ' + ', '.join(adds),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues=return_values
+        )
+        return response.get('Attributes', {})
+
+    def _add_title_counters(self, shard: int, deltas: Dict[str, int]):
+        """
+        Add title deltas to a shard, then remove titles whose count reached zero
+        and keep title_count (titles in the shard) current. A shard over
+        TITLE_SHARD_LIMIT titles is trimmed.
+        """
+        item_id = title_shard_id(shard)
+        # title_count (+0) comes back only if the shard already tracks it
+        old = self._add_counters(item_id, {**deltas, 'title_count': 0}, return_values='UPDATED_OLD')
+        if 'title_count' not in old:
+            # Shard written before title_count existed: count (and trim) it once
+            self._trim_title_shard(item_id)
+            return
+        created = [name for name in deltas if name not in old]
+        emptied = [name for name, delta in deltas.items() if old.get(name, 0) + delta <= 0]
+        if not created and not emptied:
+            return
+
+        names = {f'#e{i}': name for i, name in enumerate(emptied)}
+        values = {':n': len(created) - len(emptied)}
+        update_expr = 'ADD title_count :n'
+        condition = None
+        if emptied:
+            update_expr = 'REMOVE ' + ', '.join(names) + ' ' + update_expr
+            # Left alone if a concurrent write raised one again
+            values[':zero'] = 0
+            condition = ' AND '.join(f'{placeholder} <= :zero' for placeholder in names)
+        try:
+            response = self.table.update_item(
+                Key={'id': item_id},
+                UpdateExpression=update_expr,
+                ExpressionAttributeValues=values,
+                ReturnValues='UPDATED_NEW',
+                **({'ExpressionAttributeNames': names, 'ConditionExpression': condition} if emptied else {})
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            response = self.table.update_item(
+                Key={'id': item_id},
+                UpdateExpression='ADD title_count :n',
+                ExpressionAttributeValues={':n': len(created)},
+                ReturnValues='UPDATED_NEW'
+            )
+        if response.get('Attributes', {}).get('title_count', 0) > TITLE_SHARD_LIMIT:
+            self._trim_title_shard(item_id)
+
+    def _trim_title_shard(self, item_id: str):
+        """Drop a shard's zero counts and, past TITLE_SHARD_LIMIT, its least frequent titles"""
+        item = self.table.get_item(Key={'id': item_id}).get('Item') or {}
+        titles = sorted(((name, value) for name, value in item.items() if name.startswith('t#')),
+                        key=lambda kv: kv[1], reverse=True)
+        keep = [name for name, value in titles if value > 0]
+        if len(keep) > TITLE_SHARD_LIMIT:
+            # Trim below the limit, so the next new titles don't trim again
+            keep = keep[:TITLE_SHARD_TRIM_TO]
+        kept = set(keep)
+        dropped = [name for name, _ in titles if name not in kept]
+        for start in range(0, len(dropped), TITLE_TRIM_BATCH):
+            batch = dropped[start:start + TITLE_TRIM_BATCH]
+            names = {f'#d{i}': name for i, name in enumerate(batch)}
+            self.table.update_item(
+                Key={'id': item_id},
+                UpdateExpression='REMOVE ' + ', '.join(names),
+                ExpressionAttributeNames=names
+            )
+        self.table.update_item(
+            Key={'id': item_id},
+            UpdateExpression='SET title_count = :n',
+            ExpressionAttributeValues={':n': len(keep)}
+        )
+        if dropped:
+            logger.info("Trimmed %d risk titles from %s", len(dropped), item_id)
+
+    def _apply_stats(self, main: Dict[str, int], titles: Dict[str, int]):
+        """Apply counter deltas to the aggregates; a failure never fails the company write"""
+        main = {k: v for k, v in main.items() if v}
+        titles = {k: v for k, v in titles.items() if v}
+        try:
+            if main:
+                self._add_counters(STATS_ID, main)
+            for shard, deltas in shard_titles(titles).items():
+                self._add_title_counters(shard, deltas)
+        except Exception as e:
+            self._stats_failed(e)
+
+    def _stats_failed(self, error: Exception):
+        """
+        Count a failed aggregate update and mark the aggregates dirty (in this
+        process, and on the totals item for the others), so they get rebuilt
+        """
+        ERRORS.inc(component='risk_stats', type=error_type(error))
+        logger.warning("Risk stats update failed, aggregates marked for rebuild: %s", error)
+        now = datetime.utcnow().isoformat()
+        self.stats_dirty_since = self.stats_dirty_since or now
+        try:
+            self.table.update_item(
+                Key={'id': STATS_ID},
+                UpdateExpression='SET dirty_since = if_not_exists(dirty_since, :d)',
+                ExpressionAttributeValues={':d': now}
+            )
+        except Exception as e:
+            logger.warning("Marking risk stats dirty failed: %s", e)
+
+    def _record_policy_stats(self, policy_type: str, old: Dict[str, Any], risks: List[Dict]):
+        """Apply the change from a policy's previous risks (UPDATED_OLD attributes) to its new ones"""
+        category = old.get('category')
+        new_main, new_titles = policy_counters(category, policy_type, risks)
+        old_main, old_titles = policy_counters(category, policy_type, old.get(f'{policy_type}_risks'))
+        self._apply_stats(difference(new_main, old_main), difference(new_titles, old_titles))
+
+    def get_risk_stats(self, top: int = 20) -> Dict[str, Any]:
+        """Cross-company risk aggregates, read from a fixed number of items"""
+        table = self.table
+        keys = [{'id': STATS_ID}] + [{'id': title_shard_id(shard)} for shard in range(TITLE_SHARDS)]
+        items = {}
+        for attempt in range(STATS_READ_ATTEMPTS):
+            if attempt:
+                time.sleep(STATS_READ_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            response = self._get_dynamodb().batch_get_item(
+                RequestItems={table.name: {'Keys': keys}}
+            )
+            items.update((item['id'], item) for item in response.get('Responses', {}).get(table.name, []))
+            keys = response.get('UnprocessedKeys', {}).get(table.name, {}).get('Keys', [])
+            if not keys:
+                break
+        else:
+            raise StatsUnavailableError(
+                f"Risk stats items still unprocessed after {STATS_READ_ATTEMPTS} attempts: "
+                f"{', '.join(key['id'] for key in keys)}")
+        titles = [item for item_id, item in items.items() if item_id != STATS_ID]
+        stats = summarize(items.get(STATS_ID, {}), titles, top=top)
+        stats["dirty_since"] = stats["dirty_since"] or self.stats_dirty_since
+        return stats
+
+    def rebuild_stats_in_background(self) -> bool:
+        """Run rebuild_stats in a background thread. Returns False if one is already running."""
+        with self._rebuild_lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return False
+            self._rebuild_thread = threading.Thread(target=self._rebuild_safely, daemon=True)
+            self._rebuild_thread.start()
+            return True
+
+    def _rebuild_safely(self):
+        try:
+            result = self.rebuild_stats()
+            logger.info("Rebuilt risk stats from %d companies", result['companies'])
+        except Exception as e:
+            logger.exception("Risk stats rebuild failed: %s", e)
+
+    def rebuild_stats(self) -> Dict[str, Any]:
+        """Recompute the aggregates from a full scan, replacing the stored counters (and the dirty mark)"""
+        self.stats_dirty_since = None
+        # Deleted companies were subtracted when they were deleted
+        companies = self.get_all_companies()
+        main: Counter = Counter()
+        titles: Counter = Counter()
+        for company in companies:
+            company_main, company_titles = company_counters(company, POLICY_TYPES)
+            main.update(company_main)
+            titles.update(company_titles)
+
+        now = datetime.utcnow().isoformat()
+        self.table.put_item(Item={'id': STATS_ID, 'last_updated': now, **main})
+        shards = shard_titles(titles, limit=TITLE_SHARD_LIMIT)
+        for shard in range(TITLE_SHARDS):
+            shard_counters = shards.get(shard, {})
+            self.table.put_item(Item={'id': title_shard_id(shard), 'last_updated': now,
+                                      'title_count': len(shard_counters), **shard_counters})
+        return {'companies': len(companies), 'counters': len(main), 'risk_titles': len(titles)}
 
     def migrate_schema(self) -> Dict[str, Any]:
         """
@@ -281,12 +716,18 @@ class DynamoDBService:
                 self.table.update_item(
                     Key={'id': company_id},
                     UpdateExpression=update_expr,
-                    ExpressionAttributeValues=expr_values
+                    ExpressionAttributeValues=expr_values,
+                    ConditionExpression=LIVE_COMPANY
                 )
                 migrated += 1
             except Exception as e:
                 errors.append(f"{company.get('name', company_id)}: {str(e)}")
 
+        if migrated:
+            # Renamed risk fields change what each company contributes
+            self.rebuild_stats()
+            self.search_index.invalidate()
+
         return {
             'migrated': migrated,
             'skipped': skipped,
@@ -0,0 +1,264 @@
+"""
+Response compression and conditional GET, as pure ASGI middleware (the body
+is never re-wrapped by BaseHTTPMiddleware, and file responses still stream).
+"""
+import hashlib
+import os
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only without it
+    brotli = None
+
+# Responses smaller than this are sent as they are
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Fast enough to compress per request
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/x-ndjson',
+                      'application/xml', 'image/svg+xml')
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _set_header(headers: List[Tuple[bytes, bytes]], name: bytes, value: str):
+    headers[:] = [(k, v) for k, v in headers if k.lower() != name]
+    headers.append((name, value.encode('latin-1')))
+
+
+def _remove_header(headers: List[Tuple[bytes, bytes]], name: bytes):
+    headers[:] = [(k, v) for k, v in headers if k.lower() != name]
+
+
+def _entity_tags(if_none_match: str) -> List[str]:
+    """Tags of an If-None-Match header; W/ is dropped, as If-None-Match compares weakly"""
+    return [tag.strip().removeprefix('W/') for tag in if_none_match.split(',') if tag.strip()]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """"br" or "gzip", whichever the client accepts (brotli preferred), else None"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in (('br', 'gzip') if brotli is not None else ('gzip',)):
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish() if self.encoding == 'br' else self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Brotli (if the brotli module is installed) or gzip for compressible
+    responses of at least minimum_size bytes, negotiated by Accept-Encoding.
+
+    A compressed representation gets its own strong ETag ("<etag>-gzip"); the
+    suffix is removed from If-None-Match on the way in, so the conditional
+    check below this middleware compares against the uncompressed ETag.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(_header(scope['headers'], b'accept-encoding'))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        suffix = f'-{encoding}"'
+        client_tags: List[str] = []
+        if_none_match = _header(scope['headers'], b'if-none-match')
+        if if_none_match:
+            client_tags = _entity_tags(if_none_match)
+            inner_tags = [tag[:-len(suffix)] + '"' if tag.endswith(suffix) else tag for tag in client_tags]
+            headers = list(scope['headers'])
+            _set_header(headers, b'if-none-match', ', '.join(inner_tags))
+            scope = {**scope, 'headers': headers}
+
+        start = None
+        compressor: Optional[_Compressor] = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message['type'] == 'http.response.start':
+                start = message
+                if message['status'] == 304:
+                    # Echo the representation's tag the client holds
+                    headers = list(message.get('headers', []))
+                    etag = _header(headers, b'etag')
+                    if etag and etag[:-1] + suffix in client_tags:
+                        _set_header(headers, b'etag', etag[:-1] + suffix)
+                        _set_header(headers, b'vary', self._vary(headers))
+                    await send({**message, 'headers': headers})
+                    start = None
+                return
+            if message['type'] != 'http.response.body' or start is None:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                headers = list(start.get('headers', []))
+                if not self._eligible(start['status'], headers, body, more_body):
+                    if self._compressible_type(headers):
+                        _set_header(headers, b'vary', self._vary(headers))
+                    await send({**start, 'headers': headers})
+                    await send(message)
+                    start = None
+                    return
+                compressor = _Compressor(encoding)
+                _set_header(headers, b'content-encoding', encoding)
+                _set_header(headers, b'vary', self._vary(headers))
+                etag = _header(headers, b'etag')
+                if etag and etag.endswith('"'):
+                    _set_header(headers, b'etag', etag[:-1] + suffix)
+                data = compressor.compress(body) + (b'' if more_body else compressor.finish())
+                if more_body:
+                    _remove_header(headers, b'content-length')
+                else:
+                    _set_header(headers, b'content-length', str(len(data)))
+                await send({**start, 'headers': headers})
+                await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+                return
+
+            data = compressor.compress(body) + (b'' if more_body else compressor.finish())
+            await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _compressible_type(headers: List[Tuple[bytes, bytes]]) -> bool:
+        content_type = (_header(headers, b'content-type') or '').lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _vary(headers: List[Tuple[bytes, bytes]]) -> str:
+        vary = _header(headers, b'vary')
+        if vary and 'accept-encoding' in vary.lower():
+            return vary
+        return f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+
+    def _eligible(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, more_body: bool) -> bool:
+        if status != 200 or _header(headers, b'content-encoding') or not self._compressible_type(headers):
+            return False
+        if more_body:
+            # Streamed: go by the declared length (unknown length = compress)
+            length = _header(headers, b'content-length')
+            return length is None or int(length) >= self.minimum_size
+        return len(body) >= self.minimum_size
+
+
+class ConditionalGetMiddleware:
+    """
+    304 Not Modified for GET requests whose If-None-Match matches the
+    response's ETag. Responses under etag_prefixes that have no ETag get a
+    strong one from a hash of their body; those and responses that already
+    carry an ETag (static files) are marked Cache-Control: no-cache, so
+    browsers keep them but revalidate on every use.
+    """
+
+    def __init__(self, app, etag_prefixes: Iterable[str] = ()):
+        self.app = app
+        self.etag_prefixes = tuple(etag_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            await self.app(scope, receive, send)
+            return
+        if_none_match = _header(scope['headers'], b'if-none-match')
+        client_tags = _entity_tags(if_none_match) if if_none_match else []
+        # HEAD responses have no body to hash
+        hash_body = scope['method'] == 'GET' and bool(self.etag_prefixes) and scope['path'].startswith(self.etag_prefixes)
+
+        start = None
+        not_modified = False
+
+        async def send_conditional(message):
+            nonlocal start, not_modified
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                etag = _header(headers, b'etag')
+                if message['status'] != 200 or (etag is None and not hash_body):
+                    await send(message)
+                    return
+                if _header(headers, b'cache-control') is None:
+                    _set_header(headers, b'cache-control', 'no-cache')
+                start = {**message, 'headers': headers}
+                if etag is not None:
+                    not_modified = etag in client_tags or '*' in client_tags
+                    await send(self._not_modified(start) if not_modified else start)
+                    start = None
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+            if not_modified:
+                # Drop the body of the full response
+                if not message.get('more_body', False):
+                    await send({'type': 'http.response.body', 'body': b''})
+                return
+            if start is None:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            headers = start['headers']
+            if message.get('more_body', False):
+                # Streamed: no body hash to tag it with
+                await send(start)
+                await send(message)
+                start = None
+                return
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            _set_header(headers, b'etag', etag)
+            if etag in client_tags or '*' in client_tags:
+                await send(self._not_modified(start))
+                await send({'type': 'http.response.body', 'body': b''})
+            else:
+                await send(start)
+                await send(message)
+            start = None
+
+        await self.app(scope, receive, send_conditional)
+
+    @staticmethod
+    def _not_modified(start):
+        keep = (b'etag', b'cache-control', b'vary', b'last-modified', b'x-request-id')
+        headers = [(k, v) for k, v in start['headers'] if k.lower() in keep]
+        return {'type': 'http.response.start', 'status': 304, 'headers': headers}
@@ -0,0 +1,288 @@
+import asyncio
+import contextvars
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from models import UploadTermsRequest
+from .dynamodb import POLICY_TYPES
+from .ledger import tag_usage, usage_context
+from .tracing import tracer
+
+
+# Default number of concurrent calls allowed per stage
+DEFAULT_STAGE_CONCURRENCY = {
+    "scrape": 8,      # URL fetches
+    "analyze": 4,     # Bedrock analysis calls (one per policy)
+    "store": 8,       # DynamoDB writes
+    "index": 2,       # Vector indexing (embeds every chunk)
+}
+
+# Finished jobs are kept for status polling this long, and at most this many
+JOB_TTL_SECONDS = float(os.getenv('INGEST_JOB_TTL_SECONDS', '3600'))
+MAX_FINISHED_JOBS = int(os.getenv('INGEST_MAX_FINISHED_JOBS', '100'))
+
+
+class IngestJob:
+    """
+    Status of one bulk ingest run.
+    Each item tracks the company through the scrape → analyze → store → index stages.
+    """
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow().isoformat()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.items = items
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> str:
+        if self.finished is not None:
+            return "completed"
+        if self.started is not None:
+            return "running"
+        return "queued"
+
+    def to_dict(self, include_items: bool = True) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for item in self.items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+
+        elapsed = None
+        throughput = None
+        if self.started is not None:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+            done = counts.get("done", 0) + counts.get("partial", 0)
+            if elapsed > 0:
+                throughput = round(done / elapsed * 60, 2)
+
+        result = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "total": len(self.items),
+            "counts": counts,
+            "elapsed_seconds": round(elapsed, 2) if elapsed is not None else None,
+            "companies_per_minute": throughput,
+        }
+        if include_items:
+            result["items"] = [
+                {k: v for k, v in item.items() if k != "request"} for item in self.items
+            ]
+        return result
+
+
+def parse_ndjson(body: str) -> List[Dict[str, Any]]:
+    """
+    Parse NDJSON lines into job items.
+    Lines that are not valid UploadTermsRequest objects become failed items
+    so they show up in the job status instead of aborting the whole upload.
+    """
+    items = []
+    for line_no, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+
+        item = {
+            "line": line_no,
+            "company_name": None,
+            "company_id": None,
+            "status": "queued",
+            "stage": None,
+            "errors": [],
+            "request": None,
+        }
+        try:
+            request = UploadTermsRequest(**json.loads(line))
+            item["company_name"] = request.company_name
+            if not request.terms_text and not request.terms_url:
+                raise ValueError("Either terms_text or terms_url is required")
+            item["request"] = request
+        except (json.JSONDecodeError, ValidationError, ValueError, TypeError) as e:
+            item["status"] = "failed"
+            item["errors"].append(f"Invalid line: {str(e)}")
+        items.append(item)
+
+    return items
+
+
+class IngestPipeline:
+    """
+    Bulk company ingestion as a staged pipeline.
+
+    Every company flows through scrape → analyze → store → index. Each stage has
+    its own concurrency limit, so while some companies are being analyzed by
+    Bedrock, others are being scraped, written to DynamoDB or indexed.
+    """
+
+    def __init__(self, db_service, bedrock_service, scraper_service, vector_service,
+                 concurrency: Optional[Dict[str, int]] = None):
+        self.db = db_service
+        self.bedrock = bedrock_service
+        self.scraper = scraper_service
+        self.vector = vector_service
+        self.concurrency = {**DEFAULT_STAGE_CONCURRENCY, **(concurrency or {})}
+        self.jobs: Dict[str, IngestJob] = {}
+
+    def create_job(self, items: List[Dict[str, Any]]) -> IngestJob:
+        self._evict_finished()
+        job = IngestJob(items)
+        self.jobs[job.id] = job
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestJob]:
+        self._evict_finished()
+        return self.jobs.get(job_id)
+
+    def _evict_finished(self):
+        """Forget finished jobs past JOB_TTL_SECONDS, and the oldest beyond MAX_FINISHED_JOBS"""
+        now = time.perf_counter()
+        finished = sorted((job for job in self.jobs.values() if job.finished is not None),
+                          key=lambda job: job.finished)
+        expired = [job for job in finished if now - job.finished > JOB_TTL_SECONDS]
+        expired += [job for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)] if job not in expired]
+        for job in expired:
+            del self.jobs[job.id]
+
+    def start(self, job: IngestJob) -> IngestJob:
+        """Run a job in the background on the current event loop"""
+        job.task = asyncio.create_task(self.run(job))
+        return job
+
+    async def run(self, job: IngestJob,
+                  on_item_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> IngestJob:
+        """Process every queued item of a job"""
+        limits = {stage: asyncio.Semaphore(n) for stage, n in self.concurrency.items()}
+        # Bound companies in flight so a huge upload doesn't hold every text in memory
+        in_flight = asyncio.Semaphore(sum(self.concurrency.values()) * 2)
+        # boto3 and requests are blocking, so stage work runs on a dedicated pool
+        executor = ThreadPoolExecutor(max_workers=sum(self.concurrency.values()))
+        loop = asyncio.get_running_loop()
+
+        async def call(stage: str, fn, *args, **kwargs):
+            async with limits[stage]:
+                # Run in a copy of the current context so service spans nest under the item's span
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(executor, lambda: context.run(fn, *args, **kwargs))
+
+        async def process(item):
+            async with in_flight:
+                with tracer.span("ingest.company", job_id=job.id, line=item["line"]) as span, \
+                        usage_context(batch=True, job=f"ingest:{job.id}"):
+                    try:
+                        await self._process_item(item, call)
+                    except Exception as e:
+                        item["status"] = "failed"
+                        item["errors"].append(f"{item['stage']}: {str(e)}")
+                        span.record_error(e)
+                    finally:
+                        # Drop the policy texts once the item is done; the status is all that's kept
+                        item["request"] = None
+                if on_item_done:
+                    on_item_done(item)
+
+        job.started = time.perf_counter()
+        try:
+            await asyncio.gather(*(process(item) for item in job.items if item["status"] == "queued"))
+        finally:
+            executor.shutdown(wait=False)
+            job.finished = time.perf_counter()
+        return job
+
+    async def _process_item(self, item: Dict[str, Any], call):
+        request: UploadTermsRequest = item["request"]
+        item["status"] = "running"
+        texts = {
+            "terms": request.terms_text,
+            "cookie": request.cookie_text,
+            "privacy": request.privacy_text,
+        }
+        urls = {
+            "terms": request.terms_url,
+            "cookie": request.cookie_url,
+            "privacy": request.privacy_url,
+        }
+
+        # Stage 1: scrape any policies given only as URLs
+        item["stage"] = "scrape"
+        to_scrape = [p for p in POLICY_TYPES if urls[p] and not texts[p]]
+        results = await asyncio.gather(
+            *(call("scrape", self.scraper.fetch_terms_from_url, urls[p]) for p in to_scrape),
+            return_exceptions=True
+        )
+        for policy_type, result in zip(to_scrape, results):
+            if isinstance(result, Exception):
+                item["errors"].append(f"scrape {policy_type}: {str(result)}")
+            else:
+                texts[policy_type] = result
+
+        if not texts["terms"]:
+            raise ValueError("No terms text available")
+
+        # Stage 2: analyze the available policies, in one call when they fit together
+        item["stage"] = "analyze"
+        analysis: Dict[str, Dict[str, Any]] = {}
+        if self.bedrock.combined_analysis_fits(texts):
+            try:
+                analysis = await call("analyze", self.bedrock.analyze_policies_combined,
+                                      request.company_name, texts)
+            except Exception as e:
+                item["errors"].append(f"combined analysis: {str(e)}")
+
+        to_analyze = [p for p in POLICY_TYPES if texts[p] and p not in analysis]
+        results = await asyncio.gather(
+            *(call("analyze", self.bedrock.analyze_policy, p, request.company_name, texts[p])
+              for p in to_analyze),
+            return_exceptions=True
+        )
+        for policy_type, result in zip(to_analyze, results):
+            if isinstance(result, Exception):
+                item["errors"].append(f"analyze {policy_type}: {str(result)}")
+            else:
+                analysis[policy_type] = result
+
+        # Stage 3: store texts and analyses in a single write
+        item["stage"] = "store"
+        company = await call(
+            "store", self.db.create_company,
+            name=request.company_name,
+            category=request.category,
+            terms_text=texts["terms"],
+            terms_risks=analysis.get("terms", {}).get("risks"),
+            terms_summary=analysis.get("terms", {}).get("summary"),
+            cookie_text=texts["cookie"],
+            cookie_risks=analysis.get("cookie", {}).get("risks"),
+            cookie_summary=analysis.get("cookie", {}).get("summary"),
+            privacy_text=texts["privacy"],
+            privacy_risks=analysis.get("privacy", {}).get("risks"),
+            privacy_summary=analysis.get("privacy", {}).get("summary"),
+            terms_url=urls["terms"],
+            cookie_url=urls["cookie"],
+            privacy_url=urls["privacy"],
+            analysis_versions={p: self.bedrock.analysis_version(p, a.get('model')) for p, a in analysis.items()},
+        )
+        item["company_id"] = company["id"]
+        tag_usage(company_id=company["id"])
+
+        # Stage 4: index analyzed policies for RAG
+        item["stage"] = "index"
+        to_index = [p for p in POLICY_TYPES if p in analysis]
+        results = await asyncio.gather(
+            *(call("index", self.vector.index_policy, company["id"], request.company_name,
+                   texts[p], p) for p in to_index),
+            return_exceptions=True
+        )
+        for policy_type, result in zip(to_index, results):
+            if isinstance(result, Exception):
+                item["errors"].append(f"index {policy_type}: {str(result)}")
+
+        item["stage"] = None
+        item["status"] = "partial" if item["errors"] else "done"
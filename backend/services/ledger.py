@@ -0,0 +1,234 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens. Keys are matched as substrings of the model id.
+# Override with BEDROCK_PRICES, e.g. '{"claude-sonnet-4": {"input": 3, "output": 15}}'
+DEFAULT_PRICES: Dict[str, Dict[str, float]] = {
+    "claude-sonnet-4": {"input": 3.00, "output": 15.00, "cache_read": 0.30, "cache_write": 3.75},
+    "claude-3-5-haiku": {"input": 0.80, "output": 4.00, "cache_read": 0.08, "cache_write": 1.00},
+    "titan-embed-text": {"input": 0.10, "output": 0.0},
+}
+PRICES = {**DEFAULT_PRICES, **json.loads(os.getenv('BEDROCK_PRICES') or '{}')}
+
+# Daily spend limits in USD (0 disables). Reaching one refuses batch work, never chat.
+DAILY_BUDGET_USD = float(os.getenv('LLM_DAILY_BUDGET_USD', '0'))
+# Per-operation daily limits, e.g. "analysis-terms=5,embedding=0.5"
+OPERATION_BUDGETS_USD = {
+    name.strip(): float(limit)
+    for name, _, limit in (item.partition('=') for item in os.getenv('LLM_OPERATION_BUDGETS', '').split(','))
+    if name.strip() and limit
+}
+
+# Append-only JSON lines, so daily spend survives restarts ("" keeps the ledger in memory)
+LEDGER_FILE = os.getenv(
+    'USAGE_LEDGER_FILE',
+    os.path.join(os.path.dirname(__file__), '..', '.usage_ledger.jsonl')
+)
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+GROUP_BY = ("day", "operation", "model", "company_id", "kind")
+
+_usage_tags: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar('usage_tags', default={})
+
+
+class BudgetExceededError(RuntimeError):
+    """Batch work refused because a daily or per-operation LLM budget is spent"""
+
+
+@contextmanager
+def usage_context(**tags) -> Iterator[Dict[str, Any]]:
+    """
+    Tag Bedrock calls in the enclosed block, e.g. company_id=..., or batch=True
+    for background jobs, which are refused once a budget is reached
+    """
+    token = _usage_tags.set({**_usage_tags.get(), **tags})
+    try:
+        yield _usage_tags.get()
+    finally:
+        _usage_tags.reset(token)
+
+
+def tag_usage(**tags):
+    """Add tags for the rest of the current context (e.g. one request's task)"""
+    _usage_tags.set({**_usage_tags.get(), **tags})
+
+
+def current_usage_tags() -> Dict[str, Any]:
+    return _usage_tags.get()
+
+
+def estimate_cost(model: str, input_tokens: int = 0, output_tokens: int = 0,
+                  cache_read_tokens: int = 0, cache_write_tokens: int = 0) -> float:
+    """Estimated USD cost of one call; 0 for models without a price"""
+    price = next((p for key, p in PRICES.items() if key in (model or '')), None)
+    if price is None:
+        return 0.0
+    return (input_tokens * price.get("input", 0)
+            + output_tokens * price.get("output", 0)
+            + cache_read_tokens * price.get("cache_read", price.get("input", 0))
+            + cache_write_tokens * price.get("cache_write", price.get("input", 0))) / 1_000_000
+
+
+class UsageLedger:
+    """
+    Token and cost ledger for every Bedrock call, tagged with operation, model,
+    company and whether it ran in a batch job.
+
+    Keeps per-day aggregates in memory (loaded from the ledger file on first
+    use) and appends each call to the file. Budgets are checked against
+    today's (UTC) spend.
+    """
+
+    def __init__(self, path: Optional[str] = LEDGER_FILE, daily_budget: float = DAILY_BUDGET_USD,
+                 operation_budgets: Dict[str, float] = None):
+        self.path = path
+        self.daily_budget = daily_budget
+        self.operation_budgets = dict(OPERATION_BUDGETS_USD if operation_budgets is None else operation_budgets)
+        # (day, operation, model, company_id, kind) -> calls, token counts and cost
+        self._totals: Dict[Tuple[str, ...], Dict[str, float]] = {}
+        # (day, operation) -> USD, for budget checks on every batch call
+        self._spend: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _add(self, entry: Dict[str, Any]):
+        key = tuple(str(entry.get(field) or '') for field in GROUP_BY)
+        totals = self._totals.setdefault(key, {"calls": 0, **{f: 0 for f in TOKEN_FIELDS}, "cost_usd": 0.0})
+        totals["calls"] += 1
+        for field in TOKEN_FIELDS:
+            totals[field] += entry.get(field, 0)
+        totals["cost_usd"] += entry.get("cost_usd", 0.0)
+        spend_key = (key[0], key[1])
+        self._spend[spend_key] = self._spend.get(spend_key, 0.0) + entry.get("cost_usd", 0.0)
+
+    def _load(self):
+        """Aggregate the ledger file once, the first time the ledger is used"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._add(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError as e:
+            logger.warning("Could not read usage ledger %s: %s", self.path, e)
+
+    def record(self, operation: str, model: str, input_tokens: int = 0, output_tokens: int = 0,
+               cache_read_tokens: int = 0, cache_write_tokens: int = 0) -> Dict[str, Any]:
+        """Record one call under the current usage tags; returns the ledger entry"""
+        tags = _usage_tags.get()
+        now = datetime.utcnow()
+        entry = {
+            "time": now.isoformat(),
+            "day": now.date().isoformat(),
+            "operation": operation,
+            "model": model,
+            "company_id": tags.get("company_id"),
+            "kind": "batch" if tags.get("batch") else "interactive",
+            "job": tags.get("job"),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_read_tokens": cache_read_tokens,
+            "cache_write_tokens": cache_write_tokens,
+            "cost_usd": round(estimate_cost(model, input_tokens, output_tokens,
+                                            cache_read_tokens, cache_write_tokens), 6),
+        }
+        with self._lock:
+            self._load()
+            self._add(entry)
+            if self.path:
+                try:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry) + '\n')
+                except OSError as e:
+                    logger.warning("Could not append to usage ledger %s: %s", self.path, e)
+        return entry
+
+    def spend(self, day: str = None, operation: str = None) -> float:
+        """USD spent on a day (default today, UTC), optionally for one operation"""
+        day = day or datetime.utcnow().date().isoformat()
+        with self._lock:
+            self._load()
+            return sum(cost for (spend_day, spend_operation), cost in self._spend.items()
+                       if spend_day == day and (operation is None or spend_operation == operation))
+
+    def exhausted_budgets(self, operation: str = None) -> List[str]:
+        """Budgets reached today that apply to an operation (or to any operation)"""
+        exhausted = []
+        if self.daily_budget and self.spend() >= self.daily_budget:
+            exhausted.append("daily")
+        for name, limit in self.operation_budgets.items():
+            if (operation is None or name == operation) and self.spend(operation=name) >= limit:
+                exhausted.append(name)
+        return exhausted
+
+    def check_batch(self, operation: str = None):
+        """Raise BudgetExceededError if batch work for the operation is over budget"""
+        exhausted = self.exhausted_budgets(operation)
+        if exhausted:
+            raise BudgetExceededError(
+                f"LLM budget reached ({', '.join(exhausted)}); batch work is refused until tomorrow (UTC)")
+
+    def batch_allowed(self) -> bool:
+        """False once the daily budget is spent, so new batch jobs are refused"""
+        return not (self.daily_budget and self.spend() >= self.daily_budget)
+
+    def budget_status(self) -> Dict[str, Any]:
+        today = self.spend()
+        return {
+            "day": datetime.utcnow().date().isoformat(),
+            "daily": {"limit_usd": self.daily_budget or None, "spent_usd": round(today, 4),
+                      "exhausted": bool(self.daily_budget and today >= self.daily_budget)},
+            "operations": {
+                name: {"limit_usd": limit, "spent_usd": round(self.spend(operation=name), 4),
+                       "exhausted": self.spend(operation=name) >= limit}
+                for name, limit in self.operation_budgets.items()
+            },
+            "batch_allowed": self.batch_allowed(),
+        }
+
+    def summary(self, days: int = 7, group_by: List[str] = None,
+                company_id: str = None) -> Dict[str, Any]:
+        """Calls, tokens and cost over the last `days` days, grouped by any of GROUP_BY"""
+        group_by = [g for g in (group_by or ["operation"]) if g in GROUP_BY]
+        since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+        groups: Dict[Tuple[str, ...], Dict[str, float]] = {}
+        total = {"calls": 0, **{f: 0 for f in TOKEN_FIELDS}, "cost_usd": 0.0}
+        with self._lock:
+            self._load()
+            for key, totals in self._totals.items():
+                row = dict(zip(GROUP_BY, key))
+                if row["day"] < since or (company_id and row["company_id"] != company_id):
+                    continue
+                group = groups.setdefault(tuple(row[g] for g in group_by),
+                                          {"calls": 0, **{f: 0 for f in TOKEN_FIELDS}, "cost_usd": 0.0})
+                for field, value in totals.items():
+                    group[field] += value
+                    total[field] += value
+
+        rows = [{**dict(zip(group_by, key)), **values, "cost_usd": round(values["cost_usd"], 4)}
+                for key, values in groups.items()]
+        rows.sort(key=lambda r: r["cost_usd"], reverse=True)
+        return {
+            "since": since,
+            "group_by": group_by,
+            "total": {**total, "cost_usd": round(total["cost_usd"], 4)},
+            "groups": rows,
+        }
+
+
+# Shared by every service in the process
+usage_ledger = UsageLedger()
@@ -0,0 +1,192 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cross-region inference profiles
+SONNET_MODEL_ID = os.getenv('BEDROCK_MODEL_ID', "us.anthropic.claude-sonnet-4-20250514-v1:0")
+FAST_MODEL_ID = os.getenv('BEDROCK_FAST_MODEL_ID', "us.anthropic.claude-3-5-haiku-20241022-v1:0")
+
+# Routing table: per operation, the first route whose max_input_chars fits the
+# request body picks the primary model. The fallback is used when the primary
+# fails, or when its observed p95 latency is above the operation's target.
+MODEL_ROUTES: Dict[str, Dict[str, Any]] = {
+    "analysis-terms": {
+        "routes": [{"max_input_chars": None, "model": SONNET_MODEL_ID}],
+        "fallback": FAST_MODEL_ID,
+        "latency_target_ms": 90000,
+    },
+    "analysis-cookie": {
+        "routes": [{"max_input_chars": None, "model": SONNET_MODEL_ID}],
+        "fallback": FAST_MODEL_ID,
+        "latency_target_ms": 90000,
+    },
+    "analysis-privacy": {
+        "routes": [{"max_input_chars": None, "model": SONNET_MODEL_ID}],
+        "fallback": FAST_MODEL_ID,
+        "latency_target_ms": 90000,
+    },
+    "analysis-combined": {
+        "routes": [{"max_input_chars": None, "model": SONNET_MODEL_ID}],
+        "fallback": FAST_MODEL_ID,
+        "latency_target_ms": 120000,
+    },
+    "analysis-changes": {
+        "routes": [{"max_input_chars": None, "model": SONNET_MODEL_ID}],
+        "fallback": FAST_MODEL_ID,
+        "latency_target_ms": 60000,
+    },
+    # Fixes the structure of an invalid analysis output; never sees the policy text
+    "analysis-repair": {
+        "routes": [{"max_input_chars": None, "model": FAST_MODEL_ID}],
+        "fallback": SONNET_MODEL_ID,
+        "latency_target_ms": 30000,
+    },
+    "company-chat": {
+        "routes": [
+            {"max_input_chars": 8000, "model": FAST_MODEL_ID},
+            {"max_input_chars": None, "model": SONNET_MODEL_ID},
+        ],
+        "fallback": FAST_MODEL_ID,
+        "latency_target_ms": 8000,
+    },
+    "rag-chat": {
+        "routes": [
+            {"max_input_chars": 12000, "model": FAST_MODEL_ID},
+            {"max_input_chars": None, "model": SONNET_MODEL_ID},
+        ],
+        "fallback": FAST_MODEL_ID,
+        "latency_target_ms": 10000,
+    },
+    "summarization": {
+        "routes": [{"max_input_chars": None, "model": FAST_MODEL_ID}],
+        "fallback": SONNET_MODEL_ID,
+        "latency_target_ms": 8000,
+    },
+}
+
+# Latency samples kept per (operation, model) for the rolling p95
+LATENCY_WINDOW = 200
+# Samples older than this are ignored, so a demotion lapses once the primary's slow calls age out
+LATENCY_MAX_AGE_SECONDS = float(os.getenv('MODEL_LATENCY_MAX_AGE_SECONDS', '600'))
+# Samples needed before latency can move an operation to its fallback
+MIN_SAMPLES_FOR_LATENCY_ROUTING = 20
+# Share of a demoted operation's calls still sent to its primary, so its p95 can recover
+LATENCY_PROBE_SHARE = float(os.getenv('MODEL_LATENCY_PROBE_SHARE', '0.05'))
+
+
+def _percentile(samples, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ModelRouter:
+    """
+    Picks a Bedrock model per operation from MODEL_ROUTES and tracks latency per
+    operation and model so routing can be tuned for cost and p95.
+    """
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]] = None, default_model: str = SONNET_MODEL_ID):
+        self.routes = routes or MODEL_ROUTES
+        self.default_model = default_model
+        # (operation, model) -> (monotonic time, latency ms) samples
+        self._latencies: Dict[Tuple[str, str], deque] = {}
+        self._counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def choose(self, operation: Optional[str], input_chars: int) -> Tuple[str, Optional[str]]:
+        """Returns (model_id, fallback_model_id) for an operation and request size"""
+        config = self.routes.get(operation or '')
+        if not config:
+            return self.default_model, None
+
+        model = config["routes"][-1]["model"]
+        reason = "default"
+        for route in config["routes"]:
+            limit = route.get("max_input_chars")
+            if limit is None or input_chars <= limit:
+                model = route["model"]
+                reason = f"input {input_chars} chars <= {limit}" if limit else "catch-all"
+                break
+
+        fallback = config.get("fallback")
+        if fallback == model:
+            # Size-routed to the fallback tier already - fall back to another route's model
+            others = [r["model"] for r in config["routes"] if r["model"] != model]
+            fallback = others[0] if others else None
+
+        # Move to the fallback while the primary is slower than the target for this
+        # operation, except for a probe share that keeps the primary's p95 current
+        p95 = self.p95_ms(operation, model)
+        target = config.get("latency_target_ms")
+        if fallback and target and p95 is not None and p95 > target:
+            if random.random() < LATENCY_PROBE_SHARE:
+                logger.info("route op=%s model=%s reason=probe (p95 %.0fms > target %sms)",
+                            operation, model, p95, target)
+                return model, fallback
+            logger.info("route op=%s model=%s reason=p95 %.0fms > target %sms (primary %s)",
+                        operation, fallback, p95, target, model)
+            return fallback, model
+
+        logger.info("route op=%s model=%s reason=%s", operation, model, reason)
+        return model, fallback
+
+    def primary_model(self, operation: str) -> str:
+        """Model used for full-size requests of an operation (ignores latency demotion)"""
+        config = self.routes.get(operation)
+        if not config:
+            return self.default_model
+        return config["routes"][-1]["model"]
+
+    def record(self, operation: Optional[str], model_id: str, latency_ms: float, ok: bool = True):
+        with self._lock:
+            if ok:
+                self._latencies.setdefault((operation or 'other', model_id), deque(maxlen=LATENCY_WINDOW)).append(
+                    (time.monotonic(), latency_ms))
+            counts = self._counts.setdefault((operation or 'other', model_id), {"calls": 0, "errors": 0})
+            counts["calls"] += 1
+            if not ok:
+                counts["errors"] += 1
+        logger.info("model_call op=%s model=%s latency_ms=%.0f ok=%s", operation, model_id, latency_ms, ok)
+
+    def _samples(self, key: Tuple[str, str]) -> list:
+        """Latencies of one (operation, model) within LATENCY_MAX_AGE_SECONDS (caller holds the lock)"""
+        samples = self._latencies.get(key)
+        if not samples:
+            return []
+        cutoff = time.monotonic() - LATENCY_MAX_AGE_SECONDS
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return [latency for _, latency in samples]
+
+    def p95_ms(self, operation: Optional[str], model_id: str) -> Optional[float]:
+        with self._lock:
+            samples = self._samples((operation or 'other', model_id))
+        if len(samples) < MIN_SAMPLES_FOR_LATENCY_ROUTING:
+            return None
+        return _percentile(samples, 95)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = {f"{op}:{model}": self._samples((op, model)) for op, model in list(self._latencies)}
+            counts = {f"{op}:{model}": dict(c) for (op, model), c in self._counts.items()}
+        return {
+            "routes": self.routes,
+            "latency": {
+                key: {
+                    "samples": len(samples),
+                    "p50_ms": _percentile(samples, 50),
+                    "p95_ms": _percentile(samples, 95),
+                }
+                for key, samples in latencies.items()
+            },
+            "calls": counts,
+        }
@@ -0,0 +1,231 @@
+import hashlib
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+# Sections smaller than this are merged into the previous one
+MIN_SECTION_CHARS = 200
+# Sections larger than this are split on content-defined sentence boundaries
+MAX_SECTION_CHARS = 4000
+# Above this share of changed text a full re-analysis is cheaper than a diff
+FULL_REANALYSIS_RATIO = 0.6
+
+_NUMBERED_HEADING = re.compile(r'^(?:(?:section|article|part|chapter)\s+[\w.]+|\d+(?:\.\d+)*[.)]?|[IVXLC]+[.)])\s+\S',
+                               re.IGNORECASE)
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def _is_heading(line: str) -> bool:
+    """Short line that is numbered, all caps, or doesn't end like a sentence"""
+    if not line or len(line) > 100:
+        return False
+    if _NUMBERED_HEADING.match(line):
+        return True
+    if line.isupper() and len(line) > 3:
+        return True
+    return line[0].isupper() and line[-1] not in '.,;:!?' and len(line.split()) <= 12
+
+
+def _section_id(heading: str, text: str) -> str:
+    normalized = re.sub(r'\s+', ' ', f"{heading}\n{text}").strip().lower()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def _split_long(text: str) -> List[str]:
+    """
+    Split an oversized section after sentences whose hash picks them as
+    boundaries, so an insertion only changes the pieces around it
+    """
+    pieces = []
+    current = ''
+    for sentence in _SENTENCE_END.split(text):
+        current = f"{current} {sentence}" if current else sentence
+        boundary = int(hashlib.md5(sentence.encode('utf-8')).hexdigest(), 16) % 8 == 0
+        if (boundary and len(current) >= MIN_SECTION_CHARS * 4) or len(current) >= MAX_SECTION_CHARS:
+            pieces.append(current)
+            current = ''
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_sections(text: str) -> List[Dict[str, str]]:
+    """
+    Split policy text into sections of {"id", "heading", "text"}.
+    Headings are detected line by line; ids are hashes of the normalized content.
+    """
+    raw: List[List[str]] = []
+    heading = ''
+    body: List[str] = []
+    for line in (text or '').split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if _is_heading(line) and body:
+            raw.append([heading, '\n'.join(body)])
+            heading, body = line, []
+        elif _is_heading(line) and not body:
+            heading = f"{heading} {line}".strip() if heading else line
+        else:
+            body.append(line)
+    if heading or body:
+        raw.append([heading, '\n'.join(body)])
+
+    # Merge tiny sections into their predecessor
+    merged: List[List[str]] = []
+    for heading, body in raw:
+        if merged and len(heading) + len(body) < MIN_SECTION_CHARS:
+            merged[-1][1] = '\n'.join(filter(None, [merged[-1][1], heading, body]))
+        else:
+            merged.append([heading, body])
+
+    sections = []
+    for heading, body in merged:
+        pieces = _split_long(body) if len(body) > MAX_SECTION_CHARS else [body]
+        for i, piece in enumerate(pieces):
+            piece_heading = heading if i == 0 else f"{heading} (cont.)".strip()
+            sections.append({
+                "id": _section_id(piece_heading, piece),
+                "heading": piece_heading,
+                "text": piece
+            })
+    return sections
+
+
+def diff_sections(old_sections: List[Dict[str, str]],
+                  new_sections: List[Dict[str, str]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Section-level diff. Returns lists of "added" and "removed" sections and
+    "modified" pairs of {"old", "new"} for sections replaced in place.
+    """
+    matcher = SequenceMatcher(None, [s["id"] for s in old_sections],
+                              [s["id"] for s in new_sections], autojunk=False)
+    added, removed, modified = [], [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        old_part = old_sections[i1:i2]
+        new_part = new_sections[j1:j2]
+        if tag == 'replace':
+            pairs = min(len(old_part), len(new_part))
+            modified.extend({"old": o, "new": n} for o, n in zip(old_part[:pairs], new_part[:pairs]))
+            removed.extend(old_part[pairs:])
+            added.extend(new_part[pairs:])
+        elif tag == 'delete':
+            removed.extend(old_part)
+        elif tag == 'insert':
+            added.extend(new_part)
+    return {"added": added, "removed": removed, "modified": modified}
+
+
+def has_changes(diff: Dict[str, List]) -> bool:
+    return bool(diff["added"] or diff["removed"] or diff["modified"])
+
+
+def changed_sections(diff: Dict[str, List]) -> List[Dict[str, str]]:
+    """New-text sections that need analysis (added or modified)"""
+    return diff["added"] + [pair["new"] for pair in diff["modified"]]
+
+
+def retired_section_ids(diff: Dict[str, List], analyzed_ids: Optional[set] = None) -> set:
+    """
+    Ids of old sections whose risks no longer apply. With analyzed_ids, a
+    modified section is only retired if its new text was analyzed.
+    """
+    return {s["id"] for s in diff["removed"]} | {
+        pair["old"]["id"] for pair in diff["modified"]
+        if analyzed_ids is None or pair["new"]["id"] in analyzed_ids
+    }
+
+
+def merge_risks(existing: List[Dict[str, Any]], new_risks: List[Dict[str, Any]],
+                retired_ids: set, retired_titles: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Drop existing risks tied to retired sections (or named as retired), then
+    add the new risks, replacing existing ones with the same title
+    """
+    retired_titles = {t.strip().lower() for t in retired_titles or []}
+    new_titles = {r.get('title', '').strip().lower() for r in new_risks}
+
+    kept = []
+    for risk in existing:
+        title = risk.get('title', '').strip().lower()
+        if risk.get('section_id') in retired_ids or title in retired_titles or title in new_titles:
+            continue
+        kept.append(risk)
+    return kept + list(new_risks)
+
+
+def describe_changes(old_text: str, new_text: str) -> Dict[str, Any]:
+    """"What changed" view between two versions of a policy"""
+    diff = diff_sections(split_sections(old_text), split_sections(new_text))
+    return {
+        "added": [{"heading": s["heading"], "text": s["text"]} for s in diff["added"]],
+        "removed": [{"heading": s["heading"], "text": s["text"]} for s in diff["removed"]],
+        "modified": [
+            {"heading": pair["new"]["heading"] or pair["old"]["heading"],
+             "old_text": pair["old"]["text"], "new_text": pair["new"]["text"]}
+            for pair in diff["modified"]
+        ]
+    }
+
+
+class IncrementalAnalyzer:
+    """
+    Re-analyzes only the sections of a policy that changed and merges the
+    resulting risks into the existing ones. Falls back to a full analysis when
+    there is no previous text, most of the policy changed, or the changed
+    sections don't fit one change analysis.
+
+    Only risks from incremental analysis carry a section_id. Risks from a full
+    (or combined) analysis aren't tied to sections, so a later change can only
+    retire them when the model names them in retired_risks.
+    """
+
+    def __init__(self, bedrock_service):
+        self.bedrock = bedrock_service
+
+    def analyze(self, company: Dict[str, Any], policy_type: str, new_text: str) -> Dict[str, Any]:
+        """
+        Returns {"mode": "full" | "incremental" | "unchanged", "risks", "summary", "sections"}
+        """
+        old_text = company.get(f'{policy_type}_text') or ''
+        existing_risks = company.get(f'{policy_type}_risks') or []
+        summary = company.get(f'{policy_type}_summary') or ''
+
+        new_sections = split_sections(new_text)
+        if not old_text or not existing_risks:
+            return self._full(company, policy_type, new_text)
+
+        diff = diff_sections(split_sections(old_text), new_sections)
+        if not has_changes(diff):
+            return {"mode": "unchanged", "risks": existing_risks, "summary": summary, "sections": 0}
+
+        to_analyze = changed_sections(diff)
+        changed_chars = sum(len(s["text"]) for s in to_analyze)
+        if changed_chars > len(new_text) * FULL_REANALYSIS_RATIO or not self.bedrock.changes_fit(to_analyze):
+            return self._full(company, policy_type, new_text)
+
+        result = self.bedrock.analyze_policy_changes(
+            policy_type=policy_type,
+            company_name=company['name'],
+            changed_sections=to_analyze,
+            removed_sections=diff["removed"] + [pair["old"] for pair in diff["modified"]],
+            existing_risks=existing_risks,
+            previous_summary=summary
+        )
+        analyzed = result.get("analyzed_section_ids")
+        risks = merge_risks(existing_risks, result["risks"],
+                            retired_section_ids(diff, set(analyzed) if analyzed is not None else None),
+                            result.get("retired_risks"))
+        return {
+            "mode": "incremental",
+            "risks": risks,
+            "summary": result.get("summary") or summary,
+            "sections": len(analyzed) if analyzed is not None else len(to_analyze)
+        }
+
+    def _full(self, company: Dict[str, Any], policy_type: str, new_text: str) -> Dict[str, Any]:
+        analysis = self.bedrock.analyze_policy(policy_type, company['name'], new_text)
+        return {"mode": "full", "risks": analysis["risks"], "summary": analysis["summary"],
+                "sections": len(split_sections(new_text)), "model": analysis.get("model")}
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .aws import BedrockRateLimiter
+from .dynamodb import POLICY_TYPES
+from .ledger import BudgetExceededError, usage_context
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = os.getenv(
+    'REANALYZE_CHECKPOINT',
+    os.path.join(os.path.dirname(__file__), '..', '.reanalyze_checkpoint.json')
+)
+
+# Checkpoint at most this often (seconds), plus once at the end of a run
+CHECKPOINT_INTERVAL = 5.0
+
+
+class ReanalysisRunner:
+    """
+    Re-analyzes every company's policies after a prompt or model change.
+
+    Items already analyzed with the current analysis version are skipped, work
+    runs with bounded concurrency inside a per-run Bedrock budget, and progress
+    is checkpointed to a JSON file so an interrupted run resumes where it left off.
+    """
+
+    def __init__(self, db_service, bedrock_service, checkpoint_path: str = None):
+        self.db = db_service
+        self.bedrock = bedrock_service
+        self.checkpoint_path = checkpoint_path or DEFAULT_CHECKPOINT_PATH
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.progress: Optional[Dict[str, Any]] = None
+
+    def _load_checkpoint(self, versions: Dict[str, str]) -> Dict[str, Any]:
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            # A checkpoint for other prompt/model versions is stale
+            if checkpoint.get('versions') == versions and not checkpoint.get('finished_at'):
+                return checkpoint
+        except (OSError, ValueError):
+            pass
+        return {
+            'run_id': str(uuid.uuid4()),
+            'versions': versions,
+            'started_at': datetime.utcnow().isoformat(),
+            'finished_at': None,
+            'completed': [],
+            'failed': {}
+        }
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        # Write then rename, so a crash mid-write never corrupts the checkpoint
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def plan(self, versions: Dict[str, str], completed: set,
+             policy_types: List[str] = None) -> Dict[str, Any]:
+        """Work items for every policy not yet analyzed with the current version"""
+        items = []
+        skipped = 0
+        for company in self.db.get_all_companies():
+            for policy_type in policy_types or POLICY_TYPES:
+                if not company.get(f'{policy_type}_text'):
+                    continue
+                key = f"{company['id']}:{policy_type}"
+                if key in completed or company.get(f'{policy_type}_analysis_version') == versions[policy_type]:
+                    skipped += 1
+                    continue
+                items.append({'key': key, 'company': company, 'policy_type': policy_type})
+        return {'items': items, 'skipped': skipped}
+
+    def run(self, concurrency: int = 4, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+            policy_types: List[str] = None, on_progress=None) -> Dict[str, Any]:
+        """Run (or resume) a re-analysis of the whole corpus. Blocks until done."""
+        versions = {p: self.bedrock.analysis_version(p) for p in POLICY_TYPES}
+        checkpoint = self._load_checkpoint(versions)
+        completed = set(checkpoint['completed'])
+        plan = self.plan(versions, completed, policy_types)
+        budget = BedrockRateLimiter(requests_per_minute, tokens_per_minute)
+
+        progress = {
+            'run_id': checkpoint['run_id'],
+            'status': 'running',
+            'resumed': bool(completed),
+            'total': len(plan['items']),
+            'done': 0,
+            'failed': 0,
+            'skipped': plan['skipped'],
+            'started_at': datetime.utcnow().isoformat(),
+            'items_per_minute': None,
+            'eta_seconds': None,
+            'errors': []
+        }
+        self.progress = progress
+        started = time.perf_counter()
+        last_saved = started
+        # Set when the LLM budget runs out; remaining items are left for a resumed run
+        budget_error: Optional[str] = None
+
+        def process(item):
+            nonlocal last_saved, budget_error
+            if budget_error:
+                return
+            company = item['company']
+            policy_type = item['policy_type']
+            text = company[f'{policy_type}_text']
+            # Same estimate as the analysis prompt: truncated text plus max output
+            budget.acquire(len(text[:8000]) // 4 + 4096)
+            try:
+                # Each policy is its own trace; worker threads don't inherit the caller's span
+                with tracer.span("reanalyze.policy", company_id=company['id'], policy_type=policy_type), \
+                        usage_context(batch=True, job=f"reanalyze:{checkpoint['run_id']}", company_id=company['id']):
+                    analysis = self.bedrock.analyze_policy(policy_type, company['name'], text)
+                    stored = self.db.update_policy_analysis(company['id'], policy_type, analysis['risks'],
+                                                            analysis['summary'],
+                                                            analysis_version=self.bedrock.analysis_version(
+                                                                policy_type, analysis.get('model')))
+                error = None if stored else "Failed to store analysis"
+            except BudgetExceededError as e:
+                budget_error = str(e)
+                return
+            except Exception as e:
+                error = str(e)
+
+            with self._lock:
+                if error:
+                    progress['failed'] += 1
+                    checkpoint['failed'][item['key']] = error
+                    progress['errors'].append(f"{company.get('name')} ({policy_type}): {error}")
+                else:
+                    progress['done'] += 1
+                    checkpoint['completed'].append(item['key'])
+                    checkpoint['failed'].pop(item['key'], None)
+
+                elapsed = time.perf_counter() - started
+                finished = progress['done'] + progress['failed']
+                rate = finished / elapsed if elapsed > 0 else 0
+                progress['items_per_minute'] = round(rate * 60, 2)
+                progress['eta_seconds'] = round((progress['total'] - finished) / rate) if rate else None
+
+                if time.perf_counter() - last_saved >= CHECKPOINT_INTERVAL:
+                    self._save_checkpoint(checkpoint)
+                    last_saved = time.perf_counter()
+
+            if on_progress:
+                on_progress(progress)
+
+        self._save_checkpoint(checkpoint)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(process, plan['items']))
+
+        if budget_error:
+            # Not finished: the next run resumes from the checkpoint
+            self._save_checkpoint(checkpoint)
+            progress['status'] = 'budget_exceeded'
+            progress['error'] = budget_error
+            progress['eta_seconds'] = None
+            progress['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+            return progress
+
+        checkpoint['finished_at'] = datetime.utcnow().isoformat()
+        self._save_checkpoint(checkpoint)
+        progress['status'] = 'completed'
+        progress['eta_seconds'] = 0
+        progress['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        return progress
+
+    def start(self, **kwargs) -> bool:
+        """Run in a background thread. Returns False if a run is already in progress."""
+        if self.is_running():
+            return False
+        self.progress = {'status': 'starting'}
+        self._thread = threading.Thread(target=self._run_safely, kwargs=kwargs, daemon=True)
+        self._thread.start()
+        return True
+
+    def _run_safely(self, **kwargs):
+        try:
+            self.run(**kwargs)
+        except Exception as e:
+            logger.exception("Re-analysis run failed: %s", e)
+            self.progress = {**(self.progress or {}), 'status': 'failed', 'error': str(e)}
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
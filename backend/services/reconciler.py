@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# How often pending deletes are purged (0 = only on POST /api/vector-reconcile)
+RECONCILE_SECONDS = float(os.getenv('VECTOR_RECONCILE_SECONDS', '10'))
+# How often the index is compared with the table for missed deletes and orphans (0 = never)
+SWEEP_MINUTES = float(os.getenv('VECTOR_SWEEP_MINUTES', '60'))
+# A failed purge is retried after this, doubling per failure up to MAX_RETRY_SECONDS
+RETRY_SECONDS = 30
+MAX_RETRY_SECONDS = 3600
+# An older generation is only swept once the newest one is this old, so an
+# indexing run still in progress is never mistaken for stale chunks
+GENERATION_GRACE_SECONDS = 3600
+
+
+class VectorReconciler:
+    """
+    Background cleanup of the vector index.
+
+    Deletes and re-indexing leave tombstones in VectorDBService (searches hide
+    the chunks at once); this purges them with delete_by_query, retrying
+    failures with exponential backoff, and removes a deleted company's item
+    once its chunks are gone. Tombstones are shared through DynamoDB, so any
+    process's reconciler purges any process's deletes. A periodic sweep also
+    finds what tombstones can't cover: deleted companies whose tombstone was
+    never written, chunks of companies that no longer exist, and stale policy
+    generations.
+    """
+
+    def __init__(self, db_service, vector_service, interval_seconds: float = RECONCILE_SECONDS,
+                 sweep_seconds: float = SWEEP_MINUTES * 60):
+        self.db = db_service
+        self.vector = vector_service
+        self.interval_seconds = interval_seconds
+        self.sweep_seconds = sweep_seconds
+        # Tombstone key -> attempts, next retry and last error of failed purges
+        self._retries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_sweep_at: Optional[float] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.last_sweep: Optional[Dict[str, Any]] = None
+
+    def run_once(self) -> Dict[str, Any]:
+        """Purge every tombstone that is due (not waiting out a retry backoff)"""
+        with self._lock:
+            now = time.time()
+            result = {"started_at": datetime.utcnow().isoformat(), "purged": 0,
+                      "chunks_deleted": 0, "companies_removed": 0, "errors": []}
+            for tombstone in self.vector.tombstones():
+                key = tombstone["key"]
+                company_id, policy_type = tombstone["company_id"], tombstone["policy_type"]
+                retry = self._retries.get(key)
+                if retry and retry["next_attempt"] > now:
+                    continue
+                try:
+                    with tracer.span("reconcile.purge", company_id=company_id, policy_type=policy_type or "all"):
+                        result["chunks_deleted"] += self.vector.purge(tombstone)
+                        if policy_type is None and self.db.purge_company(company_id):
+                            result["companies_removed"] += 1
+                except Exception as e:
+                    self._failed(key, e)
+                    result["errors"].append(f"{key}: {e}")
+                    continue
+                self._retries.pop(key, None)
+                result["purged"] += 1
+
+            result["pending"] = len(self.vector.tombstones())
+            result["finished_at"] = datetime.utcnow().isoformat()
+            self.last_run = result
+            return result
+
+    def _failed(self, key: str, error: Exception):
+        retry = self._retries.setdefault(key, {"attempts": 0})
+        retry["attempts"] += 1
+        delay = min(RETRY_SECONDS * 2 ** (retry["attempts"] - 1), MAX_RETRY_SECONDS)
+        retry["next_attempt"] = time.time() + delay
+        retry["last_error"] = str(error)
+        logger.warning("Vector purge of %s failed (attempt %d, retry in %ds): %s",
+                       key, retry["attempts"], delay, error)
+
+    def sweep(self) -> Dict[str, Any]:
+        """
+        Tombstone what the write path missed: deleted companies in the table,
+        chunks whose company is gone, and policies with more than one generation
+        """
+        self._last_sweep_at = time.monotonic()
+        result = {"started_at": datetime.utcnow().isoformat(), "deleted_companies": 0,
+                  "orphaned_companies": 0, "stale_policies": 0}
+        # Index first: a company is stored before its chunks, so anything
+        # indexed here is already in the scan below unless it is an orphan
+        generations = self.vector.policy_generations()
+        deleted = {item['id'] for item in self.db.get_deleted_companies()}
+        live = {item['id'] for item in self.db.get_all_companies()}
+
+        for company_id in deleted:
+            if not self.vector.is_tombstoned(company_id):
+                self.vector.tombstone_company(company_id)
+                result["deleted_companies"] += 1
+
+        for company_id in {company_id for company_id, _ in generations} - live - deleted:
+            self.vector.tombstone_company(company_id)
+            result["orphaned_companies"] += 1
+
+        # A policy with a pending purge (say of an incomplete run) is left until it is done
+        pending = {(t["company_id"], t["policy_type"]) for t in self.vector.tombstones()}
+        cutoff = (time.time() - GENERATION_GRACE_SECONDS) * 1000
+        for (company_id, policy_type), generation in generations.items():
+            if company_id not in live or generation["newest"] is None or generation["newest"] > cutoff:
+                continue
+            if (company_id, policy_type) in pending:
+                continue
+            if generation["stamped"] < generation["chunks"] or generation["oldest"] < generation["newest"]:
+                self.vector.tombstone_policy(company_id, policy_type, before=int(generation["newest"]))
+                result["stale_policies"] += 1
+
+        result["finished_at"] = datetime.utcnow().isoformat()
+        self.last_sweep = result
+        if result["deleted_companies"] or result["orphaned_companies"] or result["stale_policies"]:
+            logger.info("Vector sweep: %d deleted, %d orphaned companies, %d stale policies",
+                        result["deleted_companies"], result["orphaned_companies"], result["stale_policies"])
+        return result
+
+    def _sweep_due(self) -> bool:
+        if self.sweep_seconds <= 0:
+            return False
+        return self._last_sweep_at is None or time.monotonic() - self._last_sweep_at >= self.sweep_seconds
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            retries = dict(self._retries)
+        pending = []
+        for tombstone in self.vector.tombstones():
+            retry = retries.get(tombstone["key"], {})
+            pending.append({
+                "key": tombstone["key"],
+                "company_id": tombstone["company_id"],
+                "policy_type": tombstone["policy_type"],
+                "generation": tombstone["generation"],
+                "age_seconds": round(now - tombstone["created_at"], 1),
+                "attempts": retry.get("attempts", 0),
+                "retry_in_seconds": round(max(0.0, retry["next_attempt"] - now), 1) if retry else 0,
+                "last_error": retry.get("last_error")
+            })
+        return {"pending": pending, "last_run": self.last_run, "last_sweep": self.last_sweep}
+
+    async def _loop(self):
+        while True:
+            try:
+                if self._sweep_due():
+                    await asyncio.to_thread(self.sweep)
+                if self.vector.tombstones():
+                    result = await asyncio.to_thread(self.run_once)
+                    if result["purged"] or result["errors"]:
+                        logger.info("Vector reconcile: purged %d (%d chunks), errors %d, pending %d",
+                                    result["purged"], result["chunks_deleted"], len(result["errors"]),
+                                    result["pending"])
+            except Exception as e:
+                logger.exception("Vector reconcile failed: %s", e)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the background reconcile loop on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
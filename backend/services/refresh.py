@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from .dynamodb import POLICY_TYPES, policy_hash
+from .ledger import usage_context, usage_ledger
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class PolicyRefresher:
+    """
+    Scheduled change detection for policies that have a source URL.
+
+    Re-crawls each stored `*_url` once per interval and compares the hash of
+    the normalized text with the stored one. Only policies whose text actually
+    changed are re-analyzed (section by section) and re-indexed.
+    """
+
+    def __init__(self, db_service, analyzer, scraper_service, vector_service,
+                 interval_seconds: int = 24 * 3600):
+        self.db = db_service
+        # IncrementalAnalyzer: only changed sections are sent to the model
+        self.analyzer = analyzer
+        self.scraper = scraper_service
+        self.vector = vector_service
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def is_due(self, company: Dict[str, Any], policy_type: str, now: datetime) -> bool:
+        """A policy is due if it has a URL and wasn't checked within the interval"""
+        if not company.get(f'{policy_type}_url'):
+            return False
+        checked_at = company.get(f'{policy_type}_checked_at')
+        if not checked_at:
+            return True
+        try:
+            checked = datetime.fromisoformat(checked_at)
+        except ValueError:
+            return True
+        return now - checked >= timedelta(seconds=self.interval_seconds)
+
+    def refresh_policy(self, company: Dict[str, Any], policy_type: str) -> str:
+        """
+        Re-crawl one policy. Returns "unchanged" or "changed".
+        Raises ValueError if the source can't be fetched.
+        """
+        company_id = company['id']
+        text = self.scraper.fetch_terms_from_url(company[f'{policy_type}_url'])
+        new_hash = policy_hash(text)
+
+        stored_hash = company.get(f'{policy_type}_hash')
+        if not stored_hash and company.get(f'{policy_type}_text'):
+            stored_hash = policy_hash(company[f'{policy_type}_text'])
+            if stored_hash == new_hash:
+                self.db.mark_policy_checked(company_id, policy_type, content_hash=new_hash)
+                return "unchanged"
+
+        if stored_hash == new_hash:
+            self.db.mark_policy_checked(company_id, policy_type)
+            return "unchanged"
+
+        # Analyze before storing so a failed analysis is retried on the next pass
+        analysis = self.analyzer.analyze(company, policy_type, text)
+        self.db.update_policy_text(company_id, policy_type, text)
+        version = (self.analyzer.bedrock.analysis_version(policy_type, analysis.get('model'))
+                   if analysis['mode'] == 'full' else None)
+        self.db.update_policy_analysis(company_id, policy_type, analysis['risks'], analysis['summary'],
+                                       analysis_version=version)
+        try:
+            self.vector.index_policy(company_id, company['name'], text, policy_type)
+        except Exception as e:
+            logger.warning("Vector re-indexing failed for %s (%s): %s", company['name'], policy_type, e)
+        return "changed"
+
+    def run_once(self, force: bool = False, company_id: str = None) -> Dict[str, Any]:
+        """
+        Check every due policy (or every policy with a URL when force=True)
+        """
+        now = datetime.utcnow()
+        if company_id:
+            company = self.db.get_company(company_id)
+            companies = [company] if company else []
+        else:
+            companies = self.db.get_all_companies()
+
+        result = {
+            "started_at": now.isoformat(),
+            "checked": 0,
+            "changed": [],
+            "unchanged": 0,
+            "errors": []
+        }
+        if not usage_ledger.batch_allowed():
+            # Re-analysis would be refused anyway; leave policies due for the next pass
+            result["errors"].append("LLM daily budget reached; refresh skipped")
+            result["finished_at"] = datetime.utcnow().isoformat()
+            self.last_run = result
+            return result
+
+        for company in companies:
+            for policy_type in POLICY_TYPES:
+                if not company.get(f'{policy_type}_url'):
+                    continue
+                if not force and not self.is_due(company, policy_type, now):
+                    continue
+
+                result["checked"] += 1
+                try:
+                    with tracer.span("refresh.policy", company_id=company['id'], policy_type=policy_type), \
+                            usage_context(batch=True, job="refresh", company_id=company['id']):
+                        status = self.refresh_policy(company, policy_type)
+                except Exception as e:
+                    result["errors"].append(f"{company.get('name')} ({policy_type}): {str(e)}")
+                    continue
+
+                if status == "changed":
+                    result["changed"].append({
+                        "company_id": company['id'],
+                        "company_name": company.get('name'),
+                        "policy_type": policy_type
+                    })
+                else:
+                    result["unchanged"] += 1
+
+        result["finished_at"] = datetime.utcnow().isoformat()
+        self.last_run = result
+        return result
+
+    async def _loop(self):
+        # Poll more often than the interval so newly due policies aren't delayed a full period
+        poll_seconds = max(60, min(self.interval_seconds // 4, 3600))
+        while True:
+            try:
+                result = await asyncio.to_thread(self.run_once)
+                if result["checked"]:
+                    logger.info("Policy refresh: checked %d, changed %d, errors %d",
+                                result['checked'], len(result['changed']), len(result['errors']))
+            except Exception as e:
+                logger.exception("Policy refresh failed: %s", e)
+            await asyncio.sleep(poll_seconds)
+
+    def start(self):
+        """Start the background refresh loop on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
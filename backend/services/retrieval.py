@@ -0,0 +1,181 @@
+import math
+import operator
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Maximal marginal relevance: 1.0 ranks by relevance only, lower values favor diversity
+MMR_LAMBDA = float(os.getenv('MMR_LAMBDA', '0.7'))
+# kNN candidates fetched per requested result, for MMR to choose from
+MMR_CANDIDATE_FACTOR = int(os.getenv('MMR_CANDIDATE_FACTOR', '4'))
+MAX_CANDIDATES = 50
+
+# Characters of retrieved text given to rag_chat, and whether chunks next to
+# the hits are added (as far as the budget allows)
+CONTEXT_BUDGET_CHARS = int(os.getenv('RAG_CONTEXT_CHARS', '6000'))
+EXPAND_NEIGHBORS = os.getenv('RAG_EXPAND_NEIGHBORS', 'true').lower() in ('1', 'true', 'yes')
+
+# Shortest repeated text treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+def _normalized(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(map(operator.mul, vector, vector)))
+    return [x / norm for x in vector] if norm else list(vector)
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+def mmr_select(query_embedding: Sequence[float], candidates: List[Dict[str, Any]], k: int,
+               lambda_mult: float = MMR_LAMBDA) -> List[Dict[str, Any]]:
+    """
+    Pick k candidates (each with an "embedding") by maximal marginal relevance:
+    relevance to the query minus similarity to what is already picked, so
+    near-duplicate chunks don't fill every slot. Vectors are normalized once and
+    each candidate's highest similarity to the picked set is updated
+    incrementally, so the cost is k passes over the candidates.
+    """
+    if len(candidates) <= k:
+        return list(candidates)
+    vectors = [_normalized(c.get('embedding') or []) for c in candidates]
+    query = _normalized(query_embedding)
+    relevance = [_dot(query, v) for v in vectors]
+    max_similarity = [-1.0] * len(candidates)
+    remaining = set(range(len(candidates)))
+    selected: List[int] = []
+
+    while remaining and len(selected) < k:
+        if not selected:
+            best = max(remaining, key=lambda i: relevance[i])
+        else:
+            best = max(remaining,
+                       key=lambda i: lambda_mult * relevance[i] - (1 - lambda_mult) * max_similarity[i])
+        selected.append(best)
+        remaining.discard(best)
+        for i in remaining:
+            similarity = _dot(vectors[best], vectors[i])
+            if similarity > max_similarity[i]:
+                max_similarity[i] = similarity
+
+    return [candidates[i] for i in selected]
+
+
+def _overlap_length(previous: str, text: str, max_chars: int) -> int:
+    """Length of the longest suffix of previous that text starts with"""
+    for length in range(min(len(previous), len(text), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:length]):
+            return length
+    return 0
+
+
+def strip_overlaps(chunks: List[Dict[str, Any]], max_chars: int = 400) -> List[Dict[str, Any]]:
+    """
+    Remove the text a chunk repeats from the previous chunk of the same policy
+    (chunk_text overlaps neighbors by 200 characters) when both were retrieved.
+    Order is kept; the later chunk loses its repeated prefix.
+    """
+    by_position = {(c.get('company_id'), c.get('policy_type'), c.get('chunk_index')): c
+                   for c in chunks if c.get('chunk_index') is not None}
+    stripped = []
+    for chunk in chunks:
+        index = chunk.get('chunk_index')
+        previous = by_position.get((chunk.get('company_id'), chunk.get('policy_type'), index - 1)) \
+            if index is not None else None
+        if previous is not None:
+            overlap = _overlap_length(previous.get('text') or '', chunk.get('text') or '', max_chars)
+            if overlap:
+                chunk = {**chunk, 'text': chunk['text'][overlap:].lstrip()}
+        stripped.append(chunk)
+    return stripped
+
+
+def _position(chunk: Dict[str, Any]) -> Tuple[Any, Any, int]:
+    return chunk.get('company_id'), chunk.get('policy_type'), chunk.get('chunk_index')
+
+
+def merge_spans(chunks: List[Dict[str, Any]], max_overlap: int = 400) -> List[Dict[str, Any]]:
+    """
+    Merge chunks of the same policy with contiguous chunk_index into one span
+    (overlap removed), so the prompt gets one passage with one source header.
+    Spans keep the best score of their retrieved chunks and are ordered by it;
+    chunks without a score (neighbors) don't raise a span's rank.
+    """
+    groups: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+    for chunk in chunks:
+        if chunk.get('chunk_index') is None:
+            groups.setdefault((id(chunk), None), []).append(chunk)
+        else:
+            groups.setdefault((chunk.get('company_id'), chunk.get('policy_type')), []).append(chunk)
+
+    spans = []
+    for group in groups.values():
+        group = sorted({c.get('chunk_index'): c for c in group}.values(), key=lambda c: c.get('chunk_index') or 0)
+        run: List[Dict[str, Any]] = []
+        for chunk in group:
+            if run and chunk['chunk_index'] != run[-1]['chunk_index'] + 1:
+                spans.append(_span(run, max_overlap))
+                run = []
+            run.append(chunk)
+        spans.append(_span(run, max_overlap))
+
+    spans.sort(key=lambda s: s['score'] if s['score'] is not None else float('-inf'), reverse=True)
+    return spans
+
+
+def _span(run: List[Dict[str, Any]], max_overlap: int) -> Dict[str, Any]:
+    text = run[0].get('text') or ''
+    for previous, chunk in zip(run, run[1:]):
+        chunk_text = chunk.get('text') or ''
+        overlap = _overlap_length(previous.get('text') or '', chunk_text, max_overlap)
+        text = f"{text} {chunk_text[overlap:].lstrip()}" if overlap else f"{text}\n{chunk_text}"
+    scores = [c['score'] for c in run if c.get('score') is not None]
+    return {
+        **{k: v for k, v in run[0].items() if k not in ('text', 'score', 'embedding')},
+        "text": text,
+        "chunk_index": run[0].get('chunk_index'),
+        "chunk_end": run[-1].get('chunk_index'),
+        "score": max(scores) if scores else None,
+    }
+
+
+def neighbor_positions(hits: List[Dict[str, Any]]) -> List[Tuple[Any, Any, int]]:
+    """(company_id, policy_type, chunk_index) just before and after each hit, best hit first"""
+    have = {_position(h) for h in hits}
+    positions = []
+    for hit in hits:
+        company_id, policy_type, index = _position(hit)
+        if index is None:
+            continue
+        for neighbor in ((company_id, policy_type, index - 1), (company_id, policy_type, index + 1)):
+            if neighbor[2] >= 0 and neighbor not in have:
+                have.add(neighbor)
+                positions.append(neighbor)
+    return positions
+
+
+def fit_context(hits: List[Dict[str, Any]], neighbors: List[Dict[str, Any]], max_chars: int) -> List[Dict[str, Any]]:
+    """
+    Spans of the hits within max_chars of text: lowest ranked hits are dropped
+    (the best is truncated if it alone is too long), then neighbors are added,
+    in the order given, while the merged spans still fit
+    """
+    def size(chunks):
+        return sum(len(span['text']) for span in merge_spans(chunks))
+
+    selected = list(hits)
+    while len(selected) > 1 and size(selected) > max_chars:
+        selected.pop()
+    for neighbor in neighbors:
+        company_id, policy_type, index = _position(neighbor)
+        positions = {_position(c) for c in selected}
+        # Only next to a chunk still in the context (its hit may have been dropped)
+        adjacent = ((company_id, policy_type, index - 1) in positions
+                    or (company_id, policy_type, index + 1) in positions)
+        if adjacent and size(selected + [neighbor]) <= max_chars:
+            selected.append(neighbor)
+
+    spans = merge_spans(selected)
+    if spans and len(spans[0]['text']) > max_chars:
+        spans[0] = {**spans[0], 'text': spans[0]['text'][:max_chars]}
+    return spans
@@ -0,0 +1,141 @@
+"""
+Cross-company risk aggregates, kept as counters in the companies table.
+
+Every company contributes counters (companies per category, risks per policy
+type and severity, risks per category and severity, occurrences per risk
+title). Writes apply the difference between a company's old and new
+contribution, so GET /api/stats reads a fixed number of items no matter how
+many companies there are.
+"""
+import hashlib
+import re
+from collections import Counter
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Aggregate items share the companies table under ids with this prefix
+STATS_ID_PREFIX = '__stats__'
+STATS_ID = f"{STATS_ID_PREFIX}#totals"
+# Title counts are spread over a few items. Each keeps at most TITLE_SHARD_LIMIT
+# titles: writes remove titles whose count drops to zero, and a shard past the
+# limit (tracked in its title_count) loses its least frequent titles down to
+# TITLE_SHARD_TRIM_TO. At TITLE_MAX_CHARS per title a full shard is about 210 KB,
+# under the 400 KB item limit.
+TITLE_SHARDS = 4
+TITLE_MAX_CHARS = 200
+TITLE_SHARD_LIMIT = 1000
+TITLE_SHARD_TRIM_TO = 900
+# Attributes removed per write when trimming (update expressions are limited to 4 KB)
+TITLE_TRIM_BATCH = 100
+
+SEVERITIES = ('high', 'medium', 'low')
+
+
+def is_stats_id(item_id: str) -> bool:
+    return str(item_id).startswith(STATS_ID_PREFIX)
+
+
+def title_shard_id(shard: int) -> str:
+    return f"{STATS_ID_PREFIX}#titles#{shard}"
+
+
+def title_key(title: str) -> str:
+    """Normalized risk title, so near-identical titles count together"""
+    return re.sub(r'\s+', ' ', str(title or '')).strip(' .:;-').lower()[:TITLE_MAX_CHARS]
+
+
+def title_shard(key: str) -> int:
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:8], 16) % TITLE_SHARDS
+
+
+def _category(category: str) -> str:
+    # "#" separates the parts of counter names
+    return (category or 'uncategorized').replace('#', '-')
+
+
+def _severity(risk: Dict[str, Any]) -> str:
+    severity = str(risk.get('severity', '')).lower()
+    return severity if severity in SEVERITIES else 'unknown'
+
+
+def policy_counters(category: str, policy_type: str, risks: Iterable[Dict[str, Any]]) -> Tuple[Counter, Counter]:
+    """(main counters, title counters) contributed by one policy's risks"""
+    main: Counter = Counter()
+    titles: Counter = Counter()
+    category = _category(category)
+    for risk in risks or []:
+        severity = _severity(risk)
+        main[f"risks#{policy_type}#{severity}"] += 1
+        main[f"category_risks#{category}#{severity}"] += 1
+        key = title_key(risk.get('title'))
+        if key:
+            titles[key] += 1
+    return main, titles
+
+
+def company_counters(item: Dict[str, Any], policy_types: Iterable[str]) -> Tuple[Counter, Counter]:
+    """(main counters, title counters) contributed by a whole company item"""
+    category = _category(item.get('category'))
+    main: Counter = Counter({"companies": 1, f"category#{category}": 1})
+    titles: Counter = Counter()
+    for policy_type in policy_types:
+        policy_main, policy_titles = policy_counters(category, policy_type, item.get(f'{policy_type}_risks'))
+        main.update(policy_main)
+        titles.update(policy_titles)
+    return main, titles
+
+
+def difference(new: Counter, old: Counter) -> Dict[str, int]:
+    """Non-zero deltas from old to new (negative values kept)"""
+    delta = Counter(new)
+    delta.subtract(old)
+    return {key: value for key, value in delta.items() if value}
+
+
+def shard_titles(titles: Dict[str, int], limit: int = None) -> Dict[int, Dict[str, int]]:
+    """Title counters per shard, as attribute names ("t#" keeps titles clear of "id")"""
+    shards: Dict[int, Dict[str, int]] = {}
+    for key, value in sorted(titles.items(), key=lambda kv: kv[1], reverse=True):
+        shard = shards.setdefault(title_shard(key), {})
+        if limit is None or len(shard) < limit:
+            shard[f"t#{key}"] = value
+    return shards
+
+
+def summarize(main_item: Dict[str, Any], title_items: List[Dict[str, Any]], top: int = 20) -> Dict[str, Any]:
+    """Shape the stored counters for GET /api/stats"""
+    stats = {
+        "companies": 0,
+        "companies_by_category": {},
+        "risks_by_severity": {"total": {}},
+        "risks_by_category": {},
+        "top_risk_titles": [],
+        "updated_at": main_item.get('last_updated'),
+        # Set when an update failed; the counters may be off until a rebuild
+        "dirty_since": main_item.get('dirty_since'),
+    }
+    for name, value in main_item.items():
+        if not isinstance(value, (int, float, Decimal)) or value <= 0:
+            continue
+        value = int(value)
+        parts = name.split('#')
+        if name == "companies":
+            stats["companies"] = value
+        elif parts[0] == "category" and len(parts) == 2:
+            stats["companies_by_category"][parts[1]] = value
+        elif parts[0] == "risks" and len(parts) == 3:
+            _, policy_type, severity = parts
+            stats["risks_by_severity"].setdefault(policy_type, {})[severity] = value
+            total = stats["risks_by_severity"]["total"]
+            total[severity] = total.get(severity, 0) + value
+        elif parts[0] == "category_risks" and len(parts) == 3:
+            _, category, severity = parts
+            stats["risks_by_category"].setdefault(category, {})[severity] = value
+
+    counts = Counter()
+    for item in title_items:
+        for name, value in item.items():
+            if name.startswith('t#') and isinstance(value, (int, float, Decimal)) and value > 0:
+                counts[name[2:]] += int(value)
+    stats["top_risk_titles"] = [{"title": title, "count": count} for title, count in counts.most_common(top)]
+    return stats
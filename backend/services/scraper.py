@@ -1,8 +1,78 @@
 import requests
 from bs4 import BeautifulSoup
-from typing import Optional
+from bs4.element import CData, NavigableString, Tag
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+import codecs
+import os
 import re
 
+from .metrics import observe_stage
+
+
+# Common selectors for terms/policy pages, in priority order. Each entry is
+# (kind, value) where kind is "tag", "role", "class" or "id" so they can be
+# matched during the single tree walk instead of one select_one() per selector.
+CONTENT_SELECTORS = [
+    ('tag', 'main'),
+    ('tag', 'article'),
+    ('role', 'main'),
+    ('class', 'terms-content'),
+    ('class', 'policy-content'),
+    ('class', 'legal-content'),
+    ('class', 'terms-and-conditions'),
+    ('class', 'content'),
+    ('id', 'content'),
+    ('id', 'main-content'),
+    ('class', 'main-content'),
+    ('class', 'post-content'),
+    ('class', 'entry-content'),
+    ('class', 'page-content'),
+]
+
+# Minimum amount of text a node needs to be considered the main content
+MIN_CONTENT_CHARS = 500
+
+# Keep descending into a child while it holds at least this share of its
+# parent's non-link text
+DESCEND_RATIO = 0.6
+
+# Content types we are willing to parse
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'application/xml', 'text/xml')
+TEXT_CONTENT_TYPES = ('text/plain',)
+
+# Stop downloading once the page has this many times max_text_chars of
+# visible text - navigation and boilerplate are dropped later, so keep margin
+TEXT_DOWNLOAD_FACTOR = 4
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?\s*([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+
+
+class _VisibleTextCounter(HTMLParser):
+    """
+    Incremental HTML tokenizer that counts visible text as chunks arrive,
+    so the download can stop once the page holds enough text.
+    """
+
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.visible_chars = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.visible_chars += len(data.strip())
+
 
 class ScraperService:
     def __init__(self):
@@ -12,16 +82,30 @@ class ScraperService:
             'Accept-Language': 'en-US,en;q=0.5',
         }
         self.timeout = 15
+        # Maximum number of characters kept from a page
+        self.max_text_chars = 50000
+        # Maximum number of (decompressed) bytes read from a response
+        self.max_bytes = int(os.getenv('SCRAPER_MAX_BYTES', 5 * 1024 * 1024))
+        self.chunk_size = 64 * 1024
 
     def fetch_terms_from_url(self, url: str) -> str:
         """
         Fetch and extract terms and conditions text from a URL
         """
+        with observe_stage('scrape', 'fetch', url=url):
+            return self._fetch_terms(url)
+
+    def _fetch_terms(self, url: str) -> str:
         try:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
-            response.raise_for_status()
+            html, is_plain_text = self._download(url)
 
-            soup = BeautifulSoup(response.content, 'lxml')
+            if is_plain_text:
+                text = self._clean_text(html)
+                if len(text) < 100:
+                    raise ValueError("Could not extract meaningful content from the page")
+                return text
+
+            soup = BeautifulSoup(html, 'lxml')
 
             # Remove unwanted elements
             for element in soup(['script', 'style', 'nav', 'header', 'footer',
@@ -31,12 +115,11 @@ class ScraperService:
             # Try to find main content area
             main_content = self._find_main_content(soup)
 
-            if main_content:
-                text = main_content.get_text(separator='\n', strip=True)
-            else:
+            if main_content is None:
                 # Fallback to body
-                body = soup.find('body')
-                text = body.get_text(separator='\n', strip=True) if body else ''
+                main_content = soup.find('body')
+
+            text = self._extract_text(main_content) if main_content else ''
 
             # Clean up the text
             text = self._clean_text(text)
@@ -52,45 +135,215 @@ class ScraperService:
             raise ValueError("Could not connect to the website. Please check the URL.")
         except requests.exceptions.HTTPError as e:
             raise ValueError(f"HTTP error: {e.response.status_code}")
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to fetch content: {str(e)}")
 
-    def _find_main_content(self, soup: BeautifulSoup) -> Optional[BeautifulSoup]:
+    def _download(self, url: str) -> Tuple[str, bool]:
         """
-        Try to find the main content area of the page
+        Stream a page, capped at max_bytes of decompressed content.
+
+        The content type is checked before any body is read, and the download
+        stops early once enough visible text has arrived. Returns the decoded
+        page and whether it is plain text rather than HTML.
         """
-        # Common selectors for terms/policy pages
-        selectors = [
-            'main',
-            'article',
-            '[role="main"]',
-            '.terms-content',
-            '.policy-content',
-            '.legal-content',
-            '.terms-and-conditions',
-            '.content',
-            '#content',
-            '#main-content',
-            '.main-content',
-            '.post-content',
-            '.entry-content',
-            '.page-content',
-        ]
+        with requests.get(url, headers=self.headers, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            is_plain_text = content_type in TEXT_CONTENT_TYPES
+            if content_type and not is_plain_text and content_type not in HTML_CONTENT_TYPES:
+                raise ValueError(f"Unsupported content type: {content_type}")
+
+            content_length = response.headers.get('Content-Length')
+            if content_length and content_length.isdigit() and int(content_length) > self.max_bytes * 4:
+                # Compressed size alone is far beyond what we would keep
+                raise ValueError("Page is too large to process")
+
+            encoding = self._header_encoding(response.headers.get('Content-Type', ''))
+            counter = None if is_plain_text else _VisibleTextCounter()
+            decoder = None
+            text_target = self.max_text_chars * TEXT_DOWNLOAD_FACTOR
+
+            head = b''
+            parts = []
+            received = 0
+            # iter_content yields decompressed bytes, so the cap also bounds gzip bombs
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if not chunk:
+                    continue
+                chunk = chunk[:self.max_bytes - received]
+                received += len(chunk)
+
+                if decoder is None:
+                    # Wait for enough bytes to sniff a BOM or <meta charset>
+                    head += chunk
+                    if encoding is None and len(head) < 1024 and received < self.max_bytes:
+                        continue
+                    encoding = encoding or self._sniff_encoding(head)
+                    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                    chunk = head
 
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element and len(element.get_text(strip=True)) > 500:
+                decoded = decoder.decode(chunk)
+                parts.append(decoded)
+                if counter is not None:
+                    counter.feed(decoded)
+                    enough = counter.visible_chars >= text_target
+                else:
+                    enough = received >= text_target
+                if enough or received >= self.max_bytes:
+                    break
+
+        if decoder is None:
+            # Short response that never filled the sniffing buffer
+            return head.decode(encoding or self._sniff_encoding(head), errors='replace'), is_plain_text
+
+        parts.append(decoder.decode(b'', final=True))
+        return ''.join(parts), is_plain_text
+
+    def _header_encoding(self, content_type: str) -> Optional[str]:
+        """Charset from the Content-Type header, if it names a known codec"""
+        match = re.search(r'charset=["\']?([^"\';\s]+)', content_type, re.IGNORECASE)
+        return self._valid_encoding(match.group(1)) if match else None
+
+    def _sniff_encoding(self, head: bytes) -> str:
+        """Charset from a byte order mark or <meta> tag, defaulting to UTF-8"""
+        for bom, encoding in ((codecs.BOM_UTF8, 'utf-8-sig'),
+                              (codecs.BOM_UTF16_LE, 'utf-16'),
+                              (codecs.BOM_UTF16_BE, 'utf-16')):
+            if head.startswith(bom):
+                return encoding
+
+        match = _META_CHARSET.search(head[:4096])
+        if match:
+            encoding = self._valid_encoding(match.group(1).decode('ascii', errors='ignore'))
+            if encoding:
+                return encoding
+
+        return 'utf-8'
+
+    def _valid_encoding(self, name: str) -> Optional[str]:
+        """
+        Normalized codec name, if it is a text encoding. Binary transforms
+        (base64, zlib_codec, rot13...) are rejected, so a hostile charset falls
+        back to the sniffed or default encoding.
+        """
+        try:
+            info = codecs.lookup(name)
+        except LookupError:
+            return None
+        # Set to False by the standard library's bytes-to-bytes and str-to-str codecs
+        return info.name if getattr(info, '_is_text_encoding', True) else None
+
+    def _find_main_content(self, soup: BeautifulSoup) -> Optional[Tag]:
+        """
+        Try to find the main content area of the page.
+
+        Walks the tree once, recording the first match for each content
+        selector and computing text and link-text lengths bottom-up, so no
+        node's text is traversed more than once.
+        """
+        stats, matches = self._measure_tree(soup)
+
+        for selector in CONTENT_SELECTORS:
+            element = matches.get(selector)
+            if element is not None and stats[id(element)][0] > MIN_CONTENT_CHARS:
                 return element
 
-        # Try finding largest text block
-        paragraphs = soup.find_all(['p', 'div', 'section'])
-        if paragraphs:
-            largest = max(paragraphs, key=lambda x: len(x.get_text(strip=True)), default=None)
-            if largest and len(largest.get_text(strip=True)) > 500:
-                return largest.parent if largest.parent else largest
+        # No selector matched - descend from the body towards the densest block
+        root = soup.find('body') or soup
+        if not isinstance(root, Tag) or id(root) not in stats:
+            return None
+
+        node = root
+        while True:
+            text_len, link_len = stats[id(node)]
+            own_text = text_len - link_len
+            best_child = None
+            best_text = 0
+            for child in node.contents:
+                if not isinstance(child, Tag):
+                    continue
+                child_text, child_links = stats[id(child)]
+                if child_text - child_links > best_text:
+                    best_child = child
+                    best_text = child_text - child_links
+            if best_child is None or best_text < own_text * DESCEND_RATIO:
+                break
+            node = best_child
 
+        text_len, link_len = stats[id(node)]
+        if text_len - link_len > MIN_CONTENT_CHARS:
+            return node
         return None
 
+    def _measure_tree(self, soup: BeautifulSoup) -> Tuple[Dict[int, Tuple[int, int]], Dict[Tuple[str, str], Tag]]:
+        """
+        Single iterative walk over the tree.
+
+        Returns a map of id(tag) -> (text_len, link_text_len), where lengths
+        match get_text(strip=True), and the first tag in document order that
+        matches each entry of CONTENT_SELECTORS.
+        """
+        wanted = set(CONTENT_SELECTORS)
+        matches: Dict[Tuple[str, str], Tag] = {}
+        stats: Dict[int, Tuple[int, int]] = {}
+
+        stack: List[Tuple[Tag, bool]] = [(soup, False)]
+        while stack:
+            node, visited = stack.pop()
+
+            if visited:
+                text_len = 0
+                link_len = 0
+                for child in node.contents:
+                    if isinstance(child, Tag):
+                        child_text, child_links = stats[id(child)]
+                        text_len += child_text
+                        link_len += child_links
+                    elif type(child) in (NavigableString, CData):
+                        text_len += len(child.strip())
+                if node.name == 'a':
+                    link_len = text_len
+                stats[id(node)] = (text_len, link_len)
+                continue
+
+            # Pre-order visit: record selector matches in document order
+            if len(matches) < len(wanted):
+                candidates = [('tag', node.name)]
+                if node.get('role'):
+                    candidates.append(('role', node.get('role')))
+                if node.get('id'):
+                    candidates.append(('id', node.get('id')))
+                for class_name in node.get('class') or []:
+                    candidates.append(('class', class_name))
+                for candidate in candidates:
+                    if candidate in wanted and candidate not in matches:
+                        matches[candidate] = node
+
+            stack.append((node, True))
+            children = [child for child in node.contents if isinstance(child, Tag)]
+            stack.extend((child, False) for child in reversed(children))
+
+        return stats, matches
+
+    def _extract_text(self, element: Tag) -> str:
+        """
+        Same as element.get_text(separator='\n', strip=True), but stops once
+        enough text has been collected for _clean_text to fill its limit.
+        """
+        # Allow some slack, since cleaning may drop a little text
+        budget = self.max_text_chars * 2
+        parts = []
+        collected = 0
+        for string in element.stripped_strings:
+            parts.append(string)
+            collected += len(string) + 1
+            if collected >= budget:
+                break
+        return '\n'.join(parts)
+
     def _clean_text(self, text: str) -> str:
         """
         Clean up extracted text
@@ -109,8 +362,8 @@ class ScraperService:
         for pattern in patterns_to_remove:
             text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.DOTALL)
 
-        # Trim to reasonable length (keep first 50k chars)
-        if len(text) > 50000:
-            text = text[:50000] + '\n\n[Content truncated...]'
+        # Trim to reasonable length (keep first max_text_chars chars)
+        if len(text) > self.max_text_chars:
+            text = text[:self.max_text_chars] + '\n\n[Content truncated...]'
 
         return text.strip()
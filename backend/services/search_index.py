@@ -0,0 +1,231 @@
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .risk_stats import SEVERITIES
+
+logger = logging.getLogger(__name__)
+
+# Field weights for ranking; a prefix match scores half of a whole-token match
+FIELD_WEIGHTS = {'name': 4.0, 'category': 2.0, 'risk_title': 1.5, 'summary': 0.5}
+PREFIX_FACTOR = 0.5
+MIN_PREFIX = 2
+
+# Rebuild from a full scan when older than this, so writes made by other
+# processes show up eventually (0 = only rebuild on first use)
+MAX_AGE_SECONDS = float(os.getenv('SEARCH_INDEX_MAX_AGE', '300'))
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(str(text or '').lower())
+
+
+class CompanySearchIndex:
+    """
+    In-process inverted index over company names, categories, policy summaries
+    and risk titles, with category and severity facets.
+
+    Built from a full scan on first use and kept current by DynamoDBService,
+    which applies every write here. Query tokens must all match, each either as
+    a whole token or as a prefix of one (so "goo" finds "Google").
+    """
+
+    def __init__(self, load: Callable[[], Iterable[Dict[str, Any]]], policy_types: Iterable[str],
+                 max_age: float = MAX_AGE_SECONDS):
+        self._load = load
+        self.policy_types = tuple(policy_types)
+        self.max_age = max_age
+        # token -> company id -> weight
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # Sorted tokens, for prefix lookups
+        self._vocabulary: List[str] = []
+        # company id -> list-view fields, tokens and weights, per-policy text
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.built_at: Optional[float] = None
+
+    # -- maintenance --------------------------------------------------------
+
+    def _ensure_built(self):
+        if self.built_at is None or (self.max_age and time.monotonic() - self.built_at > self.max_age):
+            self.rebuild()
+
+    def rebuild(self) -> int:
+        """Re-index every company from the table; returns the number indexed"""
+        start = time.perf_counter()
+        companies = list(self._load())
+        with self._lock:
+            self._postings, self._vocabulary, self._docs = {}, [], {}
+            for company in companies:
+                self._index(company, insort=False)
+            self._vocabulary = sorted(self._postings)
+            self.built_at = time.monotonic()
+        logger.info("Search index built: %d companies, %d tokens in %.0f ms",
+                    len(companies), len(self._vocabulary), (time.perf_counter() - start) * 1000)
+        return len(companies)
+
+    def _index(self, company: Dict[str, Any], insort: bool = True):
+        """Add one company's document (caller holds the lock)"""
+        weights: Counter = Counter()
+        for token in tokenize(company.get('name')):
+            weights[token] += FIELD_WEIGHTS['name']
+        for token in tokenize(company.get('category')):
+            weights[token] += FIELD_WEIGHTS['category']
+        severities: Counter = Counter()
+        for policy_type in self.policy_types:
+            for token in tokenize(company.get(f'{policy_type}_summary')):
+                weights[token] += FIELD_WEIGHTS['summary']
+            for risk in company.get(f'{policy_type}_risks') or []:
+                for token in tokenize(risk.get('title')):
+                    weights[token] += FIELD_WEIGHTS['risk_title']
+                severity = str(risk.get('severity', '')).lower()
+                if severity in SEVERITIES:
+                    severities[severity] += 1
+
+        company_id = company['id']
+        self._docs[company_id] = {
+            'company': {
+                'id': company_id,
+                'name': company.get('name', ''),
+                'icon_url': company.get('icon_url'),
+                'category': company.get('category', ''),
+                'last_updated': company.get('last_updated'),
+                'risk_counts': {severity: severities[severity] for severity in SEVERITIES},
+            },
+            'weights': dict(weights),
+            # Kept so a single policy update can re-index without reading the item
+            'source': {key: company.get(key) for key in ('name', 'icon_url', 'category', 'last_updated')}
+                      | {f'{p}_{field}': company.get(f'{p}_{field}') for p in self.policy_types
+                         for field in ('summary', 'risks')},
+        }
+        for token, weight in weights.items():
+            if insort and token not in self._postings:
+                bisect.insort(self._vocabulary, token)
+            self._postings.setdefault(token, {})[company_id] = weight
+
+    def _unindex(self, company_id: str) -> Optional[Dict[str, Any]]:
+        doc = self._docs.pop(company_id, None)
+        if doc:
+            for token in doc['weights']:
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(company_id, None)
+                    if not postings:
+                        del self._postings[token]
+                        del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+        return doc
+
+    def _replace(self, company: Dict[str, Any]):
+        with self._lock:
+            self._unindex(company['id'])
+            self._index(company)
+
+    def upsert(self, company: Dict[str, Any]):
+        """Index a created (or fully re-read) company; no-op until the index is built"""
+        if self.built_at is not None:
+            self._replace(company)
+
+    def update_policy(self, company_id: str, policy_type: str, risks: List[Dict], summary: str,
+                      last_updated: str = None):
+        """Apply a policy analysis update to an indexed company"""
+        if self.built_at is None:
+            return
+        with self._lock:
+            doc = self._docs.get(company_id)
+            if doc is None:
+                return
+            company = {**doc['source'], 'id': company_id,
+                       f'{policy_type}_risks': risks, f'{policy_type}_summary': summary}
+            if last_updated:
+                company['last_updated'] = last_updated
+            self._replace(company)
+
+    def remove(self, company_id: str):
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._unindex(company_id)
+
+    def invalidate(self):
+        """Rebuild on next search, e.g. after a bulk change made outside the write hooks"""
+        self.built_at = None
+
+    # -- queries ------------------------------------------------------------
+
+    def _match(self, token: str) -> Dict[str, float]:
+        """Company id -> score for one query token (whole-token and prefix matches)"""
+        scores = dict(self._postings.get(token, {}))
+        if len(token) >= MIN_PREFIX:
+            i = bisect.bisect_left(self._vocabulary, token)
+            while i < len(self._vocabulary) and self._vocabulary[i].startswith(token):
+                candidate = self._vocabulary[i]
+                if candidate != token:
+                    for company_id, weight in self._postings[candidate].items():
+                        scores[company_id] = max(scores.get(company_id, 0.0), weight * PREFIX_FACTOR)
+                i += 1
+        return scores
+
+    def search(self, q: str = '', category: str = None, severity: str = None,
+               offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """
+        One page of matching companies (best match first, by name without a
+        query) and category/severity facets over all matches
+        """
+        self._ensure_built()
+        tokens = tokenize(q)
+        with self._lock:
+            if tokens:
+                scores: Optional[Dict[str, float]] = None
+                for token in dict.fromkeys(tokens):
+                    matches = self._match(token)
+                    if scores is None:
+                        scores = matches
+                    else:
+                        scores = {cid: score + matches[cid] for cid, score in scores.items() if cid in matches}
+                    if not scores:
+                        break
+                scores = scores or {}
+            else:
+                scores = {company_id: 0.0 for company_id in self._docs}
+
+            # Facets count matches before the filter on their own dimension
+            facets = {'category': Counter(), 'severity': Counter()}
+            matched: List[Dict[str, Any]] = []
+            for company_id, score in scores.items():
+                company = self._docs[company_id]['company']
+                in_category = not category or company['category'] == category
+                has_severity = not severity or company['risk_counts'].get(severity, 0) > 0
+                if has_severity:
+                    facets['category'][company['category']] += 1
+                if in_category:
+                    for level, count in company['risk_counts'].items():
+                        if count:
+                            facets['severity'][level] += 1
+                if in_category and has_severity:
+                    matched.append({**company, 'risk_counts': dict(company['risk_counts']),
+                                    'score': round(score, 2)})
+
+        matched.sort(key=lambda c: (-c['score'], c['name'].lower()))
+        offset, limit = max(0, offset), max(0, limit)
+        return {
+            'total': len(matched),
+            'offset': offset,
+            'limit': limit,
+            'items': matched[offset:offset + limit],
+            'facets': {name: dict(counts.most_common()) for name, counts in facets.items()},
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'companies': len(self._docs),
+                'tokens': len(self._vocabulary),
+                'age_seconds': round(time.monotonic() - self.built_at, 1) if self.built_at is not None else None,
+            }
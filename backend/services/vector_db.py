@@ -1,54 +1,120 @@
-import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from requests_aws4auth import AWS4Auth
-from typing import List, Dict, Any, Optional
+from opensearchpy import OpenSearch, Urllib3AWSV4SignerAuth, Urllib3HttpConnection
+from typing import List, Dict, Any, Optional, Tuple
+import logging
 import os
 import re
+import threading
 import time
 
+from .aws import MAX_POOL_CONNECTIONS, TIMEOUT_PROFILES, aws_clients
+from .metrics import observe_stage
+from .retrieval import (CONTEXT_BUDGET_CHARS, EXPAND_NEIGHBORS, MAX_CANDIDATES, MMR_CANDIDATE_FACTOR,
+                        fit_context, mmr_select, neighbor_positions, strip_overlaps)
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# How stale this process's copy of the tombstones may get (deletes made by other processes)
+TOMBSTONE_REFRESH_SECONDS = float(os.getenv('VECTOR_TOMBSTONE_REFRESH_SECONDS', '1'))
+
+
+def interleave(results: Dict[str, List[Dict[str, Any]]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Round-robin per-company result lists by rank (every company's best chunk,
+    then every second best, ...), so no company crowds out the others
+    """
+    merged = []
+    lists = [chunks for chunks in results.values() if chunks]
+    for rank in range(max((len(chunks) for chunks in lists), default=0)):
+        merged.extend(chunks[rank] for chunks in lists if rank < len(chunks))
+    return merged[:limit] if limit is not None else merged
+
+
+class MeteredConnection(Urllib3HttpConnection):
+    """Pooled OpenSearch connection that records latency and errors per API"""
+
+    def perform_request(self, method, url, *args, **kwargs):
+        # "/tc-chunks/_search" -> "search", "/tc-chunks/_doc/123" -> "doc", "/tc-chunks" -> "head"
+        endpoints = [part for part in url.split('?')[0].split('/') if part.startswith('_')]
+        operation = endpoints[0].lstrip('_') if endpoints else method.lower()
+        with observe_stage('opensearch', operation):
+            return super().perform_request(method, url, *args, **kwargs)
+
 
 class VectorDBService:
-    def __init__(self, bedrock_service):
+    def __init__(self, bedrock_service, tombstone_store=None):
         """
-        Initialize OpenSearch Serverless client for vector storage
+        Configure OpenSearch Serverless vector storage. The client is created
+        (and the index checked) on first use, so construction never touches the network.
+        Tombstones are kept in tombstone_store (DynamoDBService) when given,
+        so every process sees them; without one they live in this process only.
         """
         self.bedrock = bedrock_service
         self.index_name = "tc-chunks"
 
         # OpenSearch Serverless configuration
         self.collection_endpoint = "mryy2glg64insuvi1bw6.us-west-2.aoss.amazonaws.com"
-        self.region = os.environ.get('AWS_DEFAULT_REGION', 'us-west-2')
-
-        # Get AWS credentials
-        session = boto3.Session()
-        credentials = session.get_credentials()
-
-        # Create AWS4Auth for OpenSearch Serverless
-        self.auth = AWS4Auth(
-            credentials.access_key,
-            credentials.secret_key,
+        self.region = aws_clients.region
+
+        self._client = None
+        self._client_lock = threading.Lock()
+
+        # Pending deletes by key: "company#<id>" hides a whole company,
+        # "before#<id>#<policy>#<generation>" a policy's chunks indexed before a
+        # cutoff and "generation#<id>#<policy>#<generation>" one incomplete
+        # indexing run. Searches filter them out at once; VectorReconciler purges
+        # them and clears the tombstone.
+        self.tombstone_store = tombstone_store
+        self._tombstones: Dict[str, Dict[str, Any]] = {}
+        # Keys whose write to the store failed -> the keys they replace
+        self._unsaved: Dict[str, List[str]] = {}
+        self._tombstones_loaded_at = float('-inf')
+        self._tombstone_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Lazy initialize the OpenSearch client and ensure the index exists"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._connect()
+        return self._client
+
+    def _connect(self):
+        # SigV4 auth from the shared session's refreshable credentials
+        auth = Urllib3AWSV4SignerAuth(
+            aws_clients.credentials(),
             self.region,
-            'aoss',  # Service name for OpenSearch Serverless
-            session_token=credentials.token
+            'aoss'  # Service name for OpenSearch Serverless
         )
 
-        # Initialize OpenSearch client
-        self.client = OpenSearch(
+        # OpenSearch client on a pooled urllib3 connection
+        _, read_timeout = TIMEOUT_PROFILES['opensearch']
+        client = OpenSearch(
             hosts=[{'host': self.collection_endpoint, 'port': 443}],
-            http_auth=self.auth,
+            http_auth=auth,
             use_ssl=True,
             verify_certs=True,
-            connection_class=RequestsHttpConnection,
-            timeout=30
+            connection_class=MeteredConnection,
+            pool_maxsize=MAX_POOL_CONNECTIONS,
+            timeout=read_timeout,
+            max_retries=3,
+            retry_on_timeout=True
         )
 
-        # Ensure index exists
-        self._ensure_index()
+        self._ensure_index(client)
+        return client
 
-    def _ensure_index(self):
+    def warmup(self):
+        """Create the client, check the index and open a pooled connection. Raises if unreachable."""
+        self.client.indices.exists(index=self.index_name)
+        self.refresh_tombstones(force=True)
+
+    def _ensure_index(self, client):
         """Create the vector index if it doesn't exist"""
         try:
-            if not self.client.indices.exists(index=self.index_name):
+            if not client.indices.exists(index=self.index_name):
                 # Create index with knn vector mapping
                 # Titan embeddings have 1536 dimensions
                 index_body = {
@@ -72,14 +138,15 @@ class VectorDBService:
                             "company_id": {"type": "keyword"},
                             "company_name": {"type": "text"},
                             "policy_type": {"type": "keyword"},  # terms, cookie, privacy
-                            "chunk_index": {"type": "integer"}
+                            "chunk_index": {"type": "integer"},
+                            "indexed_at": {"type": "long"}  # generation (epoch ms) of the indexing run
                         }
                     }
                 }
-                self.client.indices.create(index=self.index_name, body=index_body)
-                print(f"Created index: {self.index_name}")
+                client.indices.create(index=self.index_name, body=index_body)
+                logger.info("Created index: %s", self.index_name)
         except Exception as e:
-            print(f"Index check/creation error (may be expected): {e}")
+            logger.warning("Index check/creation error (may be expected): %s", e)
 
     def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """
@@ -125,47 +192,63 @@ class VectorDBService:
             policy_text: The policy text to index
             policy_type: Type of policy - "terms", "cookie", or "privacy"
         """
-        # First, remove any existing chunks for this company and policy type
-        self.remove_company_policy(company_id, policy_type)
-
-        # Chunk the text
-        chunks = self.chunk_text(policy_text)
-
-        if not chunks:
-            return 0
-
-        indexed_count = 0
-
-        for i, chunk in enumerate(chunks):
-            try:
-                embedding = self.bedrock.generate_embedding(chunk)
-
-                doc = {
-                    "embedding": embedding,
-                    "text": chunk,
-                    "company_id": company_id,
-                    "company_name": company_name,
-                    "policy_type": policy_type,
-                    "chunk_index": i
-                }
+        with tracer.span("vector.index_policy", company_id=company_id, policy_type=policy_type) as span:
+            # Chunks are stamped with this run's generation; the previous ones
+            # are tombstoned afterwards instead of being deleted up front
+            generation = int(time.time() * 1000)
+
+            # Chunk the text
+            chunks = self.chunk_text(policy_text)
+            span.set_attribute("chunks", len(chunks))
+
+            indexed_count = 0
+
+            for i, chunk in enumerate(chunks):
+                try:
+                    # One child span per chunk, holding its embedding and index calls
+                    with tracer.span("vector.index_chunk", chunk_index=i, chars=len(chunk)):
+                        embedding = self.bedrock.generate_embedding(chunk)
+
+                        doc = {
+                            "embedding": embedding,
+                            "text": chunk,
+                            "company_id": company_id,
+                            "company_name": company_name,
+                            "policy_type": policy_type,
+                            "chunk_index": i,
+                            "indexed_at": generation
+                        }
 
-                self.client.index(
-                    index=self.index_name,
-                    body=doc
-                )
-                indexed_count += 1
+                        self.client.index(
+                            index=self.index_name,
+                            body=doc
+                        )
+                    indexed_count += 1
 
-            except Exception as e:
-                print(f"Error indexing {policy_type} chunk {i}: {e}")
-                continue
+                except Exception as e:
+                    logger.warning("Error indexing %s chunk %d: %s", policy_type, i, e)
+                    continue
 
-        # Refresh index to make documents searchable
-        try:
-            self.client.indices.refresh(index=self.index_name)
-        except Exception as e:
-            print(f"Refresh error: {e}")
-
-        return indexed_count
+            if indexed_count == len(chunks):
+                # Complete: hide the earlier generations; the reconciler deletes them
+                self.tombstone_policy(company_id, policy_type, before=generation)
+            else:
+                # Incomplete: the previous generation stays live and this one is discarded
+                logger.warning("Indexed %d of %d %s chunks for %s, keeping the previous version",
+                               indexed_count, len(chunks), policy_type, company_id)
+                self.tombstone_generation(company_id, policy_type, generation)
+                span.set_attribute("chunks_discarded", indexed_count)
+                indexed_count = 0
+
+            if indexed_count:
+                # Refresh index to make documents searchable
+                try:
+                    self.client.indices.refresh(index=self.index_name)
+                except Exception as e:
+                    logger.warning("Refresh error: %s", e)
+
+            span.set_attribute("chunks_indexed", indexed_count)
+            return indexed_count
 
     def index_company_terms(self, company_id: str, company_name: str, terms_text: str) -> int:
         """
@@ -185,49 +268,224 @@ class VectorDBService:
         """
         return self.index_policy(company_id, company_name, privacy_text, "privacy")
 
-    def remove_company_policy(self, company_id: str, policy_type: str):
-        """
-        Remove all chunks for a company's specific policy type
-        """
+    @staticmethod
+    def _policy_query(company_id: str, policy_type: str, before: int) -> Dict[str, Any]:
+        """A policy's chunks from generations before `before` (or indexed before generations existed)"""
+        return {
+            "bool": {
+                "filter": [
+                    {"term": {"company_id": company_id}},
+                    {"term": {"policy_type": policy_type}}
+                ],
+                "should": [
+                    {"range": {"indexed_at": {"lt": before}}},
+                    {"bool": {"must_not": [{"exists": {"field": "indexed_at"}}]}}
+                ],
+                "minimum_should_match": 1
+            }
+        }
+
+    @staticmethod
+    def _generation_query(company_id: str, policy_type: str, generation: int) -> Dict[str, Any]:
+        """A policy's chunks from one indexing run"""
+        return {
+            "bool": {
+                "filter": [
+                    {"term": {"company_id": company_id}},
+                    {"term": {"policy_type": policy_type}},
+                    {"term": {"indexed_at": generation}}
+                ]
+            }
+        }
+
+    def _tombstone_query(self, tombstone: Dict[str, Any]) -> Dict[str, Any]:
+        company_id, policy_type = tombstone["company_id"], tombstone["policy_type"]
+        if policy_type is None:
+            return {"term": {"company_id": company_id}}
+        if tombstone["generation"] is not None:
+            return self._generation_query(company_id, policy_type, tombstone["generation"])
+        return self._policy_query(company_id, policy_type, tombstone["before"])
+
+    @staticmethod
+    def _tombstone_key(tombstone: Dict[str, Any]) -> str:
+        """Unique, immutable key: a superseding tombstone gets a new key instead of overwriting one"""
+        if tombstone["policy_type"] is None:
+            return f"company#{tombstone['company_id']}"
+        if tombstone["generation"] is not None:
+            return f"generation#{tombstone['company_id']}#{tombstone['policy_type']}#{tombstone['generation']}"
+        return f"before#{tombstone['company_id']}#{tombstone['policy_type']}#{tombstone['before']}"
+
+    def _add_tombstone(self, company_id: str, policy_type: Optional[str] = None,
+                       before: Optional[int] = None, generation: Optional[int] = None):
+        tombstone = {
+            "company_id": company_id,
+            "policy_type": policy_type,
+            "before": before,
+            "generation": generation,
+            "created_at": time.time()
+        }
+        key = self._tombstone_key(tombstone)
+        with self._tombstone_lock:
+            tombstones = self._tombstones
+            if f"company#{company_id}" in tombstones:
+                # The company purge covers everything of the company
+                return
+            if policy_type is None:
+                replaces = [k for k, t in tombstones.items() if t["company_id"] == company_id]
+            elif generation is None:
+                superseded = [t for t in tombstones.values() if t["company_id"] == company_id
+                              and t["policy_type"] == policy_type and t["before"] is not None]
+                if any(t["before"] >= before for t in superseded):
+                    return
+                replaces = [self._tombstone_key(t) for t in superseded]
+            else:
+                replaces = []
+            for k in replaces:
+                del tombstones[k]
+            tombstones[key] = tombstone
+        self._save_tombstone(key, tombstone, replaces)
+
+    def _save_tombstone(self, key: str, tombstone: Dict[str, Any], replaces: List[str] = ()):
+        """Write a tombstone through to the store; one that fails is retried on the next refresh"""
+        if self.tombstone_store is None:
+            return
         try:
-            self.client.delete_by_query(
-                index=self.index_name,
-                body={
-                    "query": {
-                        "bool": {
-                            "must": [
-                                {"term": {"company_id": company_id}},
-                                {"term": {"policy_type": policy_type}}
-                            ]
-                        }
-                    }
-                }
-            )
+            self.tombstone_store.put_tombstone(key, tombstone, replaces)
         except Exception as e:
-            print(f"Error removing {policy_type} for company {company_id}: {e}")
-
-    def remove_company(self, company_id: str):
+            logger.warning("Saving vector tombstone %s failed, will retry: %s", key, e)
+            with self._tombstone_lock:
+                self._unsaved[key] = replaces
+        else:
+            with self._tombstone_lock:
+                self._unsaved.pop(key, None)
+
+    def refresh_tombstones(self, force: bool = False):
         """
-        Remove all chunks for a company (all policy types)
+        Reload the tombstones from the store (at most every TOMBSTONE_REFRESH_SECONDS
+        unless forced), so deletes made by other processes, or before a restart,
+        are hidden here too. Tombstones not yet saved are kept and saved again.
         """
+        if self.tombstone_store is None:
+            return
+        if not force and time.monotonic() - self._tombstones_loaded_at < TOMBSTONE_REFRESH_SECONDS:
+            return
+        if not self._refresh_lock.acquire(blocking=force):
+            # Another thread is reloading; use the current set meanwhile
+            return
         try:
-            # Delete by query
-            self.client.delete_by_query(
-                index=self.index_name,
-                body={
-                    "query": {
-                        "term": {
-                            "company_id": company_id
+            started = time.time()
+            with self._tombstone_lock:
+                unsaved = {key: (self._tombstones[key], replaces) for key, replaces in self._unsaved.items()
+                           if key in self._tombstones}
+            for key, (tombstone, replaces) in unsaved.items():
+                self._save_tombstone(key, tombstone, replaces)
+            try:
+                stored = self.tombstone_store.get_tombstones()
+            except Exception as e:
+                logger.warning("Loading vector tombstones failed: %s", e)
+                return
+            finally:
+                self._tombstones_loaded_at = time.monotonic()
+            with self._tombstone_lock:
+                # Unsaved ones, and ones added while the store was being read
+                stored.update({key: t for key, t in self._tombstones.items()
+                               if key in self._unsaved or t["created_at"] >= started})
+                self._tombstones = stored
+        finally:
+            self._refresh_lock.release()
+
+    def tombstone_company(self, company_id: str):
+        """Hide all of a company's chunks from search until the reconciler purges them"""
+        self._add_tombstone(company_id)
+
+    def tombstone_policy(self, company_id: str, policy_type: str, before: int):
+        """Hide a policy's chunks indexed before generation `before` until they are purged"""
+        self._add_tombstone(company_id, policy_type, before=before)
+
+    def tombstone_generation(self, company_id: str, policy_type: str, generation: int):
+        """Hide the chunks of one (incomplete) indexing run until they are purged"""
+        self._add_tombstone(company_id, policy_type, generation=generation)
+
+    def is_tombstoned(self, company_id: str) -> bool:
+        self.refresh_tombstones()
+        with self._tombstone_lock:
+            return f"company#{company_id}" in self._tombstones
+
+    def tombstones(self) -> List[Dict[str, Any]]:
+        """Pending deletes (each with its key), oldest first"""
+        self.refresh_tombstones()
+        with self._tombstone_lock:
+            return sorted(({**t, "key": key} for key, t in self._tombstones.items()), key=lambda t: t["created_at"])
+
+    def _tombstone_filters(self, company_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """must_not clauses hiding tombstoned chunks (only one company's, if given)"""
+        self.refresh_tombstones()
+        with self._tombstone_lock:
+            tombstones = [t for t in self._tombstones.values() if not company_id or t["company_id"] == company_id]
+        companies = [t["company_id"] for t in tombstones if t["policy_type"] is None]
+        clauses = [{"terms": {"company_id": companies}}] if companies else []
+        clauses.extend(self._tombstone_query(t) for t in tombstones if t["policy_type"] is not None)
+        return clauses
+
+    def purge(self, tombstone: Dict[str, Any]) -> int:
+        """
+        Delete a tombstone's chunks and clear it. Returns the number of chunks
+        deleted; raises if the delete failed, leaving the tombstone in place.
+        """
+        company_id, policy_type = tombstone["company_id"], tombstone["policy_type"]
+        query = self._tombstone_query(tombstone)
+        with tracer.span("vector.purge", company_id=company_id, policy_type=policy_type or "all"):
+            response = self.client.delete_by_query(index=self.index_name, body={"query": query})
+        if response.get('failures'):
+            raise RuntimeError(f"delete_by_query failures: {response['failures'][:3]}")
+
+        key = self._tombstone_key(tombstone)
+        if self.tombstone_store is not None:
+            self.tombstone_store.remove_tombstone(key)
+        with self._tombstone_lock:
+            self._tombstones.pop(key, None)
+            self._unsaved.pop(key, None)
+        return response.get('deleted', 0)
+
+    def policy_generations(self, max_companies: int = 10000) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Per (company_id, policy_type) in the index: chunk count, chunks with a
+        generation, and the oldest and newest generation. One aggregation request.
+        """
+        body = {
+            "size": 0,
+            "aggs": {
+                "companies": {
+                    "terms": {"field": "company_id", "size": max_companies},
+                    "aggs": {
+                        "policies": {
+                            "terms": {"field": "policy_type", "size": 10},
+                            "aggs": {
+                                "stamped": {"value_count": {"field": "indexed_at"}},
+                                "oldest": {"min": {"field": "indexed_at"}},
+                                "newest": {"max": {"field": "indexed_at"}}
+                            }
                         }
                     }
                 }
-            )
-        except Exception as e:
-            print(f"Error removing company {company_id}: {e}")
+            }
+        }
+        response = self.client.search(index=self.index_name, body=body)
+        generations = {}
+        for company in response.get('aggregations', {}).get('companies', {}).get('buckets', []):
+            for policy in company.get('policies', {}).get('buckets', []):
+                generations[(company['key'], policy['key'])] = {
+                    "chunks": policy['doc_count'],
+                    "stamped": int(policy['stamped']['value'] or 0),
+                    "oldest": policy['oldest']['value'],
+                    "newest": policy['newest']['value']
+                }
+        return generations
 
     def search(self, query: str, n_results: int = 5,
                company_id: Optional[str] = None,
-               policy_type: Optional[str] = None) -> List[Dict[str, Any]]:
+               policy_type: Optional[str] = None,
+               diversify: bool = True) -> List[Dict[str, Any]]:
         """
         Search for relevant chunks based on query using kNN
         
@@ -236,17 +494,20 @@ class VectorDBService:
             n_results: Number of results to return
             company_id: Optional filter by company
             policy_type: Optional filter by policy type (terms, cookie, privacy)
+            diversify: Over-fetch candidates and pick n_results by MMR, then strip
+                text repeated between adjacent chunks
         """
         try:
             # Generate embedding for query
             query_embedding = self.bedrock.generate_embedding(query)
+            candidates = min(n_results * MMR_CANDIDATE_FACTOR, MAX_CANDIDATES) if diversify else n_results
 
             # Build kNN query
             knn_query = {
                 "knn": {
                     "embedding": {
                         "vector": query_embedding,
-                        "k": n_results
+                        "k": candidates
                     }
                 }
             }
@@ -258,22 +519,28 @@ class VectorDBService:
             if policy_type:
                 filters.append({"term": {"policy_type": policy_type}})
 
+            # Pending deletes are hidden until they are purged
+            excluded = self._tombstone_filters(company_id)
+
             # Add filters if any specified
-            if filters:
+            if filters or excluded:
                 search_body = {
-                    "size": n_results,
+                    "size": candidates,
                     "query": {
                         "bool": {
                             "must": [knn_query],
-                            "filter": filters
+                            "filter": filters,
+                            "must_not": excluded
                         }
                     }
                 }
             else:
                 search_body = {
-                    "size": n_results,
+                    "size": candidates,
                     "query": knn_query
                 }
+            if not diversify:
+                search_body["_source"] = {"excludes": ["embedding"]}
 
             # Execute search
             response = self.client.search(
@@ -281,24 +548,138 @@ class VectorDBService:
                 body=search_body
             )
 
-            # Format results
-            formatted = []
-            for hit in response['hits']['hits']:
-                source = hit['_source']
-                formatted.append({
-                    "text": source.get('text'),
-                    "company_id": source.get('company_id'),
-                    "company_name": source.get('company_name'),
-                    "policy_type": source.get('policy_type', 'terms'),
-                    "chunk_index": source.get('chunk_index'),
-                    "score": hit.get('_score')
-                })
+            results = self._format_hits(response, with_embedding=diversify)
+            if diversify:
+                results = mmr_select(query_embedding, results, n_results)
+                for result in results:
+                    result.pop('embedding', None)
+                results = strip_overlaps(results)
+            return results
 
-            return formatted
+        except Exception as e:
+            logger.warning("Error searching: %s", e)
+            return []
 
+    def fetch_chunks(self, positions: List[Tuple[str, str, int]]) -> List[Dict[str, Any]]:
+        """Chunks at (company_id, policy_type, chunk_index) positions, in one request"""
+        if not positions:
+            return []
+        by_policy: Dict[Tuple[str, str], List[int]] = {}
+        for company_id, policy_type, chunk_index in positions:
+            by_policy.setdefault((company_id, policy_type), []).append(chunk_index)
+        body = {
+            "size": len(positions),
+            "_source": {"excludes": ["embedding"]},
+            "query": {
+                "bool": {
+                    "should": [
+                        {"bool": {"filter": [
+                            {"term": {"company_id": company_id}},
+                            {"term": {"policy_type": policy_type}},
+                            {"terms": {"chunk_index": indexes}},
+                        ]}}
+                        for (company_id, policy_type), indexes in by_policy.items()
+                    ],
+                    "minimum_should_match": 1,
+                    "must_not": self._tombstone_filters()
+                }
+            }
+        }
+        try:
+            response = self.client.search(index=self.index_name, body=body)
         except Exception as e:
-            print(f"Error searching: {e}")
+            logger.warning("Error fetching neighbor chunks: %s", e)
             return []
+        chunks = {(c['company_id'], c['policy_type'], c['chunk_index']): {**c, "score": None}
+                  for c in self._format_hits(response)}
+        # Keep the requested order (best hit's neighbors first)
+        return [chunks[p] for p in positions if p in chunks]
+
+    def retrieve_context(self, query: str, n_results: int = 5,
+                         company_id: Optional[str] = None,
+                         policy_type: Optional[str] = None,
+                         expand_neighbors: bool = EXPAND_NEIGHBORS,
+                         max_chars: int = CONTEXT_BUDGET_CHARS) -> List[Dict[str, Any]]:
+        """
+        Context for rag_chat: the search hits merged into spans of contiguous
+        chunks per policy, widened by the chunks next to them (fetched in one
+        request) while the spans fit within max_chars
+        """
+        hits = self.search(query, n_results=n_results, company_id=company_id, policy_type=policy_type)
+        neighbors = self.fetch_chunks(neighbor_positions(hits)) if hits and expand_neighbors else []
+        return fit_context(hits, neighbors, max_chars)
+
+    @staticmethod
+    def _format_hits(response: Dict[str, Any], with_embedding: bool = False) -> List[Dict[str, Any]]:
+        formatted = []
+        for hit in response['hits']['hits']:
+            source = hit['_source']
+            result = {
+                "text": source.get('text'),
+                "company_id": source.get('company_id'),
+                "company_name": source.get('company_name'),
+                "policy_type": source.get('policy_type', 'terms'),
+                "chunk_index": source.get('chunk_index'),
+                "score": hit.get('_score')
+            }
+            if with_embedding:
+                result["embedding"] = source.get('embedding')
+            formatted.append(result)
+        return formatted
+
+    def search_companies(self, query: str, company_ids: List[str], n_per_company: int = 3,
+                         policy_type: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Top chunks for each company, from one query embedding and one _msearch
+        round trip (a filtered kNN query per company), so every company gets
+        context no matter how the scores compare across companies
+        """
+        results: Dict[str, List[Dict[str, Any]]] = {company_id: [] for company_id in company_ids}
+        if not company_ids:
+            return results
+        try:
+            query_embedding = self.bedrock.generate_embedding(query)
+
+            # Deleted companies get no context
+            searched = [company_id for company_id in company_ids if not self.is_tombstoned(company_id)]
+            if not searched:
+                return results
+
+            body = []
+            for company_id in searched:
+                filters = [{"term": {"company_id": company_id}}]
+                if policy_type:
+                    filters.append({"term": {"policy_type": policy_type}})
+                body.append({"index": self.index_name})
+                body.append({
+                    "size": n_per_company,
+                    "_source": {"excludes": ["embedding"]},
+                    "query": {
+                        "knn": {
+                            "embedding": {
+                                "vector": query_embedding,
+                                "k": n_per_company,
+                                # Filtered during the kNN search, so each company gets its k nearest
+                                "filter": {"bool": {"filter": filters,
+                                                    "must_not": self._tombstone_filters(company_id)}}
+                            }
+                        }
+                    }
+                })
+
+            with tracer.span("vector.msearch", companies=len(searched)):
+                response = self.client.msearch(body=body)
+
+            for company_id, item in zip(searched, response.get('responses', [])):
+                if 'error' in item:
+                    logger.warning("Comparison search failed for %s: %s", company_id, item['error'])
+                    continue
+                results[company_id] = strip_overlaps(self._format_hits(item))
+            return results
+
+        except Exception as e:
+            logger.warning("Error in comparison search: %s", e)
+            return results
 
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -345,6 +726,7 @@ class VectorDBService:
                     "privacy": policy_counts.get('privacy', 0)
                 },
                 "unique_companies": company_count,
+                "pending_deletes": len(self._tombstones),
                 "index_name": self.index_name,
                 "collection_endpoint": self.collection_endpoint
             }
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """
+    Background warmup after startup and the readiness state behind /readyz.
+
+    Each named check (e.g. a service's warmup()) runs in a worker thread, so
+    the app accepts liveness probes immediately. Failed checks are retried
+    until they pass; the app is ready once every check has passed.
+    """
+
+    def __init__(self, checks: Dict[str, Callable[[], Any]], retry_seconds: float = 10.0):
+        self.checks = checks
+        self.retry_seconds = retry_seconds
+        self.results: Dict[str, Dict[str, Any]] = {
+            name: {"ok": False, "error": None, "duration_ms": None} for name in checks
+        }
+        self.enabled = False
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        # With warmup disabled services connect on first use, so there is nothing to wait for
+        return not self.enabled or all(result["ok"] for result in self.results.values())
+
+    async def _run_check(self, name: str):
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.checks[name])
+            self.results[name] = {"ok": True, "error": None}
+        except Exception as e:
+            self.results[name] = {"ok": False, "error": str(e)}
+            logger.warning("Warmup check %s failed: %s", name, e)
+        self.results[name]["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    async def _loop(self):
+        while True:
+            pending = [name for name, result in self.results.items() if not result["ok"]]
+            await asyncio.gather(*(self._run_check(name) for name in pending))
+            if self.ready:
+                self.ready_at = time.perf_counter()
+                logger.info("Warmup complete in %.0f ms", (self.ready_at - self.started_at) * 1000)
+                return
+            await asyncio.sleep(self.retry_seconds)
+
+    def start(self):
+        """Start warming up on the running event loop"""
+        if self._task is None:
+            self.enabled = True
+            self.started_at = time.perf_counter()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "warmup": self.enabled,
+            "warmup_ms": (round((self.ready_at - self.started_at) * 1000, 1)
+                          if self.ready_at and self.started_at else None),
+            "checks": self.results if self.enabled else {},
+        }
@@ -751,7 +751,7 @@ async function analyzePrivacyPolicy() {
 
 // ==================== Chat Widget ====================
 
-let chatHistory = [];
+let chatSessionId = null; // Server-held chat history, started by the first message
 let selectedChatCompanyId = null;
 
 function toggleChat() {
@@ -819,10 +819,14 @@ async function sendChatMessage() {
             body: JSON.stringify({
                 question: message,
                 company_id: selectedChatCompanyId,
-                history: chatHistory.slice(-10) // Send last 10 messages for context
+                session_id: chatSessionId
             })
         });
 
+        if (response.status === 404 && chatSessionId) {
+            // Session expired; the next message starts a new one
+            chatSessionId = null;
+        }
         if (!response.ok) {
             throw new Error('Chat request failed');
         }
@@ -842,9 +846,8 @@ async function sendChatMessage() {
             hideChatSources();
         }
 
-        // Update history
-        chatHistory.push({ role: 'user', content: message });
-        chatHistory.push({ role: 'assistant', content: data.response });
+        // The server keeps the history; only the session id is sent back
+        chatSessionId = data.session_id || chatSessionId;
 
     } catch (error) {
         console.error('Chat error:', error);